@@ -0,0 +1,105 @@
+"""
+On-disk cache of validated strategy results.
+
+Maps (hash of gamestate.json, hash of strategy.py, engine version) to the
+action dict (or list of action dicts) the strategy returned. The same strategy runs against the
+same state in PR validation, in the post-merge apply and on every
+workflow re-run; with a warm cache only the first of those executes it,
+and the action that was validated is exactly the one that is applied.
+
+Entries are one JSON file each. Reads refresh the file's mtime, and
+writes evict the least recently used entries beyond max_entries.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from schemas import ENGINE_VERSION
+
+
+CACHE_ENV_VAR = "GITVILIZATION_CACHE_DIR"
+DEFAULT_MAX_ENTRIES = 256
+
+
+def cache_dir_from_env(flag: Optional[str] = None) -> Optional[str]:
+    """The cache directory from --cache-dir or the environment, if any."""
+    return flag or os.environ.get(CACHE_ENV_VAR) or None
+
+
+class ActionCache:
+    """Size-bounded LRU cache of validated actions, stored on disk."""
+
+    def __init__(self, directory: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(state_hash: str, strategy_hash: str, engine_version: str = ENGINE_VERSION) -> str:
+        return hashlib.sha256(f"{state_hash}:{strategy_hash}:{engine_version}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, state_hash: str, strategy_hash: str) -> Optional[dict]:
+        """Return the cached action dict, or None on a miss."""
+        path = self._path(self.key(state_hash, strategy_hash))
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("action")
+
+    def put(self, state_hash: str, strategy_hash: str, action: dict) -> None:
+        """Store a validated action, evicting old entries if over capacity."""
+        path = self._path(self.key(state_hash, strategy_hash))
+        entry = {
+            "stateHash": state_hash,
+            "strategyHash": strategy_hash,
+            "engineVersion": ENGINE_VERSION,
+            "action": action,
+        }
+
+        # Write atomically so a concurrent reader never sees a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except OSError:
+                continue
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob("*.json"))
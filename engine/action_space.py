@@ -0,0 +1,400 @@
+"""
+Fixed-size discrete action space for learned strategies.
+
+Every action a tribe could submit is mapped to one integer in
+[0, ActionSpace.size). Units and buildings are addressed by slot: the
+tribe's own units (or buildings) sorted by id, so slot 0 is its oldest
+unit. Hexes are addressed by index r * width + q.
+
+    MOVE     unit slot x target hex
+    ATTACK   unit slot x hex of the enemy unit to attack
+    SETTLE   unit slot x target hex
+    HARVEST  unit slot (the mine under the worker)
+    BUILD    building type x hex
+    TRAIN    building slot x unit type
+
+legal_mask() marks exactly the indices whose decoded action passes
+MoveValidator. It never calls the validator: the map topology (hex
+coordinates, neighbours, pairwise distances) is precomputed once per map
+size, and each state is reduced to per-hex occupancy arrays, so the whole
+mask is a handful of array operations.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from schemas import (
+    Action,
+    ActionType,
+    BuildingType,
+    GameState,
+    TerrainType,
+    TribeColor,
+    UnitType,
+    UNIT_STATS,
+    BUILDING_STATS,
+)
+from rules import GameRules
+
+
+UNIT_TYPES = list(UnitType)
+BUILDING_TYPES = list(BuildingType)
+UNIT_INDEX = {unit_type: i for i, unit_type in enumerate(UNIT_TYPES)}
+BUILDING_INDEX = {building_type: i for i, building_type in enumerate(BUILDING_TYPES)}
+
+# Action types of the index segments, in index order
+SEGMENT_TYPES = [
+    ActionType.MOVE, ActionType.ATTACK, ActionType.SETTLE,
+    ActionType.HARVEST, ActionType.BUILD, ActionType.TRAIN,
+]
+
+DEFAULT_MAX_UNITS = 32
+DEFAULT_MAX_BUILDINGS = 16
+
+COMBAT_UNITS = (UnitType.WARRIOR, UnitType.ARCHER, UnitType.KNIGHT)
+IMPASSABLE = (TerrainType.WATER, TerrainType.MOUNTAIN)
+NO_WORKER = -1
+OWNER_CODES = {None: -1, **{tribe: i for i, tribe in enumerate(TribeColor)}}
+
+# Per-unit-type rule tables, indexed by UNIT_INDEX (see GameRules.can_*)
+UNIT_MOVEMENT = np.array([UNIT_STATS[t]["movement"] for t in UNIT_TYPES])
+UNIT_REACH = np.array([
+    -1 if UNIT_STATS[t]["strength"] == 0 else 2 if t == UnitType.ARCHER else 1 for t in UNIT_TYPES
+])
+UNIT_SETTLES = np.array([t == UnitType.SETTLER for t in UNIT_TYPES])
+UNIT_HARVESTS = np.array([t == UnitType.WORKER for t in UNIT_TYPES])
+UNIT_COSTS = np.array([UNIT_STATS[t]["cost"] for t in UNIT_TYPES])
+BUILDING_COSTS = [BUILDING_STATS[b]["cost"] for b in BUILDING_TYPES]
+
+# TRAINABLE[building type, unit type]
+TRAINABLE = np.array([
+    [
+        building == BuildingType.CASTLE
+        or (building == BuildingType.BARRACKS and unit in COMBAT_UNITS)
+        for unit in UNIT_TYPES
+    ]
+    for building in BUILDING_TYPES
+])
+
+
+class Topology:
+    """
+    Static hex geometry for one map size, indexed by hex index r * width + q.
+
+    neighbors holds the six neighbour indices of each hex, with
+    off-map neighbours pointing at the sentinel index num_hexes, so
+    per-hex arrays padded with one trailing element can be gathered
+    without bounds checks.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.num_hexes = width * height
+
+        r, q = np.divmod(np.arange(self.num_hexes), width)
+        self.q = q
+        self.r = r
+
+        cube = np.stack([q, -q - r, r], axis=1)
+        self.distance = np.abs(cube[:, None, :] - cube[None, :, :]).max(axis=2).astype(np.int16)
+
+        neighbors = np.full((self.num_hexes, 6), self.num_hexes, dtype=np.intp)
+        for i, (nq, nr) in enumerate(GameRules.hex_neighbors(0, 0)):
+            tq, tr = q + nq, r + nr
+            inside = (tq >= 0) & (tq < width) & (tr >= 0) & (tr < height)
+            neighbors[inside, i] = tr[inside] * width + tq[inside]
+        self.neighbors = neighbors
+
+    def any_neighbor(self, values: np.ndarray) -> np.ndarray:
+        """For each hex, whether any neighbour is set in a per-hex bool array."""
+        return np.append(values, False)[self.neighbors].any(axis=1)
+
+
+@lru_cache(maxsize=None)
+def topology_for(width: int, height: int) -> Topology:
+    """Shared Topology for a map size (built once per process)."""
+    return Topology(width, height)
+
+
+class TileLayout:
+    """Hex index and passability of each map tile (static for a game)."""
+
+    def __init__(self, tiles: list, topology: Topology):
+        self.count = len(tiles)
+        self.width = topology.width
+        q = np.fromiter((t.q for t in tiles), dtype=np.intp, count=self.count)
+        r = np.fromiter((t.r for t in tiles), dtype=np.intp, count=self.count)
+        passable = np.fromiter((t.terrain not in IMPASSABLE for t in tiles), dtype=bool, count=self.count)
+        self.inside = (q >= 0) & (q < topology.width) & (r >= 0) & (r < topology.height)
+        self.outside = not self.inside.all()
+        self.hexes = (r * topology.width + q)[self.inside]
+        self.passable = np.zeros(topology.num_hexes, dtype=bool)
+        self.passable[self.hexes] = passable[self.inside]
+
+
+def tile_layout(state: GameState, topology: Topology) -> TileLayout:
+    """The map's TileLayout, built on first use and cached on the map."""
+    tiles = state.map.tiles
+    layout = state.map._layout
+    if not isinstance(layout, TileLayout) or layout.count != len(tiles) or layout.width != topology.width:
+        layout = state.map._layout = TileLayout(tiles, topology)
+    return layout
+
+
+class Occupancy:
+    """Per-hex arrays describing one state from one tribe's point of view."""
+
+    def __init__(self, state: GameState, tribe: TribeColor, topology: Topology):
+        count = topology.num_hexes
+        width = topology.width
+
+        def index(position) -> Optional[int]:
+            q, r = position
+            if 0 <= q < width and 0 <= r < topology.height:
+                return r * width + q
+            return None
+
+        tiles = state.map.tiles
+        layout = tile_layout(state, topology)
+        hexes = layout.hexes
+        owner = np.fromiter((OWNER_CODES[t.owner] for t in tiles), dtype=np.int8, count=len(tiles))
+        if layout.outside:
+            owner = owner[layout.inside]
+
+        self.passable = layout.passable
+        self.owned = np.zeros(count, dtype=bool)
+        self.owned[hexes] = owner == OWNER_CODES[tribe]
+        unowned = np.zeros(count, dtype=bool)
+        unowned[hexes] = owner == OWNER_CODES[None]
+
+        self.any_unit = np.zeros(count, dtype=bool)
+        self.enemy_unit = np.zeros(count, dtype=bool)
+        for unit in state.units:
+            i = index(unit.position)
+            if i is not None:
+                self.any_unit[i] = True
+                if unit.tribe != tribe:
+                    self.enemy_unit[i] = True
+
+        # Reversed so the first building/mine at a hex wins, as in the get_*_at lookups
+        self.building = np.zeros(count, dtype=bool)
+        enemy_wall = np.zeros(count, dtype=bool)
+        for building in reversed(state.buildings):
+            i = index(building.position)
+            if i is not None:
+                self.building[i] = True
+                enemy_wall[i] = building.tribe != tribe and building.type == BuildingType.WALL
+
+        self.mine = np.zeros(count, dtype=bool)
+        self.mine_worker = np.full(count, NO_WORKER, dtype=np.int64)
+        for mine in reversed(state.gold_mines):
+            i = index(mine.position)
+            if i is not None:
+                self.mine[i] = True
+                self.mine_worker[i] = NO_WORKER if mine.worker_id is None else mine.worker_id
+
+        self.enterable = self.passable & ~self.enemy_unit & ~enemy_wall
+        self.settleable = unowned & topology.any_neighbor(self.owned)
+
+
+class ActionSpace:
+    """Encodes, decodes and masks actions for one map size."""
+
+    def __init__(self, width: int, height: int,
+                 max_units: int = DEFAULT_MAX_UNITS, max_buildings: int = DEFAULT_MAX_BUILDINGS):
+        self.width = width
+        self.height = height
+        self.max_units = max_units
+        self.max_buildings = max_buildings
+        self.num_hexes = width * height
+
+        # Segment offsets, in the order listed in the module docstring
+        self.move_offset = 0
+        self.attack_offset = self.move_offset + max_units * self.num_hexes
+        self.settle_offset = self.attack_offset + max_units * self.num_hexes
+        self.harvest_offset = self.settle_offset + max_units * self.num_hexes
+        self.build_offset = self.harvest_offset + max_units
+        self.train_offset = self.build_offset + len(BUILDING_TYPES) * self.num_hexes
+        self.size = self.train_offset + max_buildings * len(UNIT_TYPES)
+        self.segment_offsets = np.array([
+            self.move_offset, self.attack_offset, self.settle_offset,
+            self.harvest_offset, self.build_offset, self.train_offset,
+        ])
+
+    @property
+    def topology(self) -> Topology:
+        return topology_for(self.width, self.height)
+
+    @classmethod
+    def for_state(cls, state: GameState, **kwargs) -> "ActionSpace":
+        return cls(state.map.width, state.map.height, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Slots and hexes
+    # ------------------------------------------------------------------
+
+    def unit_slots(self, state: GameState, tribe: TribeColor) -> list:
+        return sorted((u for u in state.units if u.tribe == tribe), key=lambda u: u.id)[:self.max_units]
+
+    def building_slots(self, state: GameState, tribe: TribeColor) -> list:
+        return sorted((b for b in state.buildings if b.tribe == tribe), key=lambda b: b.id)[:self.max_buildings]
+
+    def hex_index(self, position: tuple[int, int]) -> int:
+        q, r = position
+        return r * self.width + q
+
+    def hex_position(self, index: int) -> tuple[int, int]:
+        r, q = divmod(index, self.width)
+        return (q, r)
+
+    def in_bounds(self, position: tuple[int, int]) -> bool:
+        q, r = position
+        return 0 <= q < self.width and 0 <= r < self.height
+
+    def segments(self, indices) -> np.ndarray:
+        """Position in SEGMENT_TYPES of each index's action type."""
+        return np.searchsorted(self.segment_offsets, indices, side="right") - 1
+
+    # ------------------------------------------------------------------
+    # Encode / decode
+    # ------------------------------------------------------------------
+
+    def decode(self, index: int, state: GameState, tribe: TribeColor) -> Optional[Action]:
+        """The Action for an index, or None if it names a missing unit, building or target."""
+        if not 0 <= index < self.size:
+            raise ValueError(f"Action index {index} out of range (0-{self.size - 1})")
+
+        if index < self.harvest_offset:
+            segment, rest = divmod(index, self.max_units * self.num_hexes)
+            slot, hex_index = divmod(rest, self.num_hexes)
+            units = self.unit_slots(state, tribe)
+            if slot >= len(units):
+                return None
+            unit = units[slot]
+            target = self.hex_position(hex_index)
+            if segment == 0:
+                return Action(action=ActionType.MOVE, unit_id=unit.id, target=target)
+            if segment == 2:
+                return Action(action=ActionType.SETTLE, unit_id=unit.id, target=target)
+            enemies = sorted(
+                (u for u in state.get_units_at(*target) if u.tribe != tribe), key=lambda u: u.id
+            )
+            if not enemies:
+                return None
+            return Action(action=ActionType.ATTACK, unit_id=unit.id, target_id=enemies[0].id)
+
+        if index < self.build_offset:
+            units = self.unit_slots(state, tribe)
+            slot = index - self.harvest_offset
+            if slot >= len(units):
+                return None
+            unit = units[slot]
+            mine = next((m for m in state.gold_mines if m.position == unit.position), None)
+            if mine is None:
+                return None
+            return Action(action=ActionType.HARVEST, unit_id=unit.id, mine_id=mine.id)
+
+        if index < self.train_offset:
+            building_type, hex_index = divmod(index - self.build_offset, self.num_hexes)
+            return Action(
+                action=ActionType.BUILD,
+                building=BUILDING_TYPES[building_type],
+                position=self.hex_position(hex_index),
+            )
+
+        slot, unit_type = divmod(index - self.train_offset, len(UNIT_TYPES))
+        buildings = self.building_slots(state, tribe)
+        if slot >= len(buildings):
+            return None
+        return Action(action=ActionType.TRAIN, building_id=buildings[slot].id, unit_type=UNIT_TYPES[unit_type])
+
+    def encode(self, action: Action, state: GameState, tribe: TribeColor) -> int:
+        """The index of an action (e.g. one returned by a scripted strategy)."""
+        if action.action in (ActionType.MOVE, ActionType.ATTACK, ActionType.SETTLE, ActionType.HARVEST):
+            slots = [u.id for u in self.unit_slots(state, tribe)]
+            if action.unit_id not in slots:
+                raise ValueError(f"Unit {action.unit_id} has no slot")
+            slot = slots.index(action.unit_id)
+
+            if action.action == ActionType.HARVEST:
+                return self.harvest_offset + slot
+            if action.action == ActionType.ATTACK:
+                target = state.get_unit(action.target_id)
+                if target is None:
+                    raise ValueError(f"Unit {action.target_id} not found")
+                position, offset = target.position, self.attack_offset
+            else:
+                position = action.target
+                offset = self.move_offset if action.action == ActionType.MOVE else self.settle_offset
+            return offset + slot * self.num_hexes + self.hex_index(position)
+
+        if action.action == ActionType.BUILD:
+            return self.build_offset + BUILDING_TYPES.index(action.building) * self.num_hexes + self.hex_index(action.position)
+
+        slots = [b.id for b in self.building_slots(state, tribe)]
+        if action.building_id not in slots:
+            raise ValueError(f"Building {action.building_id} has no slot")
+        return self.train_offset + slots.index(action.building_id) * len(UNIT_TYPES) + UNIT_TYPES.index(action.unit_type)
+
+    # ------------------------------------------------------------------
+    # Legal actions
+    # ------------------------------------------------------------------
+
+    def legal_mask(self, state: GameState, tribe: TribeColor, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Boolean mask of indices whose action MoveValidator would accept.
+
+        Computed with array operations over the map topology and the
+        state's occupancy, mirroring the checks in GameRules.
+        """
+        mask = np.zeros(self.size, dtype=bool) if out is None else out
+        mask[:] = False
+        tribe_state = state.tribes.get(tribe)
+        if state.current_tribe != tribe or tribe_state is None or not tribe_state.alive:
+            return mask
+
+        topology = self.topology
+        occupancy = Occupancy(state, tribe, topology)
+        gold = tribe_state.gold
+
+        units = self.unit_slots(state, tribe)
+        if units:
+            count = len(units)
+            hexes = np.array([self.hex_index(u.position) for u in units], dtype=np.intp)
+            types = np.array([UNIT_INDEX[u.type] for u in units], dtype=np.intp)
+            distance = topology.distance[hexes]
+
+            move = (distance <= UNIT_MOVEMENT[types, None]) & occupancy.enterable
+            attack = (distance <= UNIT_REACH[types, None]) & occupancy.enemy_unit
+            settle = (distance <= 1) & (UNIT_SETTLES[types, None] & occupancy.settleable)
+
+            hex_count = self.num_hexes
+            for offset, block in ((self.move_offset, move), (self.attack_offset, attack), (self.settle_offset, settle)):
+                mask[offset:offset + count * hex_count] = block.ravel()
+
+            ids = np.array([u.id for u in units], dtype=np.int64)
+            mine_worker = occupancy.mine_worker[hexes]
+            harvest = (
+                UNIT_HARVESTS[types]
+                & occupancy.mine[hexes]
+                & occupancy.owned[hexes]
+                & ((mine_worker == NO_WORKER) | (mine_worker == ids))
+            )
+            mask[self.harvest_offset:self.harvest_offset + count] = harvest
+
+        buildable = occupancy.owned & occupancy.passable & ~occupancy.building
+        for i, cost in enumerate(BUILDING_COSTS):
+            if gold >= cost:
+                base = self.build_offset + i * self.num_hexes
+                mask[base:base + self.num_hexes] = buildable
+
+        buildings = self.building_slots(state, tribe)
+        if buildings:
+            types = np.array([BUILDING_INDEX[b.type] for b in buildings], dtype=np.intp)
+            hexes = np.array([self.hex_index(b.position) for b in buildings], dtype=np.intp)
+            train = TRAINABLE[types] & (UNIT_COSTS <= gold) & ~occupancy.any_unit[hexes, None]
+            mask[self.train_offset:self.train_offset + train.size] = train.ravel()
+        return mask
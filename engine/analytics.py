@@ -0,0 +1,294 @@
+"""
+Columnar analytics over archived games.
+
+Flattens archived games into three tables of equal-length NumPy columns:
+
+    actions      one row per GameAction (game, seq, turn, tribe, action, label, ...)
+    tribe_turns  one row per tribe at the start of each turn
+                 (game, turn, tribe, gold, units, combat_units, workers,
+                 buildings, territory, alive)
+    games        one row per game (game, winner, turns, actions)
+
+Categorical columns are integer codes; the code tables (tribes, action
+types, labels, game ids) are stored alongside. Tables are written as CSV
+or as a single .npz, and AnalyticsData answers aggregate queries on the
+.npz with vectorized NumPy operations instead of Python loops over
+gamestate files.
+
+Per-turn stats are rebuilt by replaying each game's history from its
+initial state, which is only possible for seeded games (GameState.seed);
+unseeded games contribute their actions and summary only.
+"""
+
+import csv
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from schemas import Action, ActionType, GameState, TribeColor, UnitType
+from state import GameStateManager
+from rules import GameRules
+from archive import GameArchive
+
+
+TRIBES = [tribe.value for tribe in TribeColor]
+ACTION_TYPES = [action.value for action in ActionType]
+COMBAT_UNIT_TYPES = (UnitType.WARRIOR, UnitType.ARCHER, UnitType.KNIGHT)
+
+ACTION_COLUMNS = (
+    "game", "seq", "turn", "tribe", "action", "label",
+    "unit_id", "target_id", "target_q", "target_r", "building_id",
+)
+TRIBE_TURN_COLUMNS = (
+    "game", "turn", "tribe", "gold", "units", "combat_units",
+    "workers", "buildings", "territory", "alive",
+)
+GAME_COLUMNS = ("game", "winner", "turns", "actions")
+
+MISSING = -1
+
+
+def action_label(details: dict) -> str:
+    """Short label for an action, e.g. MOVE, TRAIN_WORKER, BUILD_TOWER."""
+    label = details["action"]
+    subtype = details.get("unit_type") or details.get("building")
+    return f"{label}_{subtype}" if subtype else label
+
+
+def _tribe_rows(game: int, state: GameState) -> list[tuple]:
+    """One tribe_turns row per tribe for the current state."""
+    territory = {tribe: 0 for tribe in TribeColor}
+    for tile in state.map.tiles:
+        if tile.owner is not None:
+            territory[tile.owner] += 1
+
+    rows = []
+    for code, tribe in enumerate(TribeColor):
+        units = [u for u in state.units if u.tribe == tribe]
+        rows.append((
+            game,
+            state.turn,
+            code,
+            state.tribes[tribe].gold,
+            len(units),
+            sum(1 for u in units if u.type in COMBAT_UNIT_TYPES),
+            sum(1 for u in units if u.type == UnitType.WORKER),
+            sum(1 for b in state.buildings if b.tribe == tribe),
+            territory[tribe],
+            int(state.tribes[tribe].alive),
+        ))
+    return rows
+
+
+def replay_turn_stats(game: int, final: GameState) -> Optional[list[tuple]]:
+    """
+    Rebuild per-turn tribe stats by replaying a seeded game from the start.
+
+    Returns None if the game is unseeded or the replay does not reproduce
+    the archived final state.
+    """
+    if final.seed is None:
+        return None
+
+    manager = GameStateManager.create_new_game(
+        final.game_id, final.map.width, final.map.height, seed=final.seed
+    )
+    rows = _tribe_rows(game, manager.state)
+    for entry in final.history:
+        turn = manager.state.turn
+        success, _, _ = manager.apply_action(
+            entry.tribe, Action.from_dict(entry.details), end_turn=not entry.continues_turn
+        )
+        if not success:
+            return None
+        if manager.state.turn != turn:
+            rows.extend(_tribe_rows(game, manager.state))
+
+    replayed = manager.state.to_dict()
+    archived = final.to_dict()
+    if replayed["units"] != archived["units"] or replayed["tribes"] != archived["tribes"]:
+        return None
+    return rows
+
+
+def archived_states(archive: GameArchive) -> Iterable[GameState]:
+    """Final states of every game in an archive's index."""
+    for summary in archive.summaries():
+        yield archive.load(summary)
+
+
+def _columns(rows: list[tuple], names: tuple[str, ...]) -> dict[str, np.ndarray]:
+    array = np.array(rows, dtype=np.int64).reshape(len(rows), len(names))
+    return {name: array[:, i] for i, name in enumerate(names)}
+
+
+def build_tables(states: Iterable[GameState], turn_stats: bool = True) -> dict[str, np.ndarray]:
+    """
+    Flatten finished games into columnar arrays.
+
+    Keys are "<table>_<column>" plus the code tables "tribes",
+    "action_types", "labels" and "game_ids".
+    """
+    labels: dict[str, int] = {}
+    game_ids = []
+    action_rows = []
+    tribe_rows = []
+    game_rows = []
+
+    for game, state in enumerate(states):
+        game_ids.append(state.game_id)
+        winner = GameRules.check_victory(state)
+        game_rows.append((
+            game,
+            TRIBES.index(winner.value) if winner else MISSING,
+            state.turn,
+            len(state.history),
+        ))
+
+        for seq, entry in enumerate(state.history):
+            details = entry.details
+            target = details.get("target") or (MISSING, MISSING)
+            label = labels.setdefault(action_label(details), len(labels))
+            action_rows.append((
+                game,
+                seq,
+                entry.turn,
+                TRIBES.index(entry.tribe.value),
+                ACTION_TYPES.index(entry.action.value),
+                label,
+                details.get("unit_id", MISSING),
+                details.get("target_id", MISSING),
+                target[0],
+                target[1],
+                details.get("building_id", MISSING),
+            ))
+
+        if turn_stats:
+            tribe_rows.extend(replay_turn_stats(game, state) or [])
+
+    tables = {
+        "tribes": np.array(TRIBES),
+        "action_types": np.array(ACTION_TYPES),
+        "labels": np.array(list(labels)),
+        "game_ids": np.array(game_ids),
+    }
+    for prefix, rows, names in (
+        ("actions", action_rows, ACTION_COLUMNS),
+        ("tribe_turns", tribe_rows, TRIBE_TURN_COLUMNS),
+        ("games", game_rows, GAME_COLUMNS),
+    ):
+        for name, column in _columns(rows, names).items():
+            tables[f"{prefix}_{name}"] = column
+    return tables
+
+
+def write_npz(path: str, tables: dict[str, np.ndarray]) -> None:
+    np.savez_compressed(path, **tables)
+
+
+def write_csv(directory: str, tables: dict[str, np.ndarray]) -> None:
+    """Write actions.csv, tribe_turns.csv and games.csv with codes decoded."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    decode = {
+        "game": tables["game_ids"],
+        "tribe": tables["tribes"],
+        "winner": tables["tribes"],
+        "action": tables["action_types"],
+        "label": tables["labels"],
+    }
+
+    for prefix, names in (
+        ("actions", ACTION_COLUMNS),
+        ("tribe_turns", TRIBE_TURN_COLUMNS),
+        ("games", GAME_COLUMNS),
+    ):
+        columns = []
+        for name in names:
+            values = tables[f"{prefix}_{name}"]
+            if name in decode and len(values):
+                codes = decode[name]
+                values = np.where(values >= 0, codes[np.clip(values, 0, None)], "")
+            columns.append(values.tolist())
+        with open(directory / f"{prefix}.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*columns))
+
+
+class AnalyticsData:
+    """Vectorized aggregate queries over an exported .npz."""
+
+    def __init__(self, tables: dict[str, np.ndarray]):
+        self.tables = tables
+
+    @classmethod
+    def load(cls, path: str) -> "AnalyticsData":
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        return self.tables[f"{table}_{name}"]
+
+    def _tribe_code(self, tribe: str) -> int:
+        return TRIBES.index(tribe.upper())
+
+    def win_rate_by_opening(self) -> dict[str, dict]:
+        """
+        Win rate per opening, where a tribe's opening is its first action label.
+
+        Returns {label: {"games": n, "wins": w, "rate": w / n}}.
+        """
+        game = self.column("actions", "game")
+        tribe = self.column("actions", "tribe")
+        seq = self.column("actions", "seq")
+        label = self.column("actions", "label")
+        if len(game) == 0:
+            return {}
+
+        # First action of each (game, tribe): sort by key then seq, keep first of each key
+        key = game * len(TRIBES) + tribe
+        order = np.lexsort((seq, key))
+        _, first = np.unique(key[order], return_index=True)
+        first = order[first]
+
+        winners = self.column("games", "winner")
+        won = winners[game[first]] == tribe[first]
+        n_labels = len(self.tables["labels"])
+        played = np.bincount(label[first], minlength=n_labels)
+        wins = np.bincount(label[first], weights=won, minlength=n_labels)
+
+        return {
+            str(self.tables["labels"][i]): {
+                "games": int(played[i]),
+                "wins": int(wins[i]),
+                "rate": float(wins[i] / played[i]),
+            }
+            for i in np.nonzero(played)[0]
+        }
+
+    def mean_by_turn(self, name: str, tribe: Optional[str] = None) -> np.ndarray:
+        """Mean of a tribe_turns column for each turn (index = turn; NaN where no data)."""
+        turn = self.column("tribe_turns", "turn")
+        values = self.column("tribe_turns", name).astype(float)
+        if tribe is not None:
+            mask = self.column("tribe_turns", "tribe") == self._tribe_code(tribe)
+            turn, values = turn[mask], values[mask]
+        if len(turn) == 0:
+            return np.array([])
+
+        counts = np.bincount(turn)
+        totals = np.bincount(turn, weights=values)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, totals / counts, np.nan)
+
+    def gold_curve(self, tribe: Optional[str] = None) -> np.ndarray:
+        """Mean gold at the start of each turn."""
+        return self.mean_by_turn("gold", tribe)
+
+    def win_counts(self) -> dict[str, int]:
+        """Games won per tribe."""
+        winners = self.column("games", "winner")
+        counts = np.bincount(winners[winners >= 0], minlength=len(TRIBES))
+        return {tribe: int(counts[i]) for i, tribe in enumerate(TRIBES)}
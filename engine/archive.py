@@ -0,0 +1,159 @@
+"""
+Archive of finished games.
+
+When a game ends its final state (which includes the full action history)
+is written to <directory>/<game_id>_<started>.json.gz, and a one-line
+summary is added to <directory>/index.jsonl:
+
+    {"gameId": "game_001", "winner": "RED", "turns": 42, "actions": 165,
+     "startedAt": "...", "finishedAt": "...", "durationSeconds": 86400.0,
+     "file": "game_001_20260101T000000Z.json.gz"}
+
+Game ids are reused (`new --id` defaults to game_001), so archives are
+keyed by the id plus the game's start time: a later game with the same
+id gets its own archive, while re-archiving the same game replaces its
+archive and index entry.
+
+Listing and filtering games only reads the index, never the archives.
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from schemas import GameState
+from rules import GameRules
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _parse_until(value: Optional[str]) -> Optional[datetime]:
+    """Inclusive upper bound for a date filter; a bare date covers that whole day."""
+    parsed = _parse_time(value)
+    if parsed is not None and "T" not in value and " " not in value:
+        parsed += timedelta(days=1, microseconds=-1)
+    return parsed
+
+
+def archive_file_name(game_id: str, started_at: Optional[str], finished_at: str) -> str:
+    """<game_id>_<start time, or finish time if unknown, as YYYYMMDDTHHMMSSZ>.json.gz"""
+    stamp = _parse_time(started_at or finished_at).astimezone(timezone.utc)
+    return f"{game_id}_{stamp.strftime('%Y%m%dT%H%M%SZ')}.json.gz"
+
+
+def summarize(state: GameState, finished_at: Optional[str] = None) -> dict:
+    """Build the index entry for a finished game."""
+    winner = GameRules.check_victory(state)
+    finished_at = finished_at or utc_now()
+    started = _parse_time(state.started_at)
+    duration = (_parse_time(finished_at) - started).total_seconds() if started else None
+    return {
+        "gameId": state.game_id,
+        "winner": winner.value if winner else None,
+        "turns": state.turn,
+        "actions": len(state.history),
+        "startedAt": state.started_at,
+        "finishedAt": finished_at,
+        "durationSeconds": duration,
+        "file": archive_file_name(state.game_id, state.started_at, finished_at),
+    }
+
+
+class GameArchive:
+    """Compressed final states plus an append-only summary index."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.index_path = self.directory / "index.jsonl"
+
+    def path_for(self, summary: dict) -> Path:
+        return self.directory / summary["file"]
+
+    def archive(self, state: GameState, finished_at: Optional[str] = None) -> dict:
+        """
+        Write a finished game's archive and index entry. Returns the summary.
+
+        Re-archiving the same game (same id and start time) rewrites its
+        archive and replaces its index entry.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        summary = summarize(state, finished_at)
+        path = self.path_for(summary)
+        already_indexed = path.exists()
+
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump({"summary": summary, "state": state.to_dict(include_seed=True)}, f, separators=(",", ":"))
+
+        if already_indexed:
+            entries = [s for s in self.summaries() if s["file"] != summary["file"]] + [summary]
+            lines = "".join(json.dumps(s, separators=(",", ":")) + "\n" for s in entries)
+            tmp_path = self.index_path.with_suffix(".tmp")
+            tmp_path.write_text(lines)
+            tmp_path.replace(self.index_path)
+        else:
+            with open(self.index_path, "a") as f:
+                f.write(json.dumps(summary, separators=(",", ":")) + "\n")
+        return summary
+
+    def summaries(self) -> Iterator[dict]:
+        """All index entries, oldest first."""
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def query(
+        self,
+        winner: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        min_turns: Optional[int] = None,
+        max_turns: Optional[int] = None,
+    ) -> list[dict]:
+        """Index entries matching every given filter (dates compare finishedAt)."""
+        since_time = _parse_time(since)
+        until_time = _parse_until(until)
+        results = []
+        for summary in self.summaries():
+            if winner is not None and summary["winner"] != winner.upper():
+                continue
+            if min_turns is not None and summary["turns"] < min_turns:
+                continue
+            if max_turns is not None and summary["turns"] > max_turns:
+                continue
+            if since_time or until_time:
+                finished = _parse_time(summary["finishedAt"])
+                if since_time and finished < since_time:
+                    continue
+                if until_time and finished > until_time:
+                    continue
+            results.append(summary)
+        return results
+
+    def load(self, game: Union[str, dict]) -> GameState:
+        """
+        Load a game's archived final state, given its index entry or its
+        game id (the most recently archived game with that id).
+        """
+        if isinstance(game, str):
+            matches = [s for s in self.summaries() if s["gameId"] == game]
+            if not matches:
+                raise FileNotFoundError(f"No archived game with id {game}")
+            game = matches[-1]
+        with gzip.open(self.path_for(game), "rt", encoding="utf-8") as f:
+            return GameState.from_dict(json.load(f)["state"])
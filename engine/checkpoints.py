@@ -0,0 +1,210 @@
+"""
+Keyframe checkpoints for random access to past turns.
+
+A checkpoint directory holds a compact action log (one GameState.history
+entry per line) and a full-state keyframe every `interval` actions:
+
+    <directory>/
+        index.json              interval, action count, log size, keyframe
+                                indices with their log offsets and turns
+        actions.jsonl           history entries, in order
+        keyframes/00000040.json state after 40 actions
+
+The state after any N actions is rebuilt by loading the nearest keyframe
+at or before N, seeking to its log offset and replaying at most
+`interval` actions from there.
+Combat rolls replay identically only for seeded games (GameState.seed),
+so seeking past a keyframe of an unseeded game is refused; an EventStore
+records combat outcomes and can rebuild those.
+"""
+
+import os
+import json
+import bisect
+import tempfile
+from pathlib import Path
+
+from schemas import Action, GameAction, GameState
+from state import GameStateManager
+
+
+DEFAULT_INTERVAL = 25
+
+
+def _write_json_atomic(path: Path, data) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class CheckpointStore:
+    """Keyframes plus an action log for one game."""
+
+    def __init__(self, directory: str, interval: int = DEFAULT_INTERVAL):
+        self.directory = Path(directory)
+        self.keyframe_dir = self.directory / "keyframes"
+        self.log_path = self.directory / "actions.jsonl"
+        self.index_path = self.directory / "index.json"
+        self.keyframe_dir.mkdir(parents=True, exist_ok=True)
+
+        if self.index_path.exists():
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            self.interval = index["interval"]
+            self.action_count = index["actions"]
+            self.keyframes = index["keyframes"]
+            # Indexes written before logSize was recorded: trust the file
+            self.log_size = index.get("logSize", self.log_path.stat().st_size if self.log_path.exists() else 0)
+            if "keyframeOffsets" in index:
+                self.keyframe_offsets = index["keyframeOffsets"]
+                self.keyframe_turns = index["keyframeTurns"]
+            else:
+                self._index_keyframes()
+        else:
+            self.interval = interval
+            self.action_count = 0
+            self.log_size = 0
+            self.keyframes = []
+            self.keyframe_offsets = []
+            self.keyframe_turns = []
+
+    def _index_keyframes(self) -> None:
+        """Rebuild keyframe offsets and turns for an index written without them."""
+        offsets = {}
+        offset = 0
+        if 0 in self.keyframes:
+            offsets[0] = 0
+        if self.log_path.exists():
+            with open(self.log_path, "rb") as f:
+                for count, line in enumerate(f, start=1):
+                    offset += len(line)
+                    if count in self.keyframes:
+                        offsets[count] = offset
+        self.keyframe_offsets = [offsets[index] for index in self.keyframes]
+        self.keyframe_turns = []
+        for index in self.keyframes:
+            with open(self._keyframe_path(index), "r") as f:
+                self.keyframe_turns.append(json.load(f)["turn"])
+
+    def _keyframe_path(self, index: int) -> Path:
+        return self.keyframe_dir / f"{index:08d}.json"
+
+    def _save_index(self) -> None:
+        _write_json_atomic(self.index_path, {
+            "interval": self.interval,
+            "actions": self.action_count,
+            "logSize": self.log_size,
+            "keyframes": self.keyframes,
+            "keyframeOffsets": self.keyframe_offsets,
+            "keyframeTurns": self.keyframe_turns,
+        })
+
+    def _write_keyframe(self, state: GameState) -> None:
+        # Keyframes are only written for the newest state, so the lists stay in order
+        index = len(state.history)
+        _write_json_atomic(self._keyframe_path(index), state.to_dict(include_seed=True))
+        self.keyframes.append(index)
+        self.keyframe_offsets.append(self.log_size)
+        self.keyframe_turns.append(state.turn)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, state: GameState) -> None:
+        """
+        Bring the store up to date with a state.
+
+        Appends history entries not yet in the log and writes a keyframe
+        when the action count reaches a multiple of the interval. The
+        first state recorded always becomes a keyframe; actions before it
+        are logged but cannot be seeked to.
+        """
+        count = len(state.history)
+        if count < self.action_count:
+            raise ValueError(
+                f"State has {count} actions but the checkpoint log already has {self.action_count}"
+            )
+
+        if count > self.action_count:
+            with open(self.log_path, "a+b") as f:
+                # Drop a tail left by a record that failed before updating the index
+                f.truncate(self.log_size)
+                for entry in state.history[self.action_count:]:
+                    f.write((json.dumps(entry.to_dict(), separators=(",", ":")) + "\n").encode())
+                f.flush()
+                os.fsync(f.fileno())
+                self.log_size = f.tell()
+            self.action_count = count
+
+        if count not in self.keyframes and (not self.keyframes or count % self.interval == 0):
+            self._write_keyframe(state)
+
+        self._save_index()
+
+    # ------------------------------------------------------------------
+    # Seeking
+    # ------------------------------------------------------------------
+
+    def _read_log(self, limit: int, offset: int = 0) -> list[GameAction]:
+        """Read up to `limit` history entries starting at byte `offset` of the log."""
+        entries = []
+        if limit <= 0:
+            return entries
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                entries.append(GameAction.from_dict(json.loads(line)))
+                if len(entries) == limit:
+                    break
+        return entries
+
+    def seek(self, action_index: int) -> GameState:
+        """Return the state after `action_index` actions."""
+        if not 0 <= action_index <= self.action_count:
+            raise ValueError(f"Action index {action_index} out of range (0-{self.action_count})")
+
+        position = bisect.bisect_right(self.keyframes, action_index) - 1
+        if position < 0:
+            raise ValueError(f"No keyframe at or before action {action_index}")
+        keyframe = self.keyframes[position]
+
+        with open(self._keyframe_path(keyframe), "r") as f:
+            state = GameState.from_dict(json.load(f))
+        if state.seed is None and action_index > keyframe:
+            raise ValueError(
+                f"Game {state.game_id} is unseeded, so combat after keyframe {keyframe} cannot be "
+                f"replayed; seek to a keyframe ({', '.join(map(str, self.keyframes))}) or use an event log"
+            )
+        if len(state.history) != keyframe:
+            # Keyframe written before keyframes kept their history
+            state.history = self._read_log(keyframe)
+
+        manager = GameStateManager.from_state(state)
+        for entry in self._read_log(action_index - keyframe, self.keyframe_offsets[position]):
+            success, message, _ = manager.apply_action(
+                entry.tribe, Action.from_dict(entry.details), end_turn=not entry.continues_turn
+            )
+            if not success:
+                raise ValueError(
+                    f"Replay diverged at action {len(state.history)} ({entry.action.value}): {message}"
+                )
+        return manager.state
+
+    def seek_turn(self, turn: int) -> GameState:
+        """Return the state at the start of `turn` (before any of its actions)."""
+        # The turn starts between the last keyframe taken before it and the
+        # next keyframe, so only the log entries between the two are read
+        position = bisect.bisect_left(self.keyframe_turns, turn)
+        start, offset = (0, 0) if position == 0 else (
+            self.keyframes[position - 1], self.keyframe_offsets[position - 1]
+        )
+        end = self.keyframes[position] if position < len(self.keyframes) else self.action_count
+        turns = [entry.turn for entry in self._read_log(end - start, offset)]
+        return self.seek(start + bisect.bisect_left(turns, turn))
@@ -0,0 +1,329 @@
+"""
+Gym-style environments for training and evaluating learned tribes.
+
+GameEnv wraps a GameStateManager in memory (no files, no subprocesses):
+
+    env = GameEnv(agent="RED", opponents={"BLUE": blue_get_action, ...})
+    obs, info = env.reset(seed=0)
+    while True:
+        action = policy(obs, info["action_mask"])
+        obs, reward, done, info = env.step(action)
+        if done:
+            break
+
+Actions are ActionSpace indices and observations come from
+observation.encode_observation. With opponents, the other tribes are
+played by their get_action callables between agent steps; without, every
+tribe is driven by step() in turn (self-play) and the observation is
+always from the current tribe's point of view.
+
+VectorEnv steps N games in lockstep, either in-process or across worker
+processes that write observations and masks into shared memory.
+"""
+
+import json
+import multiprocessing
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from schemas import Action, GameStatus, TribeColor
+from state import GameStateManager
+from rules import GameRules
+from action_space import ActionSpace
+from observation import NUM_PLANES, encode_observation
+
+
+DEFAULT_MAX_TURNS = 100
+INVALID_ACTION_PENALTY = -0.1
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / "config.json"
+
+
+def default_max_turns() -> int:
+    """game.maxTurns from config.json, if present."""
+    try:
+        with open(CONFIG_PATH, "r") as f:
+            return json.load(f)["game"]["maxTurns"]
+    except (OSError, ValueError, KeyError):
+        return DEFAULT_MAX_TURNS
+
+
+def _tribe(tribe: Union[TribeColor, str]) -> TribeColor:
+    return tribe if isinstance(tribe, TribeColor) else TribeColor(tribe.upper())
+
+
+class GameEnv:
+    """Single in-memory game with an integer action space."""
+
+    def __init__(
+        self,
+        agent: Optional[Union[TribeColor, str]] = None,
+        opponents: Optional[dict] = None,
+        max_turns: Optional[int] = None,
+        width: int = 20,
+        height: int = 20,
+        action_space: Optional[ActionSpace] = None,
+    ):
+        self.agent = _tribe(agent) if agent is not None else None
+        self.opponents: dict[TribeColor, Callable] = {
+            _tribe(tribe): get_action for tribe, get_action in (opponents or {}).items()
+        }
+        self.max_turns = max_turns if max_turns is not None else default_max_turns()
+        self.width = width
+        self.height = height
+        self.action_space = action_space or ActionSpace(width, height)
+        self.observation_shape = (NUM_PLANES, height, width)
+        self.manager: Optional[GameStateManager] = None
+        self._mask: Optional[np.ndarray] = None
+
+    @property
+    def state(self):
+        return self.manager.state
+
+    @property
+    def current_tribe(self) -> TribeColor:
+        return self.manager.state.current_tribe
+
+    def action_mask(self) -> np.ndarray:
+        """Legal actions for the tribe to move (cached until the state changes)."""
+        if self._mask is None:
+            self._mask = self.action_space.legal_mask(self.state, self.current_tribe)
+        return self._mask
+
+    def observe(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        return encode_observation(self.state, self.current_tribe, out=out)
+
+    def _info(self, **extra) -> dict:
+        info = {"action_mask": self.action_mask(), "tribe": self.current_tribe.value, "turn": self.state.turn}
+        info.update(extra)
+        return info
+
+    def _advance(self, tribe: TribeColor, action: Optional[Action]) -> bool:
+        """Apply an action (or skip the turn if there is none). Returns False if rejected."""
+        self._mask = None
+        if action is None:
+            self.manager.skip_turn()
+            return True
+        success, _, _ = self.manager.apply_action(tribe, action)
+        return success
+
+    def _play_opponents(self) -> None:
+        """Let scripted opponents move until it is the agent's turn or the game ends."""
+        while not self._finished() and self.current_tribe != self.agent:
+            tribe = self.current_tribe
+            get_action = self.opponents.get(tribe)
+            action = None
+            if get_action is not None:
+                try:
+                    action = Action.from_dict(get_action(self.state.to_dict()))
+                except Exception:
+                    action = None
+            if action is None or not self._advance(tribe, action):
+                # Fall back to the first legal action so the game keeps moving
+                legal = np.flatnonzero(self.action_mask())
+                fallback = self.action_space.decode(int(legal[0]), self.state, tribe) if len(legal) else None
+                self._advance(tribe, fallback)
+
+    def _finished(self) -> bool:
+        return self.state.status == GameStatus.FINISHED
+
+    def _truncated(self) -> bool:
+        return self.state.turn > self.max_turns
+
+    def reset(self, seed: Optional[int] = None) -> tuple[np.ndarray, dict]:
+        """Start a new game. Returns (observation, info)."""
+        self.manager = GameStateManager.create_new_game("env", self.width, self.height, seed=seed)
+        self._mask = None
+        if self.agent is not None:
+            self._play_opponents()
+        return self.observe(), self._info()
+
+    def step(self, action: int) -> tuple[np.ndarray, float, bool, dict]:
+        """
+        Apply an action index for the current tribe.
+
+        Returns (observation, reward, done, info). Reward is +1 if the
+        acting tribe (or the agent, with opponents) has won, -1 if it has
+        lost, 0 otherwise; an illegal action leaves the state unchanged
+        and is penalised. info carries the next action_mask, and
+        truncated=True when the game hit max_turns.
+        """
+        tribe = self.current_tribe
+        decoded = self.action_space.decode(int(action), self.state, tribe)
+        if decoded is None or not self._advance(tribe, decoded):
+            return self.observe(), INVALID_ACTION_PENALTY, False, self._info(invalid=True)
+
+        if self.agent is not None:
+            self._play_opponents()
+            tribe = self.agent
+
+        reward = 0.0
+        done = self._finished() or self._truncated()
+        if self._finished() or not self.state.tribes[tribe].alive:
+            winner = GameRules.check_victory(self.state)
+            reward = 1.0 if winner == tribe else -1.0
+            done = True
+        return self.observe(), reward, done, self._info(truncated=self._truncated() and not self._finished())
+
+
+def _env_worker(conn, env_kwargs: dict, indices: list[int], obs_name: str, mask_name: str,
+                obs_shape: tuple, mask_shape: tuple) -> None:
+    """Run a slice of a VectorEnv's games, writing into shared buffers."""
+    obs_shm = shared_memory.SharedMemory(name=obs_name)
+    mask_shm = shared_memory.SharedMemory(name=mask_name)
+    obs = np.ndarray(obs_shape, dtype=np.float32, buffer=obs_shm.buf)
+    masks = np.ndarray(mask_shape, dtype=bool, buffer=mask_shm.buf)
+    envs = [GameEnv(**env_kwargs) for _ in indices]
+    try:
+        while True:
+            command, payload = conn.recv()
+            if command == "close":
+                break
+            if command == "reset":
+                for env, i, seed in zip(envs, indices, payload):
+                    env.reset(seed)
+                    env.observe(out=obs[i])
+                    masks[i] = env.action_mask()
+                conn.send(None)
+            elif command == "step":
+                results = [_step_env(env, action, obs, masks, i) for env, i, action in zip(envs, indices, payload)]
+                conn.send(results)
+    finally:
+        del obs, masks
+        obs_shm.close()
+        mask_shm.close()
+
+
+def _step_env(env: GameEnv, action: int, obs: np.ndarray, masks: np.ndarray, i: int) -> tuple:
+    """Step one game, auto-resetting it when done, and write its outputs to row i."""
+    _, reward, done, info = env.step(action)
+    truncated = info.get("truncated", False)
+    if done:
+        env.reset()
+    env.observe(out=obs[i])
+    masks[i] = env.action_mask()
+    return reward, done, truncated
+
+
+class VectorEnv:
+    """
+    N GameEnvs stepped in lockstep, with batched observations and masks.
+
+    With workers=0 all games run in this process; otherwise they are split
+    across worker processes that write observations and masks directly
+    into shared memory, so only actions, rewards and flags cross the pipe.
+    Finished games are reset automatically.
+    """
+
+    def __init__(self, num_envs: int, workers: int = 0, **env_kwargs):
+        self.num_envs = num_envs
+        self.workers = min(workers, num_envs)
+        self.env_kwargs = env_kwargs
+        template = GameEnv(**env_kwargs)
+        self.action_size = template.action_space.size
+        self.obs_shape = (num_envs,) + template.observation_shape
+        self.mask_shape = (num_envs, self.action_size)
+
+        self._envs: list[GameEnv] = []
+        self._shms: list[shared_memory.SharedMemory] = []
+        self._connections = []
+        self._processes = []
+
+        if self.workers == 0:
+            self.observations = np.zeros(self.obs_shape, dtype=np.float32)
+            self.masks = np.zeros(self.mask_shape, dtype=bool)
+            self._envs = [template] + [GameEnv(**env_kwargs) for _ in range(num_envs - 1)]
+            return
+
+        obs_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.obs_shape)) * 4)
+        mask_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.mask_shape)))
+        self._shms = [obs_shm, mask_shm]
+        self.observations = np.ndarray(self.obs_shape, dtype=np.float32, buffer=obs_shm.buf)
+        self.masks = np.ndarray(self.mask_shape, dtype=bool, buffer=mask_shm.buf)
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self._slices = [list(range(num_envs))[w::self.workers] for w in range(self.workers)]
+        for indices in self._slices:
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_env_worker,
+                args=(child_conn, env_kwargs, indices, obs_shm.name, mask_shm.name, self.obs_shape, self.mask_shape),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+
+    def reset(self, seed: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+        """Reset every game (game i gets seed + i). Returns (observations, masks)."""
+        seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        if self.workers == 0:
+            for i, env in enumerate(self._envs):
+                env.reset(seeds[i])
+                env.observe(out=self.observations[i])
+                self.masks[i] = env.action_mask()
+        else:
+            for conn, indices in zip(self._connections, self._slices):
+                conn.send(("reset", [seeds[i] for i in indices]))
+            for conn in self._connections:
+                conn.recv()
+        return self.observations, self.masks
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Step every game with its action index.
+
+        Returns (observations, rewards, dones, truncated, masks); the
+        observation and mask arrays are reused between calls.
+        """
+        actions = [int(a) for a in actions]
+        if self.workers == 0:
+            results = [_step_env(env, actions[i], self.observations, self.masks, i)
+                       for i, env in enumerate(self._envs)]
+        else:
+            for conn, indices in zip(self._connections, self._slices):
+                conn.send(("step", [actions[i] for i in indices]))
+            results = [None] * self.num_envs
+            for conn, indices in zip(self._connections, self._slices):
+                for i, result in zip(indices, conn.recv()):
+                    results[i] = result
+
+        rewards = np.array([r[0] for r in results], dtype=np.float32)
+        dones = np.array([r[1] for r in results], dtype=bool)
+        truncated = np.array([r[2] for r in results], dtype=bool)
+        return self.observations, rewards, dones, truncated, self.masks
+
+    def close(self) -> None:
+        for conn in self._connections:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        self._connections = []
+        self._processes = []
+
+        self.observations = None
+        self.masks = None
+        for shm in self._shms:
+            try:
+                shm.close()
+            except BufferError:
+                # Caller still holds views of the buffer; it is freed with them
+                pass
+            shm.unlink()
+        self._shms = []
+
+    def __enter__(self) -> "VectorEnv":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
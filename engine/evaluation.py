@@ -0,0 +1,238 @@
+"""
+Static position evaluation for search bots and reward shaping.
+
+Each tribe gets a weighted sum of features, measured in gold:
+
+    material        gold plus the cost of its units (UNIT_STATS) and buildings
+    income          gold per round from its workers on gold mines
+    territory       tiles owned
+    castle_threat   enemy combat strength able to reach its castle next turn
+    tower_coverage  owned tiles on or next to one of its towers
+
+Features are computed for a whole batch of states at once: the states
+are flattened into unit, building and tile arrays and aggregated with
+array operations over the map topology, so scoring thousands of
+successor states costs one pass of Python over their objects plus a few
+NumPy calls.
+
+    from evaluation import evaluate, evaluate_batch
+
+    evaluate(state, "RED")               # share of the position in [0, 1]
+    evaluate_batch(children, "RED")      # one share per state
+    tribe_scores(children)               # (N, tribes) raw weighted scores
+"""
+
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from schemas import (
+    BuildingType,
+    GameState,
+    TribeColor,
+    UnitType,
+    UNIT_STATS,
+    BUILDING_STATS,
+    GOLD_PER_WORKER,
+)
+from rules import GameRules
+from action_space import OWNER_CODES, tile_layout, topology_for
+
+
+TRIBES = list(TribeColor)
+NUM_TRIBES = len(TRIBES)
+TRIBE_INDEX = {tribe: i for i, tribe in enumerate(TRIBES)}
+UNIT_TYPES = list(UnitType)
+UNIT_INDEX = {unit_type: i for i, unit_type in enumerate(UNIT_TYPES)}
+BUILDING_TYPES = list(BuildingType)
+BUILDING_INDEX = {building_type: i for i, building_type in enumerate(BUILDING_TYPES)}
+
+FEATURES = ("material", "income", "territory", "castle_threat", "tower_coverage")
+
+DEFAULT_WEIGHTS = {
+    "material": 1.0,
+    "income": 5.0,  # a mine is worth about five rounds of its output
+    "territory": 5.0,
+    "castle_threat": -10.0,
+    "tower_coverage": 2.0,
+}
+
+UNIT_COSTS = np.array([UNIT_STATS[t]["cost"] for t in UNIT_TYPES], dtype=float)
+UNIT_STRENGTHS = np.array([UNIT_STATS[t]["strength"] for t in UNIT_TYPES], dtype=float)
+# Hexes from which a unit can attack next turn: move, then strike
+UNIT_THREAT_RANGE = np.array([
+    UNIT_STATS[t]["movement"] + (2 if t == UnitType.ARCHER else 1) for t in UNIT_TYPES
+])
+BUILDING_COSTS = np.array([BUILDING_STATS[b]["cost"] for b in BUILDING_TYPES], dtype=float)
+
+SHARE_TEMPERATURE = 200.0
+
+TribeLike = Union[TribeColor, str]
+
+
+def _tribe(tribe: TribeLike) -> TribeColor:
+    return tribe if isinstance(tribe, TribeColor) else TribeColor(tribe.upper())
+
+
+def feature_table(states: Sequence[GameState]) -> np.ndarray:
+    """Features for every state and tribe, shape (N, tribes, len(FEATURES))."""
+    count = len(states)
+    table = np.zeros((count, NUM_TRIBES, len(FEATURES)))
+    if count == 0:
+        return table
+    width, height = states[0].map.width, states[0].map.height
+    topology = topology_for(width, height)
+    hexes = topology.num_hexes
+
+    # Flatten objects into parallel arrays tagged with their state
+    unit_state, unit_tribe, unit_type, unit_hex = [], [], [], []
+    building_state, building_tribe, building_type, building_hex = [], [], [], []
+    gold = np.zeros((count, NUM_TRIBES))
+    income = np.zeros((count, NUM_TRIBES))
+    owners = np.full((count, hexes), OWNER_CODES[None], dtype=np.int8)
+
+    for i, state in enumerate(states):
+        for tribe, tribe_state in state.tribes.items():
+            gold[i, TRIBE_INDEX[tribe]] = tribe_state.gold
+
+        workers = {}
+        for unit in state.units:
+            q, r = unit.position
+            unit_state.append(i)
+            unit_tribe.append(TRIBE_INDEX[unit.tribe])
+            unit_type.append(UNIT_INDEX[unit.type])
+            unit_hex.append(r * width + q)
+            if unit.type == UnitType.WORKER:
+                workers[unit.id] = unit.tribe
+
+        for building in state.buildings:
+            q, r = building.position
+            building_state.append(i)
+            building_tribe.append(TRIBE_INDEX[building.tribe])
+            building_type.append(BUILDING_INDEX[building.type])
+            building_hex.append(r * width + q)
+
+        # As in GameRules.collect_income
+        for mine in state.gold_mines:
+            worker_tribe = workers.get(mine.worker_id)
+            if worker_tribe is not None:
+                income[i, TRIBE_INDEX[worker_tribe]] += GOLD_PER_WORKER
+
+        tiles = state.map.tiles
+        layout = tile_layout(state, topology)
+        owner = np.fromiter((OWNER_CODES[t.owner] for t in tiles), dtype=np.int8, count=len(tiles))
+        owners[i, layout.hexes] = owner[layout.inside] if layout.outside else owner
+
+    unit_state = np.array(unit_state, dtype=np.intp)
+    unit_tribe = np.array(unit_tribe, dtype=np.intp)
+    unit_type = np.array(unit_type, dtype=np.intp)
+    unit_hex = np.array(unit_hex, dtype=np.intp)
+    building_state = np.array(building_state, dtype=np.intp)
+    building_tribe = np.array(building_tribe, dtype=np.intp)
+    building_type = np.array(building_type, dtype=np.intp)
+    building_hex = np.array(building_hex, dtype=np.intp)
+
+    slots = count * NUM_TRIBES
+    unit_slot = unit_state * NUM_TRIBES + unit_tribe
+    building_slot = building_state * NUM_TRIBES + building_tribe
+
+    material = (
+        gold.ravel()
+        + np.bincount(unit_slot, weights=UNIT_COSTS[unit_type], minlength=slots)
+        + np.bincount(building_slot, weights=BUILDING_COSTS[building_type], minlength=slots)
+    )
+
+    owned = owners.astype(np.intp)
+    owned_slot = (np.arange(count)[:, None] * NUM_TRIBES + owned)[owned >= 0]
+    territory = np.bincount(owned_slot, minlength=slots)
+
+    # Strength each tribe can bring next turn to each hex holding a castle:
+    # (N * tribes, castle hexes); the starting castles share a few hexes
+    castle = building_type == BUILDING_INDEX[BuildingType.CASTLE]
+    castle_state = building_state[castle]
+    castle_tribe = building_tribe[castle]
+    castle_hexes, castle_column = np.unique(building_hex[castle], return_inverse=True)
+    reach = np.zeros((slots, len(castle_hexes)))
+    combat = UNIT_STRENGTHS[unit_type] > 0
+    if combat.any() and len(castle_hexes):
+        distance = topology.distance[np.ix_(unit_hex[combat], castle_hexes)]
+        in_range = distance <= UNIT_THREAT_RANGE[unit_type[combat], None]
+        np.add.at(reach, unit_slot[combat], in_range * UNIT_STRENGTHS[unit_type[combat], None])
+    reach = reach.reshape(count, NUM_TRIBES, len(castle_hexes))
+
+    # Enemy strength at a castle = everyone's strength there minus its owner's
+    enemy_reach = (
+        reach.sum(axis=1)[castle_state, castle_column]
+        - reach[castle_state, castle_tribe, castle_column]
+    )
+    castle_threat = np.bincount(
+        castle_state * NUM_TRIBES + castle_tribe, weights=enemy_reach, minlength=slots
+    )
+
+    # Tower coverage: own towers marked per (state, tribe, hex), spread to neighbours
+    tower = building_type == BUILDING_INDEX[BuildingType.TOWER]
+    towers = np.zeros((slots, hexes + 1), dtype=bool)
+    towers[building_slot[tower], building_hex[tower]] = True
+    covered = towers[:, :hexes] | towers[:, topology.neighbors].any(axis=2)
+    covered = covered.reshape(count, NUM_TRIBES, hexes)
+    tribe_codes = np.arange(NUM_TRIBES)[None, :, None]
+    tower_coverage = (covered & (owned[:, None, :] == tribe_codes)).sum(axis=2)
+
+    table[:, :, 0] = material.reshape(count, NUM_TRIBES)
+    table[:, :, 1] = income
+    table[:, :, 2] = territory.reshape(count, NUM_TRIBES)
+    table[:, :, 3] = castle_threat.reshape(count, NUM_TRIBES)
+    table[:, :, 4] = tower_coverage
+    return table
+
+
+def _weight_vector(weights: Optional[dict]) -> np.ndarray:
+    merged = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    return np.array([merged[name] for name in FEATURES])
+
+
+def tribe_scores(states: Sequence[GameState], weights: Optional[dict] = None) -> np.ndarray:
+    """Weighted score per state and tribe, shape (N, tribes); eliminated tribes score 0."""
+    scores = feature_table(states) @ _weight_vector(weights)
+    alive = np.array([[state.tribes[tribe].alive for tribe in TRIBES] for state in states], dtype=bool)
+    return np.where(alive.reshape(scores.shape), scores, 0.0)
+
+
+def evaluate_batch(
+    states: Sequence[GameState],
+    tribe: Optional[TribeLike] = None,
+    weights: Optional[dict] = None,
+) -> np.ndarray:
+    """
+    Each tribe's share of the position, in [0, 1].
+
+    The winner of a finished game gets 1 and eliminated tribes 0;
+    otherwise shares are a softmax of the scores with a temperature of
+    SHARE_TEMPERATURE gold, so they stay ordered even when a score goes
+    negative. Returns (N, tribes), or (N,) for one tribe.
+    """
+    states = list(states)
+    scores = tribe_scores(states, weights)
+    alive = np.array([[state.tribes[t].alive for t in TRIBES] for state in states], dtype=bool)
+    alive = alive.reshape(scores.shape)
+
+    logits = np.where(alive, scores / SHARE_TEMPERATURE, -np.inf)
+    logits -= logits.max(axis=1, keepdims=True, initial=-np.inf, where=alive)
+    shares = np.exp(logits)
+    shares /= shares.sum(axis=1, keepdims=True)
+
+    for i, state in enumerate(states):
+        winner = GameRules.check_victory(state)
+        if winner is not None:
+            shares[i] = 0.0
+            shares[i, TRIBE_INDEX[winner]] = 1.0
+
+    if tribe is None:
+        return shares
+    return shares[:, TRIBE_INDEX[_tribe(tribe)]]
+
+
+def evaluate(state: GameState, tribe: Optional[TribeLike] = None, weights: Optional[dict] = None):
+    """evaluate_batch for one state: a share per tribe, or a float for one tribe."""
+    shares = evaluate_batch([state], tribe, weights)[0]
+    return float(shares) if tribe is not None else shares
@@ -0,0 +1,304 @@
+"""
+Event-sourced game state: an append-only event log plus periodic snapshots.
+
+    <directory>/
+        index.json                  interval, event count, version, log size, snapshots
+        events.jsonl                one event per line, in order
+        snapshots/00000040.json     full state after 40 events
+
+Events are the ones GameStateManager records when its `events` list is
+enabled: an "action" event carries the action and the diff changes it
+produced (unit_moved, unit_killed, gold_spent, income_collected, ...),
+a "skip" event the changes of a skipped turn, and an "applied" event a
+source key marked with mark_applied.
+
+The log is kept alongside the state file, which remains what `run`
+loads and saves: a turn's events are appended only after the state file
+has been saved, so the log never holds a turn the state file lacks.
+
+The state after any number of events is rebuilt by folding the events
+that follow the nearest snapshot onto it. Folding only replays recorded
+changes, so combat outcomes come from the log, not from the dice, and
+unlike a CheckpointStore (which re-rolls combat and needs a seed) any
+game can be rebuilt at any turn.
+"""
+
+import os
+import json
+import bisect
+from pathlib import Path
+from typing import Optional
+
+from schemas import (
+    ActionType,
+    Building,
+    BuildingType,
+    BUILDING_STATS,
+    GameAction,
+    GameState,
+    GameStatus,
+    TribeColor,
+    Unit,
+    UnitType,
+)
+from state import GameStateManager, StateLock, StaleStateError, remember_applied
+from checkpoints import _write_json_atomic
+
+
+DEFAULT_INTERVAL = 50
+
+
+def fold_change(state: GameState, change: dict) -> None:
+    """Apply one diff change entry to a state, as apply_action did when it produced it."""
+    kind = change["type"]
+    if kind == "unit_moved":
+        unit = state.get_unit(change["unit_id"])
+        unit.position = tuple(change["to"])
+        # Moving stops harvesting
+        if unit.harvesting is not None:
+            mine = state.get_mine(unit.harvesting)
+            if mine:
+                mine.worker_id = None
+            unit.harvesting = None
+    elif kind in ("unit_killed", "unit_consumed"):
+        state.units = [u for u in state.units if u.id != change["unit_id"]]
+    elif kind == "building_created":
+        building_type = BuildingType(change["building_type"])
+        state.buildings.append(Building(
+            id=change["building_id"],
+            tribe=TribeColor(change["tribe"]),
+            type=building_type,
+            position=tuple(change["position"]),
+            hp=BUILDING_STATS[building_type]["hp"],
+        ))
+    elif kind == "unit_trained":
+        state.units.append(Unit(
+            id=change["unit_id"],
+            tribe=TribeColor(change["tribe"]),
+            type=UnitType(change["unit_type"]),
+            position=tuple(change["position"]),
+            can_act=False,
+        ))
+    elif kind == "gold_spent":
+        state.tribes[TribeColor(change["tribe"])].gold -= change["amount"]
+    elif kind == "income_collected":
+        state.tribes[TribeColor(change["tribe"])].gold += change["amount"]
+    elif kind == "harvest_started":
+        state.get_unit(change["unit_id"]).harvesting = change["mine_id"]
+        state.get_mine(change["mine_id"]).worker_id = change["unit_id"]
+    elif kind == "territory_expanded":
+        q, r = change["position"]
+        state.map.set_tile_owner(q, r, TribeColor(change["tribe"]))
+    elif kind == "tribe_eliminated":
+        tribe = TribeColor(change["tribe"])
+        state.tribes[tribe].alive = False
+        state.units = [u for u in state.units if u.tribe != tribe]
+    elif kind == "game_over":
+        state.status = GameStatus.FINISHED
+    elif kind == "turn_advanced":
+        if change["turn"] > state.turn:
+            for unit in state.units:
+                unit.can_act = True
+        state.turn = change["turn"]
+        state.current_tribe = TribeColor(change["current_tribe"])
+    elif kind != "combat":
+        raise ValueError(f"Unknown change type: {kind}")
+
+
+def history_entry(state: GameState, event: dict) -> GameAction:
+    """The history entry apply_action recorded for an "action" event, on the state before it."""
+    return GameAction(
+        turn=state.turn,
+        tribe=TribeColor(event["tribe"]),
+        action=ActionType(event["action"]["action"]),
+        details=event["action"],
+        continues_turn=event.get("continuesTurn", False),
+    )
+
+
+def fold(state: GameState, event: dict) -> None:
+    """Apply one recorded event to a state."""
+    kind = event["event"]
+    if kind == "applied":
+        remember_applied(state.applied, event["key"], event["diff"])
+        return
+    if kind == "action":
+        state.history.append(history_entry(state, event))
+    elif kind != "skip":
+        raise ValueError(f"Unknown event type: {kind}")
+    for change in event["changes"]:
+        fold_change(state, change)
+    state.version += 1
+
+
+class EventStore:
+    """Event log and snapshots for one game."""
+
+    def __init__(self, directory: str, interval: int = DEFAULT_INTERVAL):
+        self.directory = Path(directory)
+        self.snapshot_dir = self.directory / "snapshots"
+        self.log_path = self.directory / "events.jsonl"
+        self.index_path = self.directory / "index.json"
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+        self.interval = interval
+        self.event_count = 0
+        self.version: Optional[int] = None
+        self.log_size = 0
+        self.snapshots: list[list[int]] = []  # [event count, log offset]
+        self._read_index()
+
+    def _read_index(self) -> None:
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "r") as f:
+            index = json.load(f)
+        self.interval = index["interval"]
+        self.event_count = index["events"]
+        self.version = index["version"]
+        self.log_size = index["logSize"]
+        self.snapshots = index["snapshots"]
+
+    def _save_index(self) -> None:
+        _write_json_atomic(self.index_path, {
+            "interval": self.interval,
+            "events": self.event_count,
+            "version": self.version,
+            "logSize": self.log_size,
+            "snapshots": self.snapshots,
+        })
+
+    def _snapshot_path(self, count: int) -> Path:
+        return self.snapshot_dir / f"{count:08d}.json"
+
+    def _write_snapshot(self, state: GameState) -> None:
+        _write_json_atomic(self._snapshot_path(self.event_count), state.to_dict(include_seed=True))
+        self.snapshots.append([self.event_count, self.log_size])
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def start(self, state: GameState) -> None:
+        """Begin the log with a snapshot of the state it starts from."""
+        with StateLock(str(self.log_path)):
+            self._read_index()
+            if self.snapshots:
+                raise ValueError(f"Event store {self.directory} is already started")
+            open(self.log_path, "wb").close()
+            self.version = state.version
+            self._write_snapshot(state)
+            self._save_index()
+
+    def _check_base(self, manager: GameStateManager, events: list[dict]) -> None:
+        base_version = manager.state.version - sum(1 for e in events if e["event"] != "applied")
+        if self.version != base_version:
+            raise StaleStateError(
+                f"{self.log_path}: log is at version {self.version}, "
+                f"events were recorded from version {base_version}"
+            )
+
+    def check(self, manager: GameStateManager) -> None:
+        """
+        Raise StaleStateError if append(manager) would be rejected, without
+        writing anything. Lets a caller refuse a turn before saving it.
+        """
+        events = manager.events or []
+        if not events:
+            return
+        self._read_index()
+        self._check_base(manager, events)
+
+    def append(self, manager: GameStateManager) -> int:
+        """
+        Append the events the manager recorded since the last append, and
+        write a snapshot when the event count passes a multiple of the
+        interval. Clears manager.events. Returns the number of events written.
+
+        Raises StaleStateError if the log has moved on from the version the
+        manager started from (another writer appended in between).
+        """
+        events = manager.events or []
+        if not events:
+            return 0
+
+        with StateLock(str(self.log_path)):
+            self._read_index()
+            if not self.snapshots:
+                raise ValueError(f"Event store {self.directory} has no snapshot; call start() first")
+            self._check_base(manager, events)
+
+            with open(self.log_path, "a+b") as f:
+                # Drop a tail left by an append that failed before updating the index
+                f.truncate(self.log_size)
+                for event in events:
+                    f.write((json.dumps(event, separators=(",", ":")) + "\n").encode())
+                f.flush()
+                os.fsync(f.fileno())
+                self.log_size = f.tell()
+
+            previous = self.event_count
+            self.event_count += len(events)
+            self.version = manager.state.version
+            if self.event_count // self.interval > previous // self.interval:
+                self._write_snapshot(manager.state)
+            self._save_index()
+
+        manager.events = []
+        return len(events)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def load(self, events: Optional[int] = None) -> GameStateManager:
+        """
+        Rebuild the state after a number of events (default: all of them).
+        The returned manager records new events, ready for append().
+        """
+        self._read_index()
+        if not self.snapshots:
+            raise ValueError(f"Event store {self.directory} is empty")
+        target = self.event_count if events is None else events
+        if not 0 <= target <= self.event_count:
+            raise ValueError(f"Event {target} out of range (log has {self.event_count})")
+
+        pos = bisect.bisect_right([count for count, _ in self.snapshots], target) - 1
+        count, offset = self.snapshots[pos]
+        with open(self._snapshot_path(count), "r") as f:
+            state = GameState.from_dict(json.load(f))
+
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            for _ in range(target - count):
+                fold(state, json.loads(f.readline()))
+
+        manager = GameStateManager.from_state(state)
+        manager.events = []
+        return manager
+
+    def seek(self, events: int) -> GameState:
+        """Return the state after a number of events."""
+        return self.load(events).state
+
+    def seek_turn(self, turn: int) -> GameState:
+        """Return the state at the start of `turn` (before any of its actions)."""
+        self._read_index()
+        if not self.snapshots:
+            raise ValueError(f"Event store {self.directory} is empty")
+        with open(self._snapshot_path(self.snapshots[0][0]), "r") as f:
+            current = json.load(f)["turn"]
+        if turn < current:
+            raise ValueError(f"Turn {turn} is before the start of the log (turn {current})")
+
+        count = 0
+        with open(self.log_path, "rb") as f:
+            for _ in range(self.event_count):
+                event = json.loads(f.readline())
+                if event["event"] != "applied" and current >= turn:
+                    break
+                for change in event.get("changes", []):
+                    if change["type"] == "turn_advanced":
+                        current = change["turn"]
+                count += 1
+        return self.seek(count)
@@ -0,0 +1,311 @@
+"""
+Depth-limited expectimax searcher with exact chance nodes for combat.
+
+A tactical opponent that fits in a short turn budget. Each ply is one
+tribe's action. The searching tribe maximises its evaluation and, as in
+paranoid search, every other tribe is assumed to minimise it. An ATTACK
+is a chance node: GameRules.attack_win_probability gives the exact odds
+over the 36 dice outcomes, and both outcomes are searched by applying
+the attack with fixed dice, then weighted by those odds.
+
+    from expectimax import make_strategy
+
+    get_action = make_strategy(time_budget=1.0)
+
+The search deepens iteratively until the time budget runs out and plays
+the best move of the deepest completed iteration. Decision nodes use
+alpha-beta with a transposition table (keyed on the state, not the
+path) and move ordering: the table's best move first, then attacks by
+descending win odds, then training, harvesting, settling, building and
+moving. Below the root only the first max_moves ordered actions are
+searched, and at the last ply every successor is scored in one
+evaluation.evaluate_batch call.
+"""
+
+import time
+from collections.abc import Mapping
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from schemas import Action, ActionType, GameState, GameStatus, TribeColor
+from state import GameStateManager
+from rules import GameRules
+from action_space import ActionSpace, SEGMENT_TYPES
+from evaluation import evaluate, evaluate_batch
+
+
+TRIBES = list(TribeColor)
+
+DEFAULT_TIME_BUDGET = 1.0
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_MAX_MOVES = 12
+
+# Transposition table bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Move ordering after attacks (lower sorts first)
+TYPE_ORDER = {
+    ActionType.ATTACK: 0,
+    ActionType.TRAIN: 1,
+    ActionType.HARVEST: 2,
+    ActionType.SETTLE: 3,
+    ActionType.BUILD: 4,
+    ActionType.MOVE: 5,
+}
+SEGMENT_ORDER = np.array([TYPE_ORDER[t] for t in SEGMENT_TYPES])
+
+# Marks a turn passed because the tribe had no legal action
+SKIP = -1
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out."""
+    pass
+
+
+class FixedDice:
+    """Stands in for an RNG so apply_action resolves combat with chosen rolls."""
+
+    def __init__(self, attacker_roll: int, defender_roll: int):
+        self._rolls = [attacker_roll, defender_roll]
+
+    def randint(self, a: int, b: int) -> int:
+        return self._rolls.pop(0)
+
+
+def outcome_rolls(attacker_strength: int, defender_strength: int, attacker_wins: bool) -> Optional[tuple[int, int]]:
+    """A pair of dice producing the given combat outcome, or None if it cannot happen."""
+    for attacker_roll in range(1, 7):
+        for defender_roll in range(1, 7):
+            if (attacker_strength + attacker_roll > defender_strength + defender_roll) == attacker_wins:
+                return attacker_roll, defender_roll
+    return None
+
+
+def state_key(state: GameState) -> int:
+    """Hash of everything that affects play (positions, gold, ownership, turn order)."""
+    return hash((
+        state.current_tribe,
+        state.status,
+        tuple((u.id, u.tribe, u.type, u.position, u.can_act) for u in state.units),
+        tuple((b.id, b.tribe, b.type, b.position) for b in state.buildings),
+        tuple((t, s.gold, s.alive) for t, s in state.tribes.items()),
+        tuple(g.worker_id for g in state.gold_mines),
+        tuple(t.owner for t in state.map.tiles),
+    ))
+
+
+class Expectimax:
+    """Iterative-deepening paranoid expectimax over ActionSpace indices."""
+
+    def __init__(
+        self,
+        time_budget: Optional[float] = DEFAULT_TIME_BUDGET,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_moves: Optional[int] = DEFAULT_MAX_MOVES,
+    ):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.max_moves = max_moves
+        self.space: Optional[ActionSpace] = None
+        self.last_stats: dict = {}
+
+        self._table: dict[int, tuple] = {}
+        self._deadline: Optional[float] = None
+        self._player = 0
+        self._nodes = 0
+        self._table_hits = 0
+
+    def search(self, state: GameState) -> Optional[Action]:
+        """Best action for the tribe to move, or None if it has no legal action."""
+        if self.space is None or (self.space.width, self.space.height) != (state.map.width, state.map.height):
+            self.space = ActionSpace.for_state(state)
+        manager = GameStateManager.from_state(state.clone())
+        moves = self._ordered_moves(manager.state, None)
+        if moves == [SKIP]:
+            return None
+
+        started = time.perf_counter()
+        self._deadline = started + self.time_budget if self.time_budget is not None else None
+        self._player = TRIBES.index(state.current_tribe)
+        self._table = {}
+        self._nodes = self._table_hits = 0
+
+        best, value, depth = moves[0], None, 0
+        for target in range(1, self.max_depth + 1):
+            try:
+                value, move = self._decision(manager, target, -np.inf, np.inf, root=True)
+            except SearchTimeout:
+                break
+            best, depth = move, target
+
+        seconds = time.perf_counter() - started
+        self.last_stats = {
+            "depth": depth,
+            "value": float(value) if value is not None else None,
+            "nodes": self._nodes,
+            "table_hits": self._table_hits,
+            "seconds": seconds,
+        }
+        return self.space.decode(best, state, state.current_tribe)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _check_time(self) -> None:
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+
+    def _ordered_moves(self, state: GameState, first: Optional[int]) -> list[int]:
+        """Legal indices in search order (SKIP if there are none)."""
+        legal = np.flatnonzero(self.space.legal_mask(state, state.current_tribe))
+        if len(legal) == 0:
+            return [SKIP]
+
+        segments = self.space.segments(legal)
+        odds = np.zeros(len(legal))
+        tribe = state.current_tribe
+        for i in np.flatnonzero(segments == SEGMENT_TYPES.index(ActionType.ATTACK)):
+            action = self.space.decode(int(legal[i]), state, tribe)
+            attacker, defender = state.get_unit(action.unit_id), state.get_unit(action.target_id)
+            ranged = GameRules.hex_distance(attacker.position, defender.position) > 1
+            odds[i] = GameRules.attack_win_probability(attacker, defender, state, ranged)
+
+        order = np.lexsort((legal, -odds, SEGMENT_ORDER[segments]))
+        moves = legal[order].tolist()
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def _leaf(self, state: GameState) -> float:
+        return evaluate(state, TRIBES[self._player])
+
+    def _decision(self, manager: GameStateManager, depth: int, alpha: float, beta: float,
+                  root: bool = False) -> tuple[float, int]:
+        """Value and best move at a decision node (max for the searching tribe, min otherwise)."""
+        self._check_time()
+        self._nodes += 1
+        state = manager.state
+        if depth == 0 or state.status == GameStatus.FINISHED:
+            return self._leaf(state), SKIP
+
+        key = state_key(state)
+        entry = self._table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, entry_value, bound, first = entry
+            # The root always searches, so each iteration returns a move it explored
+            if entry_depth >= depth and not root:
+                if (bound == EXACT
+                        or (bound == LOWER and entry_value >= beta)
+                        or (bound == UPPER and entry_value <= alpha)):
+                    self._table_hits += 1
+                    return entry_value, first
+
+        maximizing = TRIBES.index(state.current_tribe) == self._player
+        moves = self._ordered_moves(state, first)
+        if not root and self.max_moves is not None:
+            moves = moves[:self.max_moves]
+
+        original_alpha, original_beta = alpha, beta
+        best_value = -np.inf if maximizing else np.inf
+        best_move = moves[0]
+        if depth == 1:
+            # Frontier: score every successor in one batch instead of pruning
+            values = self._frontier_values(manager, moves)
+        else:
+            values = (self._child(manager, move, depth - 1, alpha, beta) for move in moves)
+        for move, value in zip(moves, values):
+            if maximizing:
+                if value > best_value:
+                    best_value, best_move = value, move
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best_move = value, move
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            bound = UPPER
+        elif best_value >= original_beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self._table[key] = (depth, best_value, bound, best_move)
+        return best_value, best_move
+
+    def _outcomes(self, manager: GameStateManager, move: int) -> list[tuple[float, GameStateManager]]:
+        """Successor states of a move with their probabilities (two for a contested attack)."""
+        state = manager.state
+        tribe = state.current_tribe
+        child = manager.clone()
+        if move == SKIP:
+            child.skip_turn()
+            return [(1.0, child)]
+
+        action = self.space.decode(move, state, tribe)
+        if action.action != ActionType.ATTACK:
+            child.apply_action(tribe, action, validated=True)
+            return [(1.0, child)]
+
+        attacker, defender = state.get_unit(action.unit_id), state.get_unit(action.target_id)
+        ranged = GameRules.hex_distance(attacker.position, defender.position) > 1
+        strengths = GameRules.combat_strengths(attacker, defender, state, ranged)
+        win = GameRules.attack_win_probability(attacker, defender, state, ranged)
+
+        outcomes = []
+        for attacker_wins, probability in ((True, win), (False, 1.0 - win)):
+            if probability == 0:
+                continue
+            dice = FixedDice(*outcome_rolls(*strengths, attacker_wins))
+            child = manager.clone() if outcomes else child
+            child.apply_action(tribe, action, validated=True, rng=dice)
+            outcomes.append((probability, child))
+        return outcomes
+
+    def _child(self, manager: GameStateManager, move: int, depth: int, alpha: float, beta: float) -> float:
+        """Value after playing move; attacks average over both combat outcomes."""
+        outcomes = self._outcomes(manager, move)
+        if len(outcomes) == 1:
+            return self._decision(outcomes[0][1], depth, alpha, beta)[0]
+        # Chance node: children are searched with a full window so the
+        # weighted sum is exact
+        return sum(probability * self._decision(child, depth, -np.inf, np.inf)[0] for probability, child in outcomes)
+
+    def _frontier_values(self, manager: GameStateManager, moves: list[int]) -> list[float]:
+        """Expected leaf value of each move, evaluating all successors in one batch."""
+        groups = [self._outcomes(manager, move) for move in moves]
+        self._check_time()
+        states = [child.state for group in groups for _, child in group]
+        self._nodes += len(states)
+        leaf_values = evaluate_batch(states, TRIBES[self._player])
+
+        values = []
+        position = 0
+        for group in groups:
+            values.append(sum(probability * leaf_values[position + i] for i, (probability, _) in enumerate(group)))
+            position += len(group)
+        return values
+
+
+def make_strategy(**kwargs) -> Callable[[Union[Mapping, GameState]], Optional[dict]]:
+    """
+    A get_action(gamestate) function backed by one Expectimax instance.
+
+    Keyword arguments are passed to Expectimax. The searcher is available
+    as get_action.searcher (e.g. for last_stats).
+    """
+    searcher = Expectimax(**kwargs)
+
+    def get_action(gamestate: Union[Mapping, GameState]) -> Optional[dict]:
+        state = gamestate if isinstance(gamestate, GameState) else GameState.from_dict(gamestate)
+        action = searcher.search(state)
+        return action.to_dict() if action is not None else None
+
+    get_action.searcher = searcher
+    return get_action
@@ -313,6 +313,18 @@ def get_action(gamestate: dict) -> dict:
     pass
 ```
 
+Use the helper SDK instead of scanning the unit lists by hand:
+
+```python
+from strategy_sdk import GameView
+
+game = GameView(gamestate, "{tribe}")
+game.my_units, game.my_castle, game.units(unit_type="WORKER")
+game.nearest_enemy(unit), game.attack_targets(unit)
+game.reachable(unit)            # tiles this unit can legally MOVE to
+game.step_toward(unit, target)  # best reachable tile toward a target
+```
+
 **REMINDER: Only edit `tribes/{tribe_lower}/strategy.py`. Do not touch any other files.**
 
 Make ONE strategic move that advances your position!
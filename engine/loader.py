@@ -0,0 +1,50 @@
+"""
+Strategy module discovery and loading.
+"""
+
+import importlib.util
+from pathlib import Path
+from typing import Optional
+
+from schemas import TribeColor
+
+
+def find_strategy_path(tribe: TribeColor) -> Optional[Path]:
+    """Locate a tribe's strategy.py, or None if it cannot be found."""
+    # Try both relative paths (from engine/ and from project root)
+    paths_to_try = [
+        Path(f"../tribes/{tribe.value.lower()}/strategy.py"),  # From engine/
+        Path(f"tribes/{tribe.value.lower()}/strategy.py"),     # From project root
+    ]
+
+    for path in paths_to_try:
+        if path.exists():
+            return path
+
+    print(f"Error: Strategy file not found. Tried: {', '.join(str(p) for p in paths_to_try)}")
+    return None
+
+
+def load_strategy_from_path(strategy_path: Path, tribe: TribeColor) -> Optional[callable]:
+    """Execute a strategy module and return its get_action function."""
+    try:
+        spec = importlib.util.spec_from_file_location(f"{tribe.value}_strategy", strategy_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        if not hasattr(module, "get_action"):
+            print(f"Error: Strategy file missing get_action function")
+            return None
+
+        return module.get_action
+    except Exception as e:
+        print(f"Error loading strategy: {e}")
+        return None
+
+
+def load_strategy(tribe: TribeColor) -> Optional[callable]:
+    """Load a tribe's strategy module and return the get_action function."""
+    strategy_path = find_strategy_path(tribe)
+    if not strategy_path:
+        return None
+    return load_strategy_from_path(strategy_path, tribe)
@@ -0,0 +1,391 @@
+"""
+Local stand-in for the GitHub Actions turn loop.
+
+Reproduces validate-move.yml -> auto-merge.yml -> apply-move.yml against
+a local workspace laid out like the repository (data/gamestate.json and
+tribes/<color>/strategy.py), so the pipeline can be profiled without
+spending Actions minutes or waiting on GitHub. Each turn goes through:
+
+    provide   a strategy provider writes the tribe's strategy.py
+              (stands in for the Jules session and its PR)
+    validate  main.py resolve, as in validate-move.yml
+    merge     commit the strategy, as auto-merge.yml's squash merge
+    apply     main.py run --record, as in apply-move.yml
+    commit    commit the game state, event log, archive and diff.json
+
+and then triggers the next tribe by reading currentTribe from the new
+state. The engine commands run as subprocesses from <workspace>/engine
+with the same arguments as the workflows, so process start-up and
+module imports count toward the measured latency. Commits are only made
+if the workspace is a git repository.
+
+    python local_pipeline.py --workspace /tmp/game --new-game local_001 --seed 7 \\
+        --provider dir:../tribes --turns 40 --stats pipeline_stats.json
+
+A provider is a StrategyProvider (DirectoryProvider, GitProvider) or any
+callable (tribe, gamestate_dict) -> strategy source.
+"""
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from schemas import GameStatus, TribeColor
+
+
+ENGINE_MAIN = Path(__file__).resolve().parent / "main.py"
+STATE_PATH = "data/gamestate.json"
+PHASES = ("provide", "validate", "merge", "apply", "commit")
+
+# What apply-move.yml stages after a turn, verbatim: a path missing here
+# would fail its `git add` too
+APPLY_PATHS = ("data/gamestate.json", "data/events", "data/history", "data/patches", "diff.json")
+
+
+class PipelineError(Exception):
+    """Raised when the workspace or a pipeline step cannot be used."""
+    pass
+
+
+# ----------------------------------------------------------------------
+# Strategy providers
+# ----------------------------------------------------------------------
+
+class StrategyProvider(ABC):
+    """Produces the strategy source a tribe submits for a turn."""
+
+    @abstractmethod
+    def strategy_source(self, tribe: TribeColor, gamestate: dict) -> str:
+        """Source of tribes/<color>/strategy.py for this turn."""
+
+    def __call__(self, tribe: TribeColor, gamestate: dict) -> str:
+        return self.strategy_source(tribe, gamestate)
+
+
+class DirectoryProvider(StrategyProvider):
+    """Reads <directory>/<color>/strategy.py (or <directory>/<color>.py) on every turn."""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+
+    def strategy_source(self, tribe: TribeColor, gamestate: dict) -> str:
+        color = tribe.value.lower()
+        for path in (self.directory / color / "strategy.py", self.directory / f"{color}.py"):
+            if path.exists():
+                return path.read_text()
+        raise PipelineError(f"No strategy for {tribe.value} in {self.directory}")
+
+
+class GitProvider(StrategyProvider):
+    """
+    Reads tribes/<color>/strategy.py at a revision of a local git repository.
+
+    ref may contain {tribe} (the lower-case color), e.g. "jules/{tribe}"
+    for one branch per tribe.
+    """
+
+    def __init__(self, repository: Union[str, Path], ref: str = "HEAD"):
+        self.repository = Path(repository)
+        self.ref = ref
+
+    def strategy_source(self, tribe: TribeColor, gamestate: dict) -> str:
+        color = tribe.value.lower()
+        revision = self.ref.format(tribe=color)
+        result = subprocess.run(
+            ["git", "show", f"{revision}:tribes/{color}/strategy.py"],
+            cwd=self.repository, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise PipelineError(f"git show {revision} failed: {result.stderr.strip()}")
+        return result.stdout
+
+
+ProviderLike = Union[StrategyProvider, Callable[[TribeColor, dict], str]]
+
+
+def provider_from_spec(spec: str) -> StrategyProvider:
+    """Parse a --provider value: dir:<path> or git:<repository>[@<ref>]."""
+    kind, _, target = spec.partition(":")
+    if kind == "dir" and target:
+        return DirectoryProvider(target)
+    if kind == "git" and target:
+        repository, _, ref = target.partition("@")
+        return GitProvider(repository, ref or "HEAD")
+    raise PipelineError(f"Unknown provider: {spec} (expected dir:<path> or git:<repository>[@<ref>])")
+
+
+# ----------------------------------------------------------------------
+# Results
+# ----------------------------------------------------------------------
+
+@dataclass
+class TurnResult:
+    """Outcome and per-phase timings of one pass through the pipeline."""
+    turn: int
+    tribe: TribeColor
+    success: bool
+    phases: dict = field(default_factory=dict)
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "turn": self.turn,
+            "tribe": self.tribe.value,
+            "success": self.success,
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "seconds": round(self.seconds, 6),
+            "error": self.error,
+        }
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(results: list[TurnResult], seconds: float) -> dict:
+    """Latency and throughput over a run (latency covers applied turns only)."""
+    applied = [r for r in results if r.success]
+    latencies = [r.seconds for r in applied]
+    summary = {
+        "turns": len(applied),
+        "rejected": len(results) - len(applied),
+        "seconds": round(seconds, 3),
+        "turns_per_minute": round(len(applied) * 60 / seconds, 3) if seconds > 0 else 0.0,
+    }
+    if latencies:
+        summary["latency"] = {
+            "mean": round(sum(latencies) / len(latencies), 4),
+            "p50": round(_percentile(latencies, 0.5), 4),
+            "p95": round(_percentile(latencies, 0.95), 4),
+            "max": round(max(latencies), 4),
+        }
+        summary["phases"] = {
+            name: round(sum(r.phases.get(name, 0.0) for r in applied) / len(applied), 4)
+            for name in PHASES
+        }
+    return summary
+
+
+# ----------------------------------------------------------------------
+# Pipeline
+# ----------------------------------------------------------------------
+
+class LocalPipeline:
+    """Runs tribe turns through the validate -> merge -> apply loop in a workspace."""
+
+    def __init__(
+        self,
+        workspace: Union[str, Path],
+        provider: ProviderLike,
+        sandbox: bool = False,
+        cache_dir: Optional[str] = None,
+        python: str = sys.executable,
+        git: Optional[bool] = None,
+    ):
+        self.workspace = Path(workspace).resolve()
+        self.provider = provider
+        self.sandbox = sandbox
+        self.cache_dir = cache_dir
+        self.python = python
+        self.git = (self.workspace / ".git").exists() if git is None else git
+        self.results: list[TurnResult] = []
+
+        # The workflows run the engine from engine/ with ../ paths; a fresh
+        # directory gives the strategy loader the same view of the workspace
+        self.workdir = self.workspace / "engine"
+        self.workdir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def state_path(self) -> Path:
+        return self.workspace / STATE_PATH
+
+    def load_state(self) -> dict:
+        with open(self.state_path, "r") as f:
+            return json.load(f)
+
+    # ------------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------------
+
+    def _engine(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [self.python, str(ENGINE_MAIN), *args],
+            cwd=self.workdir, capture_output=True, text=True,
+        )
+
+    def _strategy_arguments(self) -> list[str]:
+        args = ["--sandbox"] if self.sandbox else []
+        if self.cache_dir:
+            args += ["--cache-dir", str(self.cache_dir)]
+        return args
+
+    def _git(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", *args], cwd=self.workspace, capture_output=True, text=True)
+
+    def _commit(self, paths: tuple[str, ...], message: str) -> None:
+        """Stage exactly these paths, as the workflow does, and commit if anything changed ("|| echo No changes")."""
+        result = self._git("add", "--", *paths)
+        if result.returncode != 0:
+            raise PipelineError(f"git add failed: {result.stderr.strip()}")
+        if self._git("diff", "--cached", "--quiet").returncode != 0:
+            result = self._git("commit", "-q", "-m", message)
+            if result.returncode != 0:
+                raise PipelineError(f"git commit failed: {result.stderr.strip()}")
+
+    def new_game(self, game_id: str, seed: Optional[int] = None) -> None:
+        """Create data/gamestate.json (and the event log) for a new game."""
+        # The repository keeps data/history (.gitkeep) so apply-move.yml's git add resolves
+        history = self.workspace / "data" / "history"
+        history.mkdir(parents=True, exist_ok=True)
+        (history / ".gitkeep").touch()
+
+        args = ["new", "--output", f"../{STATE_PATH}", "--id", game_id, "--events", "../data/events"]
+        if seed is not None:
+            args += ["--seed", str(seed)]
+        result = self._engine(*args)
+        if result.returncode != 0:
+            raise PipelineError(f"Could not create game: {result.stdout.strip()}")
+        if self.git:
+            self._commit((STATE_PATH, "data/events", "data/history"), f"New game {game_id}")
+
+    # ------------------------------------------------------------------
+    # Turn loop
+    # ------------------------------------------------------------------
+
+    def run_turn(self) -> TurnResult:
+        """Take the current tribe through one pass of the pipeline."""
+        gamestate = self.load_state()
+        tribe = TribeColor(gamestate["currentTribe"])
+        result = TurnResult(turn=gamestate["turn"], tribe=tribe, success=False)
+        strategy_file = f"tribes/{tribe.value.lower()}/strategy.py"
+        strategy_path = self.workspace / strategy_file
+        started = time.perf_counter()
+
+        def step(name: str, action: Callable):
+            phase_start = time.perf_counter()
+            try:
+                return action()
+            finally:
+                result.phases[name] = time.perf_counter() - phase_start
+
+        # Jules session + PR
+        previous = strategy_path.read_text() if strategy_path.exists() else None
+        try:
+            source = step("provide", lambda: self.provider(tribe, gamestate))
+        except Exception as e:
+            result.error = f"Strategy provider failed: {e}"
+            result.seconds = time.perf_counter() - started
+            return result
+        strategy_path.parent.mkdir(parents=True, exist_ok=True)
+        strategy_path.write_text(source)
+
+        # validate-move.yml
+        validation = step("validate", lambda: self._engine(
+            "resolve", "--state", f"../{STATE_PATH}", "--tribe", tribe.value,
+            "--record", "../turn_record.json", "--output", "../diff.json",
+            *self._strategy_arguments(),
+        ))
+        if validation.returncode != 0:
+            # A failed check leaves the PR unmerged
+            if previous is None:
+                strategy_path.unlink()
+            else:
+                strategy_path.write_text(previous)
+            result.error = f"Validation failed (exit {validation.returncode}): {validation.stdout.strip()}"
+            result.seconds = time.perf_counter() - started
+            return result
+
+        # auto-merge.yml
+        if self.git:
+            step("merge", lambda: self._commit(
+                (strategy_file,), f"[{tribe.value}] Turn {result.turn} Strategy"
+            ))
+
+        # apply-move.yml, keyed on the merged commit as with $GITHUB_SHA
+        source_key = []
+        if self.git:
+            source_key = ["--source-key", self._git("rev-parse", "HEAD").stdout.strip()]
+        applied = step("apply", lambda: self._engine(
+            "run", "--state", f"../{STATE_PATH}", "--tribe", tribe.value,
+            "--output", "../diff.json", "--record", "../turn_record.json",
+            "--events", "../data/events", "--patches", "../data/patches",
+            *source_key, *self._strategy_arguments(),
+        ))
+        if applied.returncode != 0:
+            result.error = f"Apply failed (exit {applied.returncode}): {applied.stdout.strip()}"
+            result.seconds = time.perf_counter() - started
+            return result
+        if self.git:
+            step("commit", lambda: self._commit(APPLY_PATHS, f"Applied move for {tribe.value} Tribe"))
+
+        result.success = True
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def run(self, turns: Optional[int] = None, max_attempts: int = 3) -> dict:
+        """
+        Run turns until the game ends or `turns` turns have been applied.
+
+        A tribe whose strategy fails validation is asked again, up to
+        max_attempts times in a row, before the run stops. Returns the
+        summary from summarize(); per-turn results are in self.results.
+        """
+        started = time.perf_counter()
+        applied = failures = 0
+        while turns is None or applied < turns:
+            if self.load_state()["status"] != GameStatus.IN_PROGRESS.value:
+                break
+            result = self.run_turn()
+            self.results.append(result)
+            if result.success:
+                applied += 1
+                failures = 0
+                continue
+            failures += 1
+            if failures >= max_attempts:
+                break
+        return summarize(self.results, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Git-vilization turns through a local copy of the CI pipeline")
+    parser.add_argument("--workspace", required=True, help="Directory (or git repository) laid out like this repository")
+    parser.add_argument("--provider", required=True, help="Strategy source: dir:<path> or git:<repository>[@<ref>]")
+    parser.add_argument("--turns", type=int, default=None, help="Stop after this many applied turns (default: game end)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Consecutive rejected strategies before stopping")
+    parser.add_argument("--new-game", default=None, help="Start a new game with this id first")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for --new-game")
+    parser.add_argument("--sandbox", action="store_true", help="Pass --sandbox to the engine, as the workflows do")
+    parser.add_argument("--cache-dir", default=None, help="Pass --cache-dir to the engine, as the workflows do")
+    parser.add_argument("--stats", default=None, help="Write the summary and per-turn results to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        pipeline = LocalPipeline(args.workspace, provider_from_spec(args.provider), args.sandbox, args.cache_dir)
+        if args.new_game:
+            pipeline.new_game(args.new_game, args.seed)
+        summary = pipeline.run(args.turns, args.max_attempts)
+    except (PipelineError, OSError) as e:
+        print(f"Error: {e}")
+        return 2
+
+    for result in pipeline.results:
+        if result.error:
+            print(f"Turn {result.turn} {result.tribe.value}: {result.error}")
+    print(json.dumps(summary, indent=2))
+    if args.stats:
+        with open(args.stats, "w") as f:
+            json.dump({"summary": summary, "turns": [r.to_dict() for r in pipeline.results]}, f, indent=2)
+    return 0 if summary["turns"] > 0 or not pipeline.results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,117 +4,308 @@ Main entry point for the Git-vilization game engine.
 Used by GitHub Actions to validate and apply moves.
 """
 
+import os
 import sys
 import json
+import random
 import argparse
-import importlib.util
 from pathlib import Path
-from typing import Optional
-
-from schemas import GameState, Action, TribeColor
-from state import GameStateManager
-from validate import MoveValidator
-
-
-def load_strategy(tribe: TribeColor) -> Optional[callable]:
-    """Load a tribe's strategy module and return the get_action function."""
-    # Try both relative paths (from engine/ and from project root)
-    paths_to_try = [
-        Path(f"../tribes/{tribe.value.lower()}/strategy.py"),  # From engine/
-        Path(f"tribes/{tribe.value.lower()}/strategy.py"),     # From project root
-    ]
+from typing import Optional, Union
+
+from schemas import GameState, GameStatus, Action, TribeColor, parse_actions, dump_actions
+from state import GameStateManager, StateLock, StaleStateError
+from shards import read_state
+from loader import find_strategy_path, load_strategy_from_path
+from sandbox import (
+    StrategySandbox,
+    SandboxLimits,
+    StrategyTimeout,
+    StrategyMemoryError,
+    EXIT_TIMEOUT,
+    EXIT_MEMORY,
+)
+from server import serve
+from metrics import TurnMetrics, metrics_enabled, default_metrics_path
+from state_view import StateView, lazy_state_enabled
+from turn_record import TurnRecord, hash_bytes, hash_file
+from action_cache import ActionCache, cache_dir_from_env
+from replay import ReplayError, read_action_records, replay_actions
+from checkpoints import CheckpointStore, DEFAULT_INTERVAL
+from event_store import EventStore, DEFAULT_INTERVAL as DEFAULT_SNAPSHOT_INTERVAL
+from patches import PatchFeed
+from archive import GameArchive
+from turn_apply import apply_and_save, default_archive_dir
+
+
+# Identifies the change being applied; set by GitHub Actions to the pushed commit
+SOURCE_KEY_ENV_VAR = "GITHUB_SHA"
+
+
+def source_key_from_env(flag: Optional[str] = None) -> Optional[str]:
+    """The source key from --source-key or the environment, if any."""
+    return flag or os.environ.get(SOURCE_KEY_ENV_VAR) or None
+
+
+def load_state(gamestate_path: str) -> tuple[GameStateManager, str]:
+    """Load the game state, returning it with the sha256 of the file (or shard) contents."""
+    data, raw = read_state(gamestate_path)
+    return GameStateManager.from_state(GameState.from_dict(data), gamestate_path), hash_bytes(raw)
+
+
+def execute_strategy(
+    state: GameState,
+    tribe_color: TribeColor,
+    strategy_path: Path,
+    metrics: TurnMetrics,
+    sandbox: Optional[StrategySandbox] = None,
+    lazy_state: bool = False,
+) -> tuple[Optional[list[Action]], int]:
+    """
+    Load the tribe's strategy, run it against the state and parse its actions.
 
-    strategy_path = None
-    for path in paths_to_try:
-        if path.exists():
-            strategy_path = path
-            break
+    get_action may return one action dict or an ordered list of them (a
+    multi-action turn). With lazy_state the strategy receives a read-only
+    StateView instead of a fully materialized state.to_dict().
 
-    if not strategy_path:
-        print(f"Error: Strategy file not found. Tried: {', '.join(str(p) for p in paths_to_try)}")
-        return None
+    Returns (actions, 0) on success, or (None, exit_code) on failure.
+    """
+    if sandbox is not None:
+        try:
+            with metrics.phase("to_dict"):
+                state_dict = StateView(state) if lazy_state else state.to_dict()
+            with metrics.phase("strategy_execution"):
+                action_dict = sandbox.run(strategy_path, tribe_color, state_dict)
+            return parse_actions(action_dict), 0
+        except StrategyTimeout as e:
+            print(f"Strategy timed out: {e}")
+            return None, EXIT_TIMEOUT
+        except StrategyMemoryError as e:
+            print(f"Strategy ran out of memory: {e}")
+            return None, EXIT_MEMORY
+        except Exception as e:
+            print(f"Error executing strategy: {e}")
+            return None, 2
+
+    with metrics.phase("strategy_import"):
+        get_action = load_strategy_from_path(strategy_path, tribe_color)
+    if not get_action:
+        return None, 2
 
     try:
-        spec = importlib.util.spec_from_file_location(f"{tribe.value}_strategy", strategy_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-
-        if not hasattr(module, "get_action"):
-            print(f"Error: Strategy file missing get_action function")
-            return None
-
-        return module.get_action
+        # Pass game state dict to strategy
+        with metrics.phase("to_dict"):
+            state_dict = StateView(state) if lazy_state else state.to_dict()
+        with metrics.phase("strategy_execution"):
+            action_dict = get_action(state_dict)
+        return parse_actions(action_dict), 0
     except Exception as e:
-        print(f"Error loading strategy: {e}")
-        return None
+        print(f"Error executing strategy: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, 2
+
+
+def resolve_action(
+    state: GameState,
+    state_hash: str,
+    tribe_color: TribeColor,
+    strategy_path: Path,
+    metrics: TurnMetrics,
+    sandbox: Optional[StrategySandbox] = None,
+    lazy_state: bool = False,
+    cache: Optional[ActionCache] = None,
+) -> tuple[Optional[list[Action]], int]:
+    """
+    Produce the tribe's validated actions for this turn.
 
+    Consults the action cache first; on a miss the strategy is executed
+    and the result stored in the cache. Either way the actions are
+    validated in order against the evolving state: a cache hit only
+    skips running the strategy, so entries from an older engine cannot
+    apply moves the current rules reject.
 
-def run_turn(gamestate_path: str, tribe: str, output_path: str) -> int:
+    Returns (actions, 0) on success, or (None, exit_code) on failure.
+    """
+    strategy_hash = hash_file(strategy_path) if cache is not None else None
+    actions = None
+    if cache is not None:
+        with metrics.phase("cache_lookup"):
+            cached = cache.get(state_hash, strategy_hash)
+        if cached is not None:
+            print("Using cached strategy result")
+            actions = parse_actions(cached)
+
+    from_cache = actions is not None
+    if not from_cache:
+        actions, code = execute_strategy(state, tribe_color, strategy_path, metrics, sandbox, lazy_state)
+        if actions is None:
+            return None, code
+
+    # Validate the actions
+    with metrics.phase("validation"):
+        valid, error = GameStateManager(state).validate_turn(tribe_color, actions)
+    if not valid:
+        print(f"Invalid move: {error}")
+        return None, 1
+
+    if cache is not None and not from_cache:
+        cache.put(state_hash, strategy_hash, dump_actions(actions))
+
+    return actions, 0
+
+
+def run_turn(
+    gamestate_path: str,
+    tribe: str,
+    output_path: str,
+    metrics: Optional[TurnMetrics] = None,
+    sandbox: Optional[StrategySandbox] = None,
+    lazy_state: bool = False,
+    record_path: Optional[str] = None,
+    cache: Optional[ActionCache] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+    archive: Optional[GameArchive] = None,
+    source_key: Optional[str] = None,
+    events: Optional[EventStore] = None,
+    patches: Optional[PatchFeed] = None,
+) -> int:
     """
     Run a turn for the specified tribe.
 
+    A strategy may return several actions; they are applied atomically
+    with GameStateManager.apply_turn. If record_path names a turn record
+    (from the resolve command) whose state and strategy hashes match, its
+    already-validated actions are applied without executing the strategy
+    again. If checkpoints is given, the applied actions (and a keyframe
+    when due) are recorded there. If events is given, the turn's changes
+    are appended to that event log once the state file has been saved
+    (a turn the log cannot take is refused before saving). If patches is given, a JSON Patch per
+    applied action is added to that feed after the state file is saved.
+    If the turn ends the game, the final state is written to archive.
+
+    The state file is locked (StateLock) from load to save, and the save
+    is rejected if the file changed anyway, so concurrent applies to one
+    game cannot overwrite each other.
+
+    source_key identifies the change being applied (e.g. the commit SHA).
+    If the state records a turn applied under the same key, nothing is
+    applied and that turn's diff is written to output_path again, so a
+    retried run is a no-op.
+
     Returns:
         0 on success
         1 on validation error
         2 on execution error
+        3 if the strategy exceeded its CPU or wall-time limit (sandbox only)
+        4 if the strategy exceeded its memory limit (sandbox only)
+        5 if the state file or event log was changed by another writer (nothing saved)
     """
+    with StateLock(gamestate_path):
+        try:
+            return _run_turn_locked(gamestate_path, tribe, output_path, metrics, sandbox, lazy_state,
+                                    record_path, cache, checkpoints, archive, source_key, events, patches)
+        except StaleStateError as e:
+            print(f"Game state changed during the turn: {e}")
+            return 5
+
+
+def _run_turn_locked(
+    gamestate_path: str,
+    tribe: str,
+    output_path: str,
+    metrics: Optional[TurnMetrics],
+    sandbox: Optional[StrategySandbox],
+    lazy_state: bool,
+    record_path: Optional[str],
+    cache: Optional[ActionCache],
+    checkpoints: Optional[CheckpointStore],
+    archive: Optional[GameArchive],
+    source_key: Optional[str],
+    events: Optional[EventStore],
+    patches: Optional[PatchFeed],
+) -> int:
+    metrics = metrics or TurnMetrics(enabled=False)
+
     # Load game state
     try:
-        manager = GameStateManager.load(gamestate_path)
+        with metrics.phase("load"):
+            manager, state_hash = load_state(gamestate_path)
     except Exception as e:
         print(f"Error loading game state: {e}")
         return 2
 
     state = manager.state
     tribe_color = TribeColor(tribe.upper())
+    metrics.annotate(game_id=state.game_id, turn=state.turn)
+
+    if source_key is not None:
+        applied = manager.applied_diff(source_key)
+        if applied is not None:
+            # A retry of a run that already went through
+            print(f"Turn for {source_key} was already applied; nothing to do")
+            with open(output_path, "w") as f:
+                json.dump(applied, f, indent=2)
+            return 0
 
     # Check it's this tribe's turn
     if state.current_tribe != tribe_color:
         print(f"Error: Not {tribe}'s turn (current: {state.current_tribe.value})")
         return 1
 
-    # Load and execute strategy
-    get_action = load_strategy(tribe_color)
-    if not get_action:
-        return 2
-
-    try:
-        # Pass game state dict to strategy
-        action_dict = get_action(state.to_dict())
-        action = Action.from_dict(action_dict)
-    except Exception as e:
-        print(f"Error executing strategy: {e}")
-        import traceback
-        traceback.print_exc()
+    strategy_path = find_strategy_path(tribe_color)
+    if not strategy_path:
         return 2
 
-    # Validate the action
-    valid, error = MoveValidator.validate(state, tribe_color, action)
-    if not valid:
-        print(f"Invalid move: {error}")
-        return 1
-
-    # Apply the action
-    success, message, diff = manager.apply_action(tribe_color, action)
+    record = None
+    if record_path:
+        try:
+            record = TurnRecord.load(record_path)
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring turn record: {e}")
+        if record and not record.matches(state_hash, hash_file(strategy_path), tribe_color):
+            print(f"Turn record {record.record_id[:12]} does not match the current state/strategy; executing strategy")
+            record = None
+
+    if record:
+        # Same state and strategy: skip running it, but validate the actions
+        # again when applying (the record may come from an older engine)
+        print(f"Reusing validated turn record {record.record_id[:12]}")
+        actions = record.get_actions()
+    else:
+        # Load, execute and validate strategy (or reuse a cached result)
+        actions, code = resolve_action(state, state_hash, tribe_color, strategy_path, metrics,
+                                       sandbox, lazy_state, cache)
+        if actions is None:
+            return code
+
+    # Apply the actions (validated above unless they came from a record) and save
+    success, message, diff = apply_and_save(
+        manager, gamestate_path, tribe_color, actions, validated=record is None, source_key=source_key,
+        checkpoints=checkpoints, events=events, patches=patches, archive=archive, metrics=metrics,
+    )
     if not success:
         print(f"Failed to apply action: {message}")
         return 1
 
-    # Save updated state
-    manager.save(gamestate_path)
-
     # Save diff for preview
     with open(output_path, "w") as f:
         json.dump(diff, f, indent=2)
 
     print(f"Turn completed successfully")
-    print(f"Action: {action.action.value}")
+    print(f"Action: {', '.join(a.action.value for a in actions)}")
     print(f"Next tribe: {manager.state.current_tribe.value}")
 
     return 0
 
 
-def validate_only(gamestate_path: str, tribe: str) -> int:
+def validate_only(
+    gamestate_path: str,
+    tribe: str,
+    metrics: Optional[TurnMetrics] = None,
+    sandbox: Optional[StrategySandbox] = None,
+    lazy_state: bool = False,
+    cache: Optional[ActionCache] = None,
+) -> int:
     """
     Validate a tribe's move without applying it.
 
@@ -122,52 +313,277 @@ def validate_only(gamestate_path: str, tribe: str) -> int:
         0 if valid
         1 if invalid
         2 on execution error
+        3 if the strategy exceeded its CPU or wall-time limit (sandbox only)
+        4 if the strategy exceeded its memory limit (sandbox only)
     """
+    metrics = metrics or TurnMetrics(enabled=False)
+
     # Load game state
     try:
-        manager = GameStateManager.load(gamestate_path)
+        with metrics.phase("load"):
+            manager, state_hash = load_state(gamestate_path)
     except Exception as e:
         print(f"Error loading game state: {e}")
         return 2
 
     state = manager.state
     tribe_color = TribeColor(tribe.upper())
+    metrics.annotate(game_id=state.game_id, turn=state.turn)
 
     # Check it's this tribe's turn
     if state.current_tribe != tribe_color:
         print(f"Error: Not {tribe}'s turn (current: {state.current_tribe.value})")
         return 1
 
-    # Load and execute strategy
-    get_action = load_strategy(tribe_color)
-    if not get_action:
+    # Load, execute and validate strategy (or reuse a cached result)
+    strategy_path = find_strategy_path(tribe_color)
+    if not strategy_path:
         return 2
 
+    actions, code = resolve_action(state, state_hash, tribe_color, strategy_path, metrics,
+                                   sandbox, lazy_state, cache)
+    if actions is None:
+        return code
+
+    print(f"Move is valid: {', '.join(a.action.value for a in actions)}")
+    print(json.dumps(dump_actions(actions), indent=2))
+    return 0
+
+
+def resolve_turn(
+    gamestate_path: str,
+    tribe: str,
+    record_path: str,
+    output_path: Optional[str] = None,
+    metrics: Optional[TurnMetrics] = None,
+    sandbox: Optional[StrategySandbox] = None,
+    lazy_state: bool = False,
+    cache: Optional[ActionCache] = None,
+) -> int:
+    """
+    Validate a tribe's move in a single pass and record the result.
+
+    Parses the state once, executes the strategy once and validates once,
+    then writes a content-addressed turn record that `run --record` can
+    apply without executing the strategy again. If output_path is given,
+    the actions are also applied in memory (not saved) and the preview diff
+    is written there.
+
+    Returns the same exit codes as validate_only.
+    """
+    metrics = metrics or TurnMetrics(enabled=False)
+
     try:
-        action_dict = get_action(state.to_dict())
-        action = Action.from_dict(action_dict)
+        with metrics.phase("load"):
+            manager, state_hash = load_state(gamestate_path)
     except Exception as e:
-        print(f"Error executing strategy: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"Error loading game state: {e}")
         return 2
 
-    # Validate the action
-    valid, error = MoveValidator.validate(state, tribe_color, action)
-    if not valid:
-        print(f"Invalid move: {error}")
+    state = manager.state
+    tribe_color = TribeColor(tribe.upper())
+    metrics.annotate(game_id=state.game_id, turn=state.turn)
+
+    if state.current_tribe != tribe_color:
+        print(f"Error: Not {tribe}'s turn (current: {state.current_tribe.value})")
         return 1
 
-    print(f"Move is valid: {action.action.value}")
-    print(json.dumps(action.to_dict(), indent=2))
+    strategy_path = find_strategy_path(tribe_color)
+    if not strategy_path:
+        return 2
+
+    actions, code = resolve_action(state, state_hash, tribe_color, strategy_path, metrics,
+                                   sandbox, lazy_state, cache)
+    if actions is None:
+        return code
+
+    record = TurnRecord(
+        state_hash=state_hash,
+        strategy_hash=hash_file(strategy_path),
+        tribe=tribe_color,
+        turn=state.turn,
+        action=dump_actions(actions),
+    )
+    record.save(record_path)
+
+    print(f"Move is valid: {', '.join(a.action.value for a in actions)}")
+    print(json.dumps(dump_actions(actions), indent=2))
+    print(f"Turn record: {record.record_id}")
+
+    if output_path:
+        with metrics.phase("apply"):
+            success, message, diff = manager.apply_turn(tribe_color, actions, validated=True)
+        if not success:
+            print(f"Failed to apply action: {message}")
+            return 1
+        with open(output_path, "w") as f:
+            json.dump(diff, f, indent=2)
+
     return 0
 
 
-def create_new_game(output_path: str, game_id: str) -> int:
-    """Create a new game with default setup."""
+def replay_game(
+    gamestate_path: str,
+    actions_path: str,
+    output_path: str,
+    diffs_path: Optional[str] = None,
+    seed: Optional[int] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+) -> int:
+    """
+    Apply a JSONL file of (tribe, action) records to a starting state.
+
+    Every action is validated and applied in one process. The final state
+    is only written if all actions apply; diffs are streamed to diffs_path
+    one JSON object per line. If checkpoints is given, every action and
+    periodic keyframes are recorded there as the replay proceeds.
+
+    Returns:
+        0 on success
+        1 if an action is invalid (the failing line number is printed)
+        2 on load error
+    """
+    try:
+        manager, _ = load_state(gamestate_path)
+    except Exception as e:
+        print(f"Error loading game state: {e}")
+        return 2
+
+    if seed is not None:
+        # Unseeded states roll combat with the module-level RNG
+        random.seed(seed)
+
+    diffs_file = open(diffs_path, "w") if diffs_path else None
+
+    def after_action(tribe: TribeColor, diff: dict) -> None:
+        if checkpoints is not None:
+            checkpoints.record(manager.state)
+        if diffs_file:
+            diffs_file.write(json.dumps({"tribe": tribe.value, **diff}, separators=(",", ":")) + "\n")
+
+    try:
+        if checkpoints is not None:
+            checkpoints.record(manager.state)
+        applied = replay_actions(manager, read_action_records(actions_path), after_action)
+    except (ReplayError, ValueError, OSError) as e:
+        print(f"Replay failed: {e}")
+        return 1
+    finally:
+        if diffs_file:
+            diffs_file.close()
+
+    manager.save(output_path)
+    print(f"Replayed {applied} actions")
+    print(f"Final state: turn {manager.state.turn}, next tribe {manager.state.current_tribe.value}")
+    return 0
+
+
+def seek_state(store: Union[CheckpointStore, EventStore], output_path: str,
+               turn: Optional[int] = None, index: Optional[int] = None) -> int:
+    """
+    Write the state at the start of a turn, or after a number of entries
+    (actions for a CheckpointStore, events for an EventStore).
+    """
+    try:
+        if turn is not None:
+            state = store.seek_turn(turn)
+        else:
+            state = store.seek(index)
+    except (ValueError, OSError) as e:
+        print(f"Error seeking: {e}")
+        return 1
+
+    GameStateManager.from_state(state).save(output_path)
+    print(f"Turn {state.turn}, {len(state.history)} actions, next tribe {state.current_tribe.value}")
+    print(f"Saved to: {output_path}")
+    return 0
+
+
+def materialize_state(events: EventStore, output_path: str, event_count: Optional[int] = None) -> int:
+    """Write the state rebuilt from an event log (after event_count events, default all)."""
+    try:
+        manager = events.load(event_count)
+    except (ValueError, OSError) as e:
+        print(f"Error materializing state: {e}")
+        return 1
+
+    state = manager.state
+    manager.save(output_path)
+    print(f"Turn {state.turn}, version {state.version}, next tribe {state.current_tribe.value}")
+    print(f"Saved to: {output_path}")
+    return 0
+
+
+def convert_state(gamestate_path: str, output_path: str, sharded: bool = False) -> int:
+    """Copy a state to a JSON file, or to a sharded directory if sharded is set."""
     try:
-        manager = GameStateManager.create_new_game(game_id)
-        manager.save(output_path)
+        GameStateManager.load(gamestate_path).save(output_path, sharded=sharded or None)
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Error converting state: {e}")
+        return 1
+    print(f"Saved to: {output_path}")
+    return 0
+
+
+def archive_game(gamestate_path: str, archive: GameArchive) -> int:
+    """Archive a finished game (e.g. one that ended before archiving existed)."""
+    try:
+        manager = GameStateManager.load(gamestate_path)
+    except Exception as e:
+        print(f"Error loading game state: {e}")
+        return 2
+
+    if manager.state.status != GameStatus.FINISHED:
+        print(f"Game {manager.state.game_id} is not finished")
+        return 1
+
+    summary = archive.archive(manager.state)
+    print(json.dumps(summary))
+    return 0
+
+
+def list_history(archive: GameArchive, winner: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None, min_turns: Optional[int] = None,
+                 max_turns: Optional[int] = None) -> int:
+    """Print archived game summaries matching the filters, one JSON object per line."""
+    for summary in archive.query(winner, since, until, min_turns, max_turns):
+        print(json.dumps(summary))
+    return 0
+
+
+def export_analytics(archive: GameArchive, output_dir: str, formats: str = "both",
+                     turn_stats: bool = True) -> int:
+    """Export archived games to columnar CSV and/or .npz files (requires numpy)."""
+    from analytics import archived_states, build_tables, write_csv, write_npz
+
+    tables = build_tables(archived_states(archive), turn_stats)
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    if formats in ("csv", "both"):
+        write_csv(output, tables)
+    if formats in ("npz", "both"):
+        write_npz(output / "analytics.npz", tables)
+
+    print(f"Exported {len(tables['game_ids'])} games, {len(tables['actions_game'])} actions, "
+          f"{len(tables['tribe_turns_game'])} tribe-turn rows to {output}")
+    return 0
+
+
+def create_new_game(output_path: str, game_id: str, seed: Optional[int] = None,
+                    checkpoints: Optional[CheckpointStore] = None,
+                    events: Optional[EventStore] = None,
+                    patches: Optional[PatchFeed] = None,
+                    sharded: bool = False) -> int:
+    """Create a new game with default setup (as a sharded directory if sharded is set)."""
+    try:
+        manager = GameStateManager.create_new_game(game_id, seed=seed)
+        if events is not None:
+            events.start(manager.state)
+        manager.save(output_path, sharded=sharded or None)
+        if patches is not None:
+            patches.start(manager.state)
+        if checkpoints is not None:
+            checkpoints.record(manager.state)
         print(f"Created new game: {game_id}")
         print(f"Saved to: {output_path}")
         return 0
@@ -176,6 +592,40 @@ def create_new_game(output_path: str, game_id: str) -> int:
         return 2
 
 
+def _add_sandbox_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = SandboxLimits()
+    parser.add_argument("--sandbox", action="store_true", help="Run the strategy in a resource-limited child process")
+    parser.add_argument("--cpu-limit", type=float, default=defaults.cpu_seconds, help="Strategy CPU-time limit in seconds")
+    parser.add_argument("--wall-limit", type=float, default=defaults.wall_seconds, help="Strategy wall-time limit in seconds")
+    parser.add_argument("--memory-limit", type=int, default=defaults.memory_mb, help="Strategy memory limit in MB")
+
+
+def _add_strategy_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--lazy-state", action="store_true",
+                        help="Pass strategies a read-only lazy view of the state (also GITVILIZATION_LAZY_STATE=1)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Reuse validated strategy results from this directory (also GITVILIZATION_CACHE_DIR)")
+    _add_sandbox_arguments(parser)
+
+
+def _make_cache(args) -> Optional[ActionCache]:
+    directory = cache_dir_from_env(args.cache_dir)
+    return ActionCache(directory) if directory else None
+
+
+def _make_sandbox(args) -> Optional[StrategySandbox]:
+    """Build and pre-fork the sandbox so the worker starts while state loads."""
+    if not args.sandbox:
+        return None
+    sandbox = StrategySandbox(SandboxLimits(
+        cpu_seconds=args.cpu_limit,
+        wall_seconds=args.wall_limit,
+        memory_mb=args.memory_limit,
+    ))
+    sandbox.prefork()
+    return sandbox
+
+
 def main():
     parser = argparse.ArgumentParser(description="Git-vilization Game Engine")
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
@@ -185,25 +635,172 @@ def main():
     run_parser.add_argument("--state", required=True, help="Path to gamestate.json")
     run_parser.add_argument("--tribe", required=True, help="Tribe color (RED, BLUE, GREEN, YELLOW)")
     run_parser.add_argument("--output", default="diff.json", help="Output path for diff")
+    run_parser.add_argument("--metrics", action="store_true", help="Record per-phase timings (also GITVILIZATION_METRICS=1)")
+    run_parser.add_argument("--metrics-output", default=None, help="Metrics file (default: metrics.json next to --output)")
+    run_parser.add_argument("--record", default=None, help="Turn record from `resolve`; reused if its hashes match")
+    run_parser.add_argument("--checkpoints", default=None, help="Record the action and periodic keyframes in this directory")
+    run_parser.add_argument("--events", default=None, help="Append the turn's changes to the event log in this directory")
+    run_parser.add_argument("--patches", default=None, help="Write a JSON Patch per applied action to this directory")
+    run_parser.add_argument("--archive-dir", default=None, help="Where finished games are archived (default: history/ next to --state)")
+    run_parser.add_argument("--source-key", default=None,
+                            help="Id of the change being applied; a repeated key is a no-op (default: $GITHUB_SHA)")
+    _add_strategy_arguments(run_parser)
 
     # Validate command
     validate_parser = subparsers.add_parser("validate", help="Validate a move without applying")
     validate_parser.add_argument("--state", required=True, help="Path to gamestate.json")
     validate_parser.add_argument("--tribe", required=True, help="Tribe color")
+    validate_parser.add_argument("--metrics", action="store_true", help="Record per-phase timings (also GITVILIZATION_METRICS=1)")
+    validate_parser.add_argument("--metrics-output", default=None, help="Metrics file (default: metrics.json)")
+    _add_strategy_arguments(validate_parser)
+
+    # Resolve command (single-pass validate + record + preview)
+    resolve_parser = subparsers.add_parser("resolve", help="Validate once and write a reusable turn record")
+    resolve_parser.add_argument("--state", required=True, help="Path to gamestate.json")
+    resolve_parser.add_argument("--tribe", required=True, help="Tribe color")
+    resolve_parser.add_argument("--record", default="turn_record.json", help="Output path for the turn record")
+    resolve_parser.add_argument("--output", default=None, help="Also write the preview diff here")
+    resolve_parser.add_argument("--metrics", action="store_true", help="Record per-phase timings (also GITVILIZATION_METRICS=1)")
+    resolve_parser.add_argument("--metrics-output", default=None, help="Metrics file (default: metrics.json next to --record)")
+    _add_strategy_arguments(resolve_parser)
+
+    # Replay command
+    replay_parser = subparsers.add_parser("replay", help="Apply a JSONL sequence of actions in one process")
+    replay_parser.add_argument("--state", required=True, help="Starting gamestate.json")
+    replay_parser.add_argument("--actions", required=True, help="JSONL file of {\"tribe\", \"action\"} records")
+    replay_parser.add_argument("--output", required=True, help="Output path for the final state")
+    replay_parser.add_argument("--diffs", default=None, help="Write one diff per line to this JSONL file")
+    replay_parser.add_argument("--seed", type=int, default=None, help="Seed the combat RNG (for states without a seed)")
+    replay_parser.add_argument("--checkpoints", default=None, help="Record actions and keyframes in this directory")
+    replay_parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL, help="Actions between keyframes")
+
+    # Seek command
+    seek_parser = subparsers.add_parser("seek", help="Rebuild the state at a past turn from checkpoints or an event log")
+    seek_source = seek_parser.add_mutually_exclusive_group(required=True)
+    seek_source.add_argument("--checkpoints", help="Checkpoint directory")
+    seek_source.add_argument("--events", help="Event log directory")
+    seek_target = seek_parser.add_mutually_exclusive_group(required=True)
+    seek_target.add_argument("--turn", type=int, help="State at the start of this turn")
+    seek_target.add_argument("--action", type=int, help="State after this many actions (--checkpoints)")
+    seek_target.add_argument("--event", type=int, help="State after this many events (--events)")
+    seek_parser.add_argument("--output", required=True, help="Output path for the state")
+
+    # Materialize command
+    materialize_parser = subparsers.add_parser("materialize", help="Rebuild a state file from an event log")
+    materialize_parser.add_argument("--events", required=True, help="Event log directory")
+    materialize_parser.add_argument("--output", required=True, help="Output path for the state")
+    materialize_parser.add_argument("--event", type=int, default=None, help="State after this many events (default: all)")
+
+    # Convert command
+    convert_parser = subparsers.add_parser("convert", help="Copy a state between a JSON file and a sharded directory")
+    convert_parser.add_argument("--state", required=True, help="Source gamestate.json or state directory")
+    convert_parser.add_argument("--output", required=True, help="Destination gamestate.json or state directory")
+    convert_parser.add_argument("--sharded", action="store_true", help="Write a sharded state directory instead of a JSON file")
+
+    # Archive command
+    archive_parser = subparsers.add_parser("archive", help="Archive a finished game")
+    archive_parser.add_argument("--state", required=True, help="Path to the finished gamestate.json")
+    archive_parser.add_argument("--archive-dir", default=None, help="Archive directory (default: history/ next to --state)")
+
+    # History command
+    history_parser = subparsers.add_parser("history", help="List archived games from the index")
+    history_parser.add_argument("--archive-dir", default="../data/history", help="Archive directory")
+    history_parser.add_argument("--winner", default=None, help="Only games won by this tribe")
+    history_parser.add_argument("--since", default=None, help="Only games finished at or after this ISO date")
+    history_parser.add_argument("--until", default=None, help="Only games finished at or before this ISO date")
+    history_parser.add_argument("--min-turns", type=int, default=None, help="Only games lasting at least this many turns")
+    history_parser.add_argument("--max-turns", type=int, default=None, help="Only games lasting at most this many turns")
+
+    # Export command
+    export_parser = subparsers.add_parser("export", help="Export archived games to columnar files (requires numpy)")
+    export_parser.add_argument("--archive-dir", default="../data/history", help="Archive directory")
+    export_parser.add_argument("--output", default="analytics", help="Output directory")
+    export_parser.add_argument("--format", choices=("csv", "npz", "both"), default="both", help="Output format")
+    export_parser.add_argument("--no-turn-stats", action="store_true", help="Skip replaying games for per-turn tribe stats")
 
     # New game command
     new_parser = subparsers.add_parser("new", help="Create a new game")
     new_parser.add_argument("--output", default="data/gamestate.json", help="Output path")
+    new_parser.add_argument("--sharded", action="store_true", help="Save the state as a sharded directory (see shards.py)")
     new_parser.add_argument("--id", default="game_001", help="Game ID")
+    new_parser.add_argument("--seed", type=int, default=None, help="Seed the map and combat rolls (stored in the state file; for local games only)")
+    new_parser.add_argument("--checkpoints", default=None, help="Start a checkpoint directory for this game")
+    new_parser.add_argument("--events", default=None, help="Start an event log in this directory")
+    new_parser.add_argument("--patches", default=None, help="Start a JSON Patch feed in this directory")
+    new_parser.add_argument("--snapshot-interval", type=int, default=DEFAULT_SNAPSHOT_INTERVAL,
+                            help="Events between event log snapshots")
+
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Run a persistent engine daemon (JSON-RPC)")
+    serve_parser.add_argument("--socket", default=None, help="Unix socket path (default: stdin/stdout)")
+    _add_sandbox_arguments(serve_parser)
 
     args = parser.parse_args()
 
     if args.command == "run":
-        return run_turn(args.state, args.tribe, args.output)
+        sandbox = _make_sandbox(args)
+        metrics = TurnMetrics(enabled=metrics_enabled(args.metrics))
+        checkpoints = CheckpointStore(args.checkpoints) if args.checkpoints else None
+        archive = GameArchive(args.archive_dir or default_archive_dir(args.state))
+        result = run_turn(args.state, args.tribe, args.output, metrics, sandbox,
+                          lazy_state_enabled(args.lazy_state), args.record, _make_cache(args),
+                          checkpoints, archive, source_key_from_env(args.source_key),
+                          EventStore(args.events) if args.events else None,
+                          PatchFeed(args.patches) if args.patches else None)
+        if sandbox:
+            sandbox.close()
+        metrics.write(args.metrics_output or default_metrics_path(args.output),
+                      command="run", tribe=args.tribe.upper(), exit_code=result)
+        return result
     elif args.command == "validate":
-        return validate_only(args.state, args.tribe)
+        sandbox = _make_sandbox(args)
+        metrics = TurnMetrics(enabled=metrics_enabled(args.metrics))
+        result = validate_only(args.state, args.tribe, metrics, sandbox,
+                               lazy_state_enabled(args.lazy_state), _make_cache(args))
+        if sandbox:
+            sandbox.close()
+        metrics.write(args.metrics_output or default_metrics_path(),
+                      command="validate", tribe=args.tribe.upper(), exit_code=result)
+        return result
+    elif args.command == "resolve":
+        sandbox = _make_sandbox(args)
+        metrics = TurnMetrics(enabled=metrics_enabled(args.metrics))
+        result = resolve_turn(args.state, args.tribe, args.record, args.output, metrics, sandbox,
+                              lazy_state_enabled(args.lazy_state), _make_cache(args))
+        if sandbox:
+            sandbox.close()
+        metrics.write(args.metrics_output or default_metrics_path(args.record),
+                      command="resolve", tribe=args.tribe.upper(), exit_code=result)
+        return result
+    elif args.command == "replay":
+        checkpoints = CheckpointStore(args.checkpoints, args.interval) if args.checkpoints else None
+        return replay_game(args.state, args.actions, args.output, args.diffs, args.seed, checkpoints)
+    elif args.command == "seek":
+        if args.checkpoints:
+            if args.event is not None:
+                seek_parser.error("--event requires --events")
+            return seek_state(CheckpointStore(args.checkpoints), args.output, args.turn, args.action)
+        if args.action is not None:
+            seek_parser.error("--action requires --checkpoints")
+        return seek_state(EventStore(args.events), args.output, args.turn, args.event)
+    elif args.command == "materialize":
+        return materialize_state(EventStore(args.events), args.output, args.event)
+    elif args.command == "convert":
+        return convert_state(args.state, args.output, args.sharded)
+    elif args.command == "archive":
+        return archive_game(args.state, GameArchive(args.archive_dir or default_archive_dir(args.state)))
+    elif args.command == "history":
+        return list_history(GameArchive(args.archive_dir), args.winner, args.since, args.until,
+                            args.min_turns, args.max_turns)
+    elif args.command == "export":
+        return export_analytics(GameArchive(args.archive_dir), args.output, args.format, not args.no_turn_stats)
     elif args.command == "new":
-        return create_new_game(args.output, args.id)
+        checkpoints = CheckpointStore(args.checkpoints) if args.checkpoints else None
+        events = EventStore(args.events, args.snapshot_interval) if args.events else None
+        patches = PatchFeed(args.patches) if args.patches else None
+        return create_new_game(args.output, args.id, args.seed, checkpoints, events, patches, args.sharded)
+    elif args.command == "serve":
+        return serve(args.socket, _make_sandbox(args))
     else:
         parser.print_help()
         return 1
@@ -0,0 +1,362 @@
+"""
+Monte Carlo tree search reference bot.
+
+A strength baseline for agent-written strategies, and an end-to-end
+stress test of GameStateManager.apply_action throughput. Drop it into a
+tribe's strategy file:
+
+    from mcts import make_strategy
+
+    get_action = make_strategy(time_budget=2.0)
+
+The search is open-loop: tree nodes are keyed by action sequence (as
+ActionSpace indices) and every iteration re-simulates from a clone of the
+root state with fresh combat dice, so chance outcomes are sampled rather
+than stored. With four tribes each node keeps a reward per tribe and the
+tribe to move picks the child that is best for itself (max^n UCT).
+
+Between calls the subtree for the actions played since the last search
+is kept. With workers > 0 the search is root-parallel: each worker
+process grows its own tree for the same time budget and the root visit
+counts are summed.
+"""
+
+import multiprocessing
+import time
+from collections.abc import Mapping
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from schemas import Action, ActionType, GameState, GameStatus, TribeColor
+from state import GameStateManager
+from action_space import ActionSpace, SEGMENT_TYPES
+from evaluation import evaluate
+
+
+TRIBES = list(TribeColor)
+
+DEFAULT_TIME_BUDGET = 1.0
+DEFAULT_ROLLOUT_DEPTH = 40
+DEFAULT_EXPLORATION = 0.7
+ROLLOUT_POLICIES = ("random", "heuristic")
+
+# Tree key for a turn passed because the tribe had no legal action
+SKIP = -1
+
+# Heuristic rollouts first pick an action type with these weights, then an
+# action of that type uniformly (uniform over indices is dominated by BUILD/MOVE)
+HEURISTIC_WEIGHTS = {
+    ActionType.ATTACK: 8.0,
+    ActionType.HARVEST: 6.0,
+    ActionType.TRAIN: 4.0,
+    ActionType.SETTLE: 3.0,
+    ActionType.MOVE: 1.0,
+    ActionType.BUILD: 0.5,
+}
+SEGMENT_WEIGHTS = np.array([HEURISTIC_WEIGHTS[t] for t in SEGMENT_TYPES])
+
+class Node:
+    """Statistics for one action sequence from the root."""
+
+    __slots__ = ("visits", "value", "children")
+
+    def __init__(self):
+        self.visits = 0
+        self.value = np.zeros(len(TRIBES))
+        self.children: dict[int, "Node"] = {}
+
+
+class MCTS:
+    """Open-loop max^n MCTS over ActionSpace indices."""
+
+    def __init__(
+        self,
+        time_budget: Optional[float] = DEFAULT_TIME_BUDGET,
+        iterations: Optional[int] = None,
+        rollout: str = "heuristic",
+        rollout_depth: int = DEFAULT_ROLLOUT_DEPTH,
+        exploration: float = DEFAULT_EXPLORATION,
+        seed: Optional[int] = None,
+        workers: int = 0,
+    ):
+        if rollout not in ROLLOUT_POLICIES:
+            raise ValueError(f"Unknown rollout policy: {rollout} (expected one of {ROLLOUT_POLICIES})")
+        if time_budget is None and iterations is None:
+            raise ValueError("Need a time_budget or an iteration limit")
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.rollout = rollout
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.seed = seed
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+        self.space: Optional[ActionSpace] = None
+        self.last_stats: dict = {}
+
+        self._root: Optional[Node] = None
+        self._root_state: Optional[GameState] = None
+        self._connections = []
+        self._processes = []
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def search(self, state: GameState) -> Optional[Action]:
+        """Best action for the tribe to move, or None if it has no legal action."""
+        space = self._space_for(state)
+        tribe = state.current_tribe
+        legal = np.flatnonzero(space.legal_mask(state, tribe))
+        if len(legal) == 0:
+            return None
+
+        if self.workers > 0:
+            visits = self._search_parallel(state)
+        else:
+            visits = self.root_visits(state)
+
+        allowed = set(legal.tolist())
+        legal_visits = {index: count for index, count in visits.items() if index in allowed}
+        best = max(legal_visits, key=legal_visits.get) if legal_visits else int(legal[0])
+        return space.decode(best, state, tribe)
+
+    def root_visits(self, state: GameState) -> dict[int, int]:
+        """Run one search from state and return the visit count of each root child."""
+        space = self._space_for(state)
+        root = self._reuse(state) or Node()
+        self._root, self._root_state = root, state.clone()
+
+        started = time.perf_counter()
+        deadline = started + self.time_budget if self.time_budget is not None else None
+        iterations = actions = 0
+        while True:
+            if self.iterations is not None and iterations >= self.iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            actions += self._iterate(root, space)
+            iterations += 1
+
+        seconds = time.perf_counter() - started
+        self.last_stats = {
+            "iterations": iterations,
+            "actions": actions,
+            "seconds": seconds,
+            "actions_per_second": actions / seconds if seconds > 0 else 0.0,
+            "root_visits": root.visits,
+        }
+        return {index: child.visits for index, child in root.children.items()}
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _space_for(self, state: GameState) -> ActionSpace:
+        if self.space is None or (self.space.width, self.space.height) != (state.map.width, state.map.height):
+            self.space = ActionSpace.for_state(state)
+            self._root = self._root_state = None
+        return self.space
+
+    def _legal(self, state: GameState) -> np.ndarray:
+        return np.flatnonzero(self.space.legal_mask(state, state.current_tribe))
+
+    def _apply(self, manager: GameStateManager, index: int) -> None:
+        state = manager.state
+        if index == SKIP:
+            manager.skip_turn()
+            return
+        tribe = state.current_tribe
+        manager.apply_action(tribe, self.space.decode(index, state, tribe), validated=True)
+
+    def _rollout_choice(self, legal: np.ndarray) -> int:
+        if self.rollout == "random":
+            return int(self.rng.choice(legal))
+        segments = self.space.segments(legal)
+        counts = np.bincount(segments, minlength=len(SEGMENT_TYPES))
+        weights = SEGMENT_WEIGHTS[segments] / counts[segments]
+        return int(self.rng.choice(legal, p=weights / weights.sum()))
+
+    def _select(self, node: Node, legal: list[int], tribe_index: int) -> int:
+        """UCT over the legal children, from the point of view of the tribe to move."""
+        log_visits = np.log(max(node.visits, 1))
+        best, best_score = legal[0], -np.inf
+        for index in legal:
+            child = node.children[index]
+            score = child.value[tribe_index] / child.visits + self.exploration * np.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = index, score
+        return best
+
+    def _iterate(self, root: Node, space: ActionSpace) -> int:
+        """One selection/expansion/rollout/backup pass. Returns actions applied."""
+        manager = GameStateManager.from_state(self._root_state.clone())
+        state = manager.state
+        # Fresh dice for every iteration (open loop), reproducible from the search seed
+        state.seed = int(self.rng.integers(2**31))
+
+        path = [root]
+        node = root
+        actions = 0
+        while state.status != GameStatus.FINISHED:
+            legal = self._legal(state)
+            keys = legal.tolist() if len(legal) else [SKIP]
+            untried = [key for key in keys if key not in node.children]
+            if untried:
+                key = untried[int(self.rng.integers(len(untried)))]
+                node.children[key] = Node()
+            else:
+                key = self._select(node, keys, TRIBES.index(state.current_tribe))
+            self._apply(manager, key)
+            actions += 1
+            node = node.children[key]
+            path.append(node)
+            if untried:
+                break
+
+        for _ in range(self.rollout_depth):
+            if state.status == GameStatus.FINISHED:
+                break
+            legal = self._legal(state)
+            self._apply(manager, self._rollout_choice(legal) if len(legal) else SKIP)
+            actions += 1
+
+        rewards = evaluate(state)
+        for visited in path:
+            visited.visits += 1
+            visited.value += rewards
+        return actions
+
+    def _reuse(self, state: GameState) -> Optional[Node]:
+        """The subtree for the actions played since the last search, if it is still valid."""
+        old = self._root_state
+        if self._root is None or old is None or old.game_id != state.game_id:
+            return None
+        played = len(old.history)
+        if len(state.history) < played or state.history[:played] != old.history:
+            return None
+
+        manager = GameStateManager.from_state(old.clone())
+        node = self._root
+        for entry in state.history[played:]:
+            # Tribes with no legal action pass without a history entry
+            for _ in range(len(TRIBES)):
+                if manager.state.current_tribe == entry.tribe:
+                    break
+                node = node.children.get(SKIP)
+                if node is None:
+                    return None
+                manager.skip_turn()
+            action = Action.from_dict(entry.details)
+            try:
+                index = self.space.encode(action, manager.state, entry.tribe)
+            except ValueError:
+                return None
+            node = node.children.get(index)
+            if entry.continues_turn:
+                # Part of a multi-action turn, which the tree does not model
+                return None
+            if node is None or not manager.apply_action(entry.tribe, action)[0]:
+                return None
+        return node
+
+    # ------------------------------------------------------------------
+    # Root-parallel workers
+    # ------------------------------------------------------------------
+
+    def _worker_kwargs(self, worker: int) -> dict:
+        return {
+            "time_budget": self.time_budget,
+            "iterations": self.iterations,
+            "rollout": self.rollout,
+            "rollout_depth": self.rollout_depth,
+            "exploration": self.exploration,
+            "seed": None if self.seed is None else self.seed + worker + 1,
+        }
+
+    def _start_workers(self) -> None:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        for worker in range(self.workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_search_worker, args=(child_conn, self._worker_kwargs(worker)), daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+
+    def _search_parallel(self, state: GameState) -> dict[int, int]:
+        if not self._processes:
+            self._start_workers()
+        for conn in self._connections:
+            conn.send(("search", state))
+
+        visits: dict[int, int] = {}
+        stats = []
+        for conn in self._connections:
+            worker_visits, worker_stats = conn.recv()
+            stats.append(worker_stats)
+            for index, count in worker_visits.items():
+                visits[index] = visits.get(index, 0) + count
+
+        self.last_stats = {
+            "iterations": sum(s["iterations"] for s in stats),
+            "actions": sum(s["actions"] for s in stats),
+            "seconds": max(s["seconds"] for s in stats),
+            "actions_per_second": sum(s["actions_per_second"] for s in stats),
+            "root_visits": sum(s["root_visits"] for s in stats),
+            "workers": len(stats),
+        }
+        return visits
+
+    def close(self) -> None:
+        """Stop any worker processes."""
+        for conn in self._connections:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self) -> "MCTS":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _search_worker(conn, kwargs: dict) -> None:
+    """Worker process for root-parallel search; keeps its own tree between calls."""
+    searcher = MCTS(**kwargs)
+    while True:
+        command, state = conn.recv()
+        if command == "close":
+            break
+        visits = searcher.root_visits(state)
+        conn.send((visits, searcher.last_stats))
+
+
+def make_strategy(**kwargs) -> Callable[[Union[Mapping, GameState]], Optional[dict]]:
+    """
+    A get_action(gamestate) function backed by one MCTS instance.
+
+    Keyword arguments are passed to MCTS. The searcher is available as
+    get_action.searcher (e.g. for last_stats or close()).
+    """
+    searcher = MCTS(**kwargs)
+
+    def get_action(gamestate: Union[Mapping, GameState]) -> Optional[dict]:
+        state = gamestate if isinstance(gamestate, GameState) else GameState.from_dict(gamestate)
+        action = searcher.search(state)
+        return action.to_dict() if action is not None else None
+
+    get_action.searcher = searcher
+    return get_action
@@ -0,0 +1,142 @@
+"""
+Per-phase timing instrumentation for engine commands.
+
+Disabled by default. Enable with the --metrics flag or by setting the
+GITVILIZATION_METRICS environment variable to a non-empty value.
+
+Memory and child-process usage come from getrusage, which costs nothing
+while the phases run (unlike tracing allocations). RUSAGE_CHILDREN
+covers the sandbox worker once it has been reaped, which
+StrategySandbox.run does before returning.
+"""
+
+import os
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+METRICS_ENV_VAR = "GITVILIZATION_METRICS"
+METRICS_FILENAME = "metrics.json"
+
+
+def metrics_enabled(flag: bool = False) -> bool:
+    """Return True if metrics were requested by flag or environment."""
+    return flag or os.environ.get(METRICS_ENV_VAR, "") not in ("", "0", "false")
+
+
+def _children_usage() -> tuple[float, int]:
+    """(CPU seconds, peak RSS in kilobytes) of reaped child processes."""
+    if resource is None:
+        return 0.0, 0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+
+def _max_rss_kb() -> int:
+    # ru_maxrss is kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else 0
+
+
+class TurnMetrics:
+    """Records wall time, CPU time and memory high-water marks for each engine phase."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.phases: list[dict] = []
+        self.context: dict = {}
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._child_cpu_start, _ = _children_usage()
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time the enclosed block and record it under the given phase name.
+
+        max_rss_kb is the process's resident-set high-water mark after the
+        phase; child_cpu_ms and child_max_rss_kb are added when a child
+        (the strategy sandbox) finished during it.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        child_cpu_start, _ = _children_usage()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            child_cpu, child_rss = _children_usage()
+            record = {
+                "phase": name,
+                "wall_ms": round(wall * 1000, 3),
+                "cpu_ms": round(cpu * 1000, 3),
+                "max_rss_kb": _max_rss_kb(),
+            }
+            if child_cpu > child_cpu_start:
+                record["child_cpu_ms"] = round((child_cpu - child_cpu_start) * 1000, 3)
+                record["child_max_rss_kb"] = child_rss
+            self.phases.append(record)
+
+    def annotate(self, **context) -> None:
+        """Attach extra fields (game id, turn, ...) to the written record."""
+        self.context.update(context)
+
+    def summary(self) -> dict:
+        """Return totals for the whole command."""
+        result = {
+            "wall_ms": round((time.perf_counter() - self._wall_start) * 1000, 3),
+            "cpu_ms": round((time.process_time() - self._cpu_start) * 1000, 3),
+        }
+        if resource is not None:
+            result["max_rss_kb"] = _max_rss_kb()
+            child_cpu, child_rss = _children_usage()
+            if child_cpu > self._child_cpu_start:
+                result["child_cpu_ms"] = round((child_cpu - self._child_cpu_start) * 1000, 3)
+                result["child_max_rss_kb"] = child_rss
+        return result
+
+    def write(self, path: str, **context) -> None:
+        """
+        Append this command's record to the JSON metrics file at path.
+
+        The file holds a list of records so latency can be tracked across
+        every turn of a game.
+        """
+        if not self.enabled:
+            return
+
+        record = {"timestamp": time.time(), **self.context, **context, "phases": self.phases, "total": self.summary()}
+
+        records = []
+        metrics_path = Path(path)
+        if metrics_path.exists():
+            try:
+                with open(metrics_path, "r") as f:
+                    records = json.load(f)
+            except (OSError, ValueError):
+                records = []
+            if not isinstance(records, list):
+                records = [records]
+        records.append(record)
+
+        with open(metrics_path, "w") as f:
+            json.dump(records, f, indent=2)
+
+
+def default_metrics_path(output_path: Optional[str] = None) -> str:
+    """Place metrics.json next to the diff output (or in the cwd)."""
+    if output_path:
+        return str(Path(output_path).with_name(METRICS_FILENAME))
+    return METRICS_FILENAME
@@ -0,0 +1,163 @@
+"""
+Observation tensors for learned strategies.
+
+encode_observation turns a GameState (or a gamestate dict) into a stack
+of NumPy planes of shape (NUM_PLANES, height, width), indexed
+[plane, r, q], from one tribe's point of view. Tribes are ordered
+relative to the observer (self first, then the others in turn order),
+so the same network weights can play any colour:
+
+    terrain      one plane per TerrainType (one-hot)
+    ownership    one plane per relative tribe
+    units        one plane per relative tribe x UnitType (unit counts)
+    buildings    one plane per relative tribe x BuildingType
+    mines        gold mine, mine harvested by us, mine harvested by others
+    can_act      our units that can still act
+
+    from observation import encode_observation, PLANE_NAMES
+
+    def get_action(gamestate):
+        planes = encode_observation(gamestate, "RED")
+        ...
+
+encode_batch stacks many states into one (N, NUM_PLANES, height, width)
+array, writing into a caller-provided buffer if given.
+"""
+
+from collections.abc import Mapping
+from typing import Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from schemas import BuildingType, GameState, TerrainType, TribeColor, UnitType
+
+
+TRIBE_ORDER = list(TribeColor)
+TERRAINS = list(TerrainType)
+UNIT_TYPES = list(UnitType)
+BUILDING_TYPES = list(BuildingType)
+NUM_TRIBES = len(TRIBE_ORDER)
+
+TERRAIN_INDEX = {terrain: i for i, terrain in enumerate(TERRAINS)}
+UNIT_INDEX = {unit_type: i for i, unit_type in enumerate(UNIT_TYPES)}
+BUILDING_INDEX = {building_type: i for i, building_type in enumerate(BUILDING_TYPES)}
+
+TERRAIN_OFFSET = 0
+OWNER_OFFSET = TERRAIN_OFFSET + len(TERRAINS)
+UNIT_OFFSET = OWNER_OFFSET + NUM_TRIBES
+BUILDING_OFFSET = UNIT_OFFSET + NUM_TRIBES * len(UNIT_TYPES)
+MINE_PLANE = BUILDING_OFFSET + NUM_TRIBES * len(BUILDING_TYPES)
+MINE_OWN_PLANE = MINE_PLANE + 1
+MINE_ENEMY_PLANE = MINE_PLANE + 2
+CAN_ACT_PLANE = MINE_PLANE + 3
+NUM_PLANES = CAN_ACT_PLANE + 1
+
+PLANE_NAMES = (
+    [f"terrain_{t.value}" for t in TERRAINS]
+    + [f"owner_{i}" for i in range(NUM_TRIBES)]
+    + [f"unit_{i}_{u.value}" for i in range(NUM_TRIBES) for u in UNIT_TYPES]
+    + [f"building_{i}_{b.value}" for i in range(NUM_TRIBES) for b in BUILDING_TYPES]
+    + ["mine", "mine_own", "mine_enemy", "can_act"]
+)
+
+TribeLike = Union[TribeColor, str]
+StateLike = Union[GameState, Mapping]
+
+
+def relative_tribes(tribe: TribeLike) -> list[TribeColor]:
+    """Tribes in turn order starting with the observer."""
+    start = TRIBE_ORDER.index(TribeColor(tribe.upper()) if isinstance(tribe, str) else tribe)
+    return TRIBE_ORDER[start:] + TRIBE_ORDER[:start]
+
+
+def _as_state(state: StateLike) -> GameState:
+    return state if isinstance(state, GameState) else GameState.from_dict(state)
+
+
+def encode_observation(
+    state: StateLike,
+    tribe: TribeLike,
+    out: Optional[np.ndarray] = None,
+    dtype=np.float32,
+) -> np.ndarray:
+    """Encode one state from `tribe`'s point of view as (NUM_PLANES, height, width)."""
+    state = _as_state(state)
+    height, width = state.map.height, state.map.width
+    if out is None:
+        out = np.zeros((NUM_PLANES, height, width), dtype=dtype)
+    else:
+        out[...] = 0
+
+    relative = {t: i for i, t in enumerate(relative_tribes(tribe))}
+    me = relative_tribes(tribe)[0]
+
+    tiles = state.map.tiles
+    count = len(tiles)
+    q = np.fromiter((t.q for t in tiles), dtype=np.intp, count=count)
+    r = np.fromiter((t.r for t in tiles), dtype=np.intp, count=count)
+    terrain = np.fromiter((TERRAIN_INDEX[t.terrain] for t in tiles), dtype=np.intp, count=count)
+    out[TERRAIN_OFFSET + terrain, r, q] = 1
+
+    owner = np.fromiter(
+        (relative[t.owner] if t.owner is not None else -1 for t in tiles), dtype=np.intp, count=count
+    )
+    owned = owner >= 0
+    out[OWNER_OFFSET + owner[owned], r[owned], q[owned]] = 1
+
+    units_by_id = {}
+    if state.units:
+        planes = np.array([
+            UNIT_OFFSET + relative[u.tribe] * len(UNIT_TYPES) + UNIT_INDEX[u.type] for u in state.units
+        ], dtype=np.intp)
+        uq = np.array([u.position[0] for u in state.units], dtype=np.intp)
+        ur = np.array([u.position[1] for u in state.units], dtype=np.intp)
+        # Units can share a tile, so accumulate counts
+        np.add.at(out, (planes, ur, uq), 1)
+
+        acting = np.array([u.tribe == me and u.can_act for u in state.units])
+        out[CAN_ACT_PLANE, ur[acting], uq[acting]] = 1
+        units_by_id = {u.id: u for u in state.units}
+
+    for building in state.buildings:
+        plane = BUILDING_OFFSET + relative[building.tribe] * len(BUILDING_TYPES) + BUILDING_INDEX[building.type]
+        out[plane, building.position[1], building.position[0]] = 1
+
+    for mine in state.gold_mines:
+        mq, mr = mine.position
+        out[MINE_PLANE, mr, mq] = 1
+        worker = units_by_id.get(mine.worker_id) if mine.worker_id is not None else None
+        if worker is not None:
+            out[MINE_OWN_PLANE if worker.tribe == me else MINE_ENEMY_PLANE, mr, mq] = 1
+
+    return out
+
+
+def encode_batch(
+    states: Sequence[StateLike],
+    tribes: Union[TribeLike, Iterable[TribeLike]],
+    out: Optional[np.ndarray] = None,
+    dtype=np.float32,
+) -> np.ndarray:
+    """
+    Encode many states (same map size) into (N, NUM_PLANES, height, width).
+
+    `tribes` is one observer for all states or one per state. If `out` is
+    given (e.g. a shared-memory buffer) it is filled in place.
+    """
+    states = [_as_state(s) for s in states]
+    if isinstance(tribes, (str, TribeColor)):
+        tribes = [tribes] * len(states)
+    else:
+        tribes = list(tribes)
+    if len(tribes) != len(states):
+        raise ValueError(f"Got {len(tribes)} tribes for {len(states)} states")
+
+    if out is None:
+        if not states:
+            return np.zeros((0, NUM_PLANES, 0, 0), dtype=dtype)
+        height, width = states[0].map.height, states[0].map.width
+        out = np.zeros((len(states), NUM_PLANES, height, width), dtype=dtype)
+
+    for i, (state, tribe) in enumerate(zip(states, tribes)):
+        encode_observation(state, tribe, out=out[i])
+    return out
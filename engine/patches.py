@@ -0,0 +1,246 @@
+"""
+RFC 6902 JSON Patch feed of state changes, for clients that poll.
+
+Each applied action becomes one patch against GameState.to_dict(),
+derived from the diff changes apply_action produced (through the events
+GameStateManager records, see event_store.py). A patch is numbered by
+the state version it produces, which is also its sequence number:
+
+    <directory>/
+        index.json          game id and the first/last version in the feed
+        00000042.json       {"version": 42, "patch": [...]}: version 41 -> 42
+
+A client holding version N applies patches N+1..last in order. If N is
+older than first - 1 (the feed was pruned or restarted for a new game)
+it fetches the full state instead.
+"""
+
+import json
+from pathlib import Path
+from typing import Optional
+
+from schemas import GameState, TribeColor
+from state import remember_applied
+from event_store import fold_change, history_entry
+from checkpoints import _write_json_atomic
+
+
+# Patches kept on disk; older clients reload the full state
+DEFAULT_KEEP = 200
+
+
+def _pointer(*parts) -> str:
+    """JSON Pointer (RFC 6901) for a path of keys and indices."""
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in parts)
+
+
+def _op(op: str, path: str, value=None) -> dict:
+    if op == "remove":
+        return {"op": op, "path": path}
+    return {"op": op, "path": path, "value": value}
+
+
+def _unit_index(state: GameState, unit_id: int) -> int:
+    return next(i for i, u in enumerate(state.units) if u.id == unit_id)
+
+
+def _mine_index(state: GameState, mine_id: int) -> Optional[int]:
+    return next((i for i, g in enumerate(state.gold_mines) if g.id == mine_id), None)
+
+
+def change_ops(state: GameState, change: dict) -> list[dict]:
+    """
+    Patch operations for one diff change entry, applied to state (which
+    must be the state the change was made on; it is updated to match).
+    """
+    kind = change["type"]
+    ops = []
+    if kind == "unit_moved":
+        i = _unit_index(state, change["unit_id"])
+        ops.append(_op("replace", _pointer("units", i, "position"), change["to"]))
+        harvesting = state.units[i].harvesting
+        if harvesting is not None:
+            j = _mine_index(state, harvesting)
+            if j is not None:
+                ops.append(_op("replace", _pointer("goldMines", j, "workerId"), None))
+            ops.append(_op("remove", _pointer("units", i, "harvesting")))
+    elif kind in ("unit_killed", "unit_consumed"):
+        ops.append(_op("remove", _pointer("units", _unit_index(state, change["unit_id"]))))
+    elif kind == "harvest_started":
+        i = _unit_index(state, change["unit_id"])
+        ops.append(_op("add", _pointer("units", i, "harvesting"), change["mine_id"]))
+        ops.append(_op("replace", _pointer("goldMines", _mine_index(state, change["mine_id"]), "workerId"),
+                       change["unit_id"]))
+    elif kind == "territory_expanded":
+        q, r = change["position"]
+        k = next(k for k, t in enumerate(state.map.tiles) if t.q == q and t.r == r)
+        ops.append(_op("replace", _pointer("map", "tiles", k, "owner"), change["tribe"]))
+    elif kind == "tribe_eliminated":
+        ops.append(_op("replace", _pointer("tribes", change["tribe"], "alive"), False))
+        tribe = TribeColor(change["tribe"])
+        # Highest index first so the remaining indices stay valid
+        for i in reversed([i for i, u in enumerate(state.units) if u.tribe == tribe]):
+            ops.append(_op("remove", _pointer("units", i)))
+    elif kind == "game_over":
+        ops.append(_op("replace", _pointer("status"), "FINISHED"))
+    elif kind == "turn_advanced":
+        if change["turn"] > state.turn:
+            for i, unit in enumerate(state.units):
+                if not unit.can_act:
+                    ops.append(_op("replace", _pointer("units", i, "canAct"), True))
+        ops.append(_op("replace", _pointer("turn"), change["turn"]))
+        ops.append(_op("replace", _pointer("currentTribe"), change["current_tribe"]))
+
+    fold_change(state, change)
+
+    if kind == "building_created":
+        ops.append(_op("add", _pointer("buildings", "-"), state.buildings[-1].to_dict()))
+    elif kind == "unit_trained":
+        ops.append(_op("add", _pointer("units", "-"), state.units[-1].to_dict()))
+    elif kind in ("gold_spent", "income_collected"):
+        ops.append(_op("replace", _pointer("tribes", change["tribe"], "gold"),
+                       state.tribes[TribeColor(change["tribe"])].gold))
+    return ops
+
+
+def event_ops(state: GameState, event: dict) -> list[dict]:
+    """Patch operations for one recorded event, applied to state as in event_store.fold."""
+    if event["event"] == "applied":
+        before = list(state.applied)
+        remember_applied(state.applied, event["key"], event["diff"])
+        if not before:
+            return [_op("add", _pointer("applied"), dict(state.applied))]
+        ops = [_op("remove", _pointer("applied", key)) for key in before if key not in state.applied]
+        ops.append(_op("add", _pointer("applied", event["key"]), event["diff"]))
+        return ops
+
+    ops = []
+    if event["event"] == "action":
+        entry = history_entry(state, event)
+        state.history.append(entry)
+        ops.append(_op("add", _pointer("history", "-"), entry.to_dict()))
+    for change in event["changes"]:
+        ops.extend(change_ops(state, change))
+    state.version += 1
+    ops.append(_op("replace", _pointer("version"), state.version))
+    return ops
+
+
+def make_patches(state: GameState, events: list[dict]) -> list[tuple[int, list[dict]]]:
+    """
+    (version, patch) for each action or skipped turn in events, starting
+    from state (which is updated as the events are applied). An "applied"
+    event belongs to the patch of the action before it.
+    """
+    patches = []
+    for event in events:
+        ops = event_ops(state, event)
+        if event["event"] != "applied":
+            patches.append((state.version, ops))
+        elif patches:
+            patches[-1][1].extend(ops)
+        else:
+            raise ValueError("An applied event must follow the action it records")
+    return patches
+
+
+def apply_patch(document, patch: list[dict]):
+    """Apply add/remove/replace operations to a JSON document in place and return it."""
+    for operation in patch:
+        parts = [p.replace("~1", "/").replace("~0", "~") for p in operation["path"].split("/")[1:]]
+        if not parts:
+            document = operation.get("value")
+            continue
+        parent = document
+        for part in parts[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        last = parts[-1]
+        op = operation["op"]
+        if isinstance(parent, list):
+            if op == "add":
+                if last == "-":
+                    parent.append(operation["value"])
+                else:
+                    parent.insert(int(last), operation["value"])
+            elif op == "remove":
+                del parent[int(last)]
+            elif op == "replace":
+                parent[int(last)] = operation["value"]
+            else:
+                raise ValueError(f"Unsupported patch operation: {op}")
+        else:
+            if op in ("add", "replace"):
+                if op == "replace" and last not in parent:
+                    raise KeyError(operation["path"])
+                parent[last] = operation["value"]
+            elif op == "remove":
+                del parent[last]
+            else:
+                raise ValueError(f"Unsupported patch operation: {op}")
+    return document
+
+
+class PatchFeed:
+    """Numbered JSON Patches for one game's state file."""
+
+    def __init__(self, directory: str, keep: int = DEFAULT_KEEP):
+        self.directory = Path(directory)
+        self.index_path = self.directory / "index.json"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.keep = keep
+
+        self.game_id: Optional[str] = None
+        self.first = 0
+        self.last = -1
+        if self.index_path.exists():
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            self.game_id = index["gameId"]
+            self.first = index["first"]
+            self.last = index["last"]
+
+    def _patch_path(self, version: int) -> Path:
+        return self.directory / f"{version:08d}.json"
+
+    def _save_index(self) -> None:
+        _write_json_atomic(self.index_path, {"gameId": self.game_id, "first": self.first, "last": self.last})
+
+    def start(self, state: GameState) -> None:
+        """Empty the feed and continue it from this state's version."""
+        for version in range(self.first, self.last + 1):
+            self._patch_path(version).unlink(missing_ok=True)
+        self.game_id = state.game_id
+        self.first = state.version + 1
+        self.last = state.version
+        self._save_index()
+
+    def record(self, before: GameState, events: list[dict]) -> list[int]:
+        """
+        Write the patches for events recorded on a manager whose state was
+        `before` (left unchanged). The feed restarts if it does not end at
+        that state's version. Returns the versions written.
+        """
+        if self.game_id != before.game_id or self.last != before.version:
+            self.start(before)
+
+        versions = []
+        for version, patch in make_patches(before.clone(), events):
+            _write_json_atomic(self._patch_path(version), {"version": version, "patch": patch})
+            versions.append(version)
+            self.last = version
+
+        while self.last - self.first + 1 > self.keep:
+            self._patch_path(self.first).unlink(missing_ok=True)
+            self.first += 1
+        self._save_index()
+        return versions
+
+    def since(self, version: int) -> Optional[list[dict]]:
+        """Patches after version, in order, or None if the feed cannot bring it up to date."""
+        if not self.first - 1 <= version <= self.last:
+            return None
+        patches = []
+        for v in range(version + 1, self.last + 1):
+            with open(self._patch_path(v), "r") as f:
+                patches.append(json.load(f))
+        return patches
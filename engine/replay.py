@@ -0,0 +1,71 @@
+"""
+Batch replay of recorded actions.
+
+Applies a sequence of (tribe, action) records to a starting state in a
+single process, instead of one `main.py run` invocation and one JSON
+round trip per action.
+"""
+
+import json
+from typing import Callable, Iterable, Iterator, Optional
+
+from schemas import Action, TribeColor
+from state import GameStateManager
+
+
+class ReplayError(Exception):
+    """Raised when a record cannot be parsed or applied."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+def parse_action_record(data: dict) -> tuple[TribeColor, Action, bool]:
+    """
+    Parse one replay record into (tribe, action, end_turn).
+
+    Accepts {"tribe": ..., "action": {...}} records as well as entries
+    copied from GameState.history ({"tribe": ..., "details": {...}}).
+    A record with "continuesTurn": true is followed by more actions of
+    the same multi-action turn, so it does not end the turn.
+    """
+    tribe = TribeColor(data["tribe"])
+    action_data = data["details"] if "details" in data else data["action"]
+    return tribe, Action.from_dict(action_data), not data.get("continuesTurn", False)
+
+
+def read_action_records(path: str) -> Iterator[tuple[int, TribeColor, Action, bool]]:
+    """Yield (line_number, tribe, action, end_turn) for each non-blank line of a JSONL file."""
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                tribe, action, end_turn = parse_action_record(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ReplayError(line_number, f"invalid record: {e}")
+            yield line_number, tribe, action, end_turn
+
+
+def replay_actions(
+    manager: GameStateManager,
+    records: Iterable[tuple[int, TribeColor, Action, bool]],
+    on_diff: Optional[Callable[[TribeColor, dict], None]] = None,
+) -> int:
+    """
+    Apply records to the manager's state in order.
+
+    Calls on_diff(tribe, diff) after each action. Returns the number of actions
+    applied; raises ReplayError at the first record that fails.
+    """
+    applied = 0
+    for line_number, tribe, action, end_turn in records:
+        success, message, diff = manager.apply_action(tribe, action, end_turn=end_turn)
+        if not success:
+            raise ReplayError(line_number, f"{tribe.value} {action.action.value} rejected: {message}")
+        applied += 1
+        if on_diff is not None:
+            on_diff(tribe, diff)
+    return applied
@@ -82,15 +82,15 @@ class GameRules:
         return bonus
 
     @staticmethod
-    def resolve_combat(
+    def combat_strengths(
         attacker: Unit,
         defender: Unit,
         state: GameState,
-        attacker_is_ranged: bool = False
-    ) -> tuple[bool, int, int]:
+        attacker_is_ranged: bool = False,
+    ) -> tuple[int, int]:
         """
-        Resolve combat between two units.
-        Returns: (attacker_wins, attacker_roll, defender_roll)
+        Strengths before dice, with the ranged penalty and defensive bonuses.
+        Returns: (attacker_strength, defender_strength)
         """
         attacker_stats = UNIT_STATS[attacker.type]
         defender_stats = UNIT_STATS[defender.type]
@@ -113,9 +113,28 @@ class GameRules:
             state, defender.position[0], defender.position[1], defender.tribe
         )
 
+        return attacker_strength, defender_strength
+
+    @staticmethod
+    def resolve_combat(
+        attacker: Unit,
+        defender: Unit,
+        state: GameState,
+        attacker_is_ranged: bool = False,
+        rng=random,
+    ) -> tuple[bool, int, int]:
+        """
+        Resolve combat between two units.
+        Dice are rolled with rng (the random module or a random.Random).
+        Returns: (attacker_wins, attacker_roll, defender_roll)
+        """
+        attacker_strength, defender_strength = GameRules.combat_strengths(
+            attacker, defender, state, attacker_is_ranged
+        )
+
         # Roll dice
-        attacker_roll = random.randint(1, 6)
-        defender_roll = random.randint(1, 6)
+        attacker_roll = rng.randint(1, 6)
+        defender_roll = rng.randint(1, 6)
 
         attacker_total = attacker_strength + attacker_roll
         defender_total = defender_strength + defender_roll
@@ -125,6 +144,25 @@ class GameRules:
 
         return attacker_wins, attacker_roll, defender_roll
 
+    @staticmethod
+    def attack_win_probability(
+        attacker: Unit,
+        defender: Unit,
+        state: GameState,
+        attacker_is_ranged: bool = False,
+    ) -> float:
+        """Exact probability that the attacker wins, over all 36 dice outcomes."""
+        attacker_strength, defender_strength = GameRules.combat_strengths(
+            attacker, defender, state, attacker_is_ranged
+        )
+        wins = sum(
+            1
+            for attacker_roll in range(1, 7)
+            for defender_roll in range(1, 7)
+            if attacker_strength + attacker_roll > defender_strength + defender_roll
+        )
+        return wins / 36
+
     @staticmethod
     def can_train_unit(state: GameState, tribe: TribeColor, unit_type: UnitType, building_id: int) -> tuple[bool, str]:
         """Check if a tribe can train a specific unit at a building."""
@@ -0,0 +1,233 @@
+"""
+Sandboxed strategy execution.
+
+Strategies are agent-written code, so they run in a child process with
+CPU-time, wall-time and memory limits. The child is forked ahead of time
+(while the parent is still loading the game state) and receives the
+strategy path and game state over a pipe, so the spawn cost is off the
+critical path. Each worker serves a single request and then exits, so one
+strategy can never leak module state into the next.
+"""
+
+import os
+import sys
+import math
+import time
+import signal
+import traceback
+import multiprocessing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; only wall-time limits apply
+    resource = None
+
+from schemas import TribeColor
+
+
+# Exit codes returned by run_turn/validate_only when a limit is hit
+EXIT_TIMEOUT = 3
+EXIT_MEMORY = 4
+
+# How often the parent checks the child's RSS while waiting
+_POLL_INTERVAL = 0.05
+
+
+class StrategyError(Exception):
+    """Raised when a sandboxed strategy fails to load or raises."""
+    pass
+
+
+class StrategyTimeout(StrategyError):
+    """Raised when a strategy exceeds its CPU-time or wall-time limit."""
+    pass
+
+
+class StrategyMemoryError(StrategyError):
+    """Raised when a strategy exceeds its memory limit."""
+    pass
+
+
+@dataclass
+class SandboxLimits:
+    """Resource limits applied to each strategy execution."""
+    cpu_seconds: float = 10.0
+    wall_seconds: float = 30.0
+    memory_mb: int = 512
+
+
+class _CPULimitExceeded(BaseException):
+    """Raised inside the worker on SIGXCPU (BaseException so strategies can't swallow it)."""
+    pass
+
+
+def _on_sigxcpu(signum, frame):
+    raise _CPULimitExceeded()
+
+
+def _vm_size_bytes() -> int:
+    """Current virtual memory size of this process, or 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _rss_bytes(pid: int) -> int:
+    """Resident set size of a process, or 0 if unknown."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _apply_limits(limits: SandboxLimits) -> None:
+    """Install rlimits in the worker, relative to what it has already used."""
+    if resource is None:
+        return
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    soft = math.ceil(used + limits.cpu_seconds)
+    signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+
+    # RLIMIT_AS caps growth beyond the interpreter's current footprint;
+    # the parent additionally enforces the RSS limit by polling.
+    address_space = _vm_size_bytes() + limits.memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard == resource.RLIM_INFINITY or address_space < hard:
+        resource.setrlimit(resource.RLIMIT_AS, (address_space, hard))
+
+
+def _worker_main(conn, limits: SandboxLimits) -> None:
+    """Worker entry point: wait for one request, run it, reply, exit."""
+    from loader import load_strategy_from_path
+
+    try:
+        request = conn.recv()
+    except EOFError:
+        return
+
+    strategy_path, tribe_value, gamestate = request
+    try:
+        _apply_limits(limits)
+        get_action = load_strategy_from_path(Path(strategy_path), TribeColor(tribe_value))
+        if get_action is None:
+            conn.send(("error", "Could not load strategy", ""))
+            return
+        action_dict = get_action(gamestate)
+        conn.send(("ok", action_dict))
+    except _CPULimitExceeded:
+        conn.send(("timeout", f"Strategy exceeded CPU limit ({limits.cpu_seconds}s)"))
+    except MemoryError:
+        conn.send(("memory", f"Strategy exceeded memory limit ({limits.memory_mb} MB)"))
+    except Exception as e:
+        conn.send(("error", str(e), traceback.format_exc()))
+    finally:
+        sys.stdout.flush()
+        conn.close()
+
+
+class StrategySandbox:
+    """Runs strategies in a pre-forked, resource-limited child process."""
+
+    def __init__(self, limits: Optional[SandboxLimits] = None, keep_warm: bool = False):
+        self.limits = limits or SandboxLimits()
+        self.keep_warm = keep_warm
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self._process = None
+        self._conn = None
+
+    def prefork(self) -> None:
+        """Start a worker now so it is ready when the strategy needs to run."""
+        if self._process is not None:
+            return
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn, self.limits), daemon=True)
+        process.start()
+        child_conn.close()
+        self._process = process
+        self._conn = parent_conn
+
+    def run(self, strategy_path: Path, tribe: TribeColor, gamestate) -> dict:
+        """
+        Execute get_action(gamestate) from strategy_path in the worker.
+
+        Raises StrategyTimeout, StrategyMemoryError or StrategyError.
+        """
+        self.prefork()
+        process, conn = self._process, self._conn
+        self._process = self._conn = None
+
+        try:
+            conn.send((str(strategy_path), tribe.value, gamestate))
+            reply = self._wait(process, conn)
+        finally:
+            conn.close()
+            if process.is_alive():
+                process.kill()
+            process.join()
+            if self.keep_warm:
+                self.prefork()
+
+        status = reply[0]
+        if status == "ok":
+            return reply[1]
+        if status == "timeout":
+            raise StrategyTimeout(reply[1])
+        if status == "memory":
+            raise StrategyMemoryError(reply[1])
+        message, trace = reply[1], reply[2] if len(reply) > 2 else ""
+        if trace:
+            print(trace, end="")
+        raise StrategyError(message)
+
+    def _wait(self, process, conn) -> tuple:
+        """Wait for the worker's reply while enforcing wall-time and RSS limits."""
+        deadline = time.monotonic() + self.limits.wall_seconds
+        rss_limit = self.limits.memory_mb * 1024 * 1024
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                process.kill()
+                raise StrategyTimeout(f"Strategy exceeded wall-time limit ({self.limits.wall_seconds}s)")
+
+            if conn.poll(min(remaining, _POLL_INTERVAL)):
+                try:
+                    return conn.recv()
+                except EOFError:
+                    break
+
+            if not process.is_alive():
+                if conn.poll(0):
+                    continue
+                break
+
+            if _rss_bytes(process.pid) > rss_limit:
+                process.kill()
+                raise StrategyMemoryError(f"Strategy exceeded memory limit ({self.limits.memory_mb} MB)")
+
+        # Worker died without replying
+        process.join()
+        cpu_signals = {-getattr(signal, "SIGXCPU", signal.SIGTERM), -getattr(signal, "SIGKILL", signal.SIGTERM)}
+        if process.exitcode in cpu_signals:
+            raise StrategyTimeout(f"Strategy exceeded CPU limit ({self.limits.cpu_seconds}s)")
+        raise StrategyError(f"Strategy process exited unexpectedly (exit code {process.exitcode})")
+
+    def close(self) -> None:
+        """Stop any idle pre-forked worker."""
+        if self._process is not None:
+            self._conn.close()
+            self._process.join(timeout=1)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._process = self._conn = None
@@ -76,6 +76,10 @@ GOLD_PER_WORKER = 10
 # Starting gold
 STARTING_GOLD = 100
 
+# Engine version, recorded alongside hashed results. Bump whenever rules
+# or serialization change so previously recorded results are not reused.
+ENGINE_VERSION = "1.0.0"
+
 
 @dataclass
 class Tile:
@@ -204,14 +208,19 @@ class GameAction:
     tribe: TribeColor
     action: ActionType
     details: dict
+    # More actions by the same tribe follow in this turn (multi-action turns)
+    continues_turn: bool = False
 
     def to_dict(self) -> dict:
-        return {
+        result = {
             "turn": self.turn,
             "tribe": self.tribe.value,
             "action": self.action.value,
             "details": self.details,
         }
+        if self.continues_turn:
+            result["continuesTurn"] = True
+        return result
 
     @classmethod
     def from_dict(cls, data: dict) -> "GameAction":
@@ -220,6 +229,7 @@ class GameAction:
             tribe=TribeColor(data["tribe"]),
             action=ActionType(data["action"]),
             details=data["details"],
+            continues_turn=data.get("continuesTurn", False),
         )
 
 
@@ -228,6 +238,11 @@ class GameMap:
     width: int
     height: int
     tiles: list[Tile]
+    # (q, r) -> Tile, built on first lookup
+    _tile_index: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    # Arrays derived from tile positions and terrain, cached by array-based
+    # callers (action_space); terrain never changes, so clones share it
+    _layout: Optional[object] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self) -> dict:
         return {
@@ -245,10 +260,10 @@ class GameMap:
         )
 
     def get_tile(self, q: int, r: int) -> Optional[Tile]:
-        for tile in self.tiles:
-            if tile.q == q and tile.r == r:
-                return tile
-        return None
+        index = self._tile_index
+        if index is None or len(index) != len(self.tiles):
+            index = self._tile_index = {(t.q, t.r): t for t in self.tiles}
+        return index.get((q, r))
 
     def set_tile_owner(self, q: int, r: int, owner: Optional[TribeColor]) -> bool:
         tile = self.get_tile(q, r)
@@ -270,11 +285,27 @@ class GameState:
     buildings: list[Building]
     gold_mines: list[GoldMine]
     history: list[GameAction] = field(default_factory=list)
-
-    def to_dict(self) -> dict:
-        return {
+    # Seeds per-action combat rolls for reproducible replays. Private: it
+    # would let a strategy predict the dice (see to_dict)
+    seed: Optional[int] = None
+    started_at: Optional[str] = None  # ISO 8601 UTC creation time
+    # Incremented by every applied action; saves compare it to detect
+    # a concurrent writer (see GameStateManager.save)
+    version: int = 0
+    # Source key (e.g. commit SHA) -> diff of recently applied turns, so a
+    # retried apply can be recognised (see GameStateManager.mark_applied)
+    applied: dict[str, dict] = field(default_factory=dict)
+
+    def to_dict(self, include_seed: bool = False) -> dict:
+        """
+        The public form of the state, as strategies and clients see it.
+        include_seed adds the seed, for files the engine reads back (state
+        files, keyframes, snapshots, archives).
+        """
+        result = {
             "gameId": self.game_id,
             "turn": self.turn,
+            "version": self.version,
             "currentTribe": self.current_tribe.value,
             "status": self.status.value,
             "map": self.map.to_dict(),
@@ -284,6 +315,13 @@ class GameState:
             "goldMines": [g.to_dict() for g in self.gold_mines],
             "history": [h.to_dict() for h in self.history],
         }
+        if include_seed and self.seed is not None:
+            result["seed"] = self.seed
+        if self.started_at is not None:
+            result["startedAt"] = self.started_at
+        if self.applied:
+            result["applied"] = self.applied
+        return result
 
     @classmethod
     def from_dict(cls, data: dict) -> "GameState":
@@ -298,10 +336,43 @@ class GameState:
             buildings=[Building.from_dict(b) for b in data["buildings"]],
             gold_mines=[GoldMine.from_dict(g) for g in data["goldMines"]],
             history=[GameAction.from_dict(h) for h in data.get("history", [])],
+            seed=data.get("seed"),
+            started_at=data.get("startedAt"),
+            # Files written before versioning: one version per recorded action
+            version=data.get("version", len(data.get("history", []))),
+            applied=data.get("applied", {}),
         )
 
-    def to_json(self, indent: int = 2) -> str:
-        return json.dumps(self.to_dict(), indent=indent)
+    def to_json(self, indent: int = 2, include_seed: bool = False) -> str:
+        return json.dumps(self.to_dict(include_seed), indent=indent)
+
+    def clone(self) -> "GameState":
+        """
+        Copy for simulation: everything apply_action mutates is copied.
+        History entries are shared (they are never modified once recorded).
+        """
+        game_map = GameMap(
+            width=self.map.width,
+            height=self.map.height,
+            tiles=[Tile(t.q, t.r, t.terrain, t.owner) for t in self.map.tiles],
+        )
+        game_map._layout = self.map._layout
+        return GameState(
+            game_id=self.game_id,
+            turn=self.turn,
+            current_tribe=self.current_tribe,
+            status=self.status,
+            map=game_map,
+            tribes={k: TribeState(v.gold, v.alive) for k, v in self.tribes.items()},
+            units=[Unit(u.id, u.tribe, u.type, u.position, u.can_act, u.harvesting) for u in self.units],
+            buildings=[Building(b.id, b.tribe, b.type, b.position, b.hp) for b in self.buildings],
+            gold_mines=[GoldMine(g.id, g.position, g.worker_id) for g in self.gold_mines],
+            history=list(self.history),
+            seed=self.seed,
+            started_at=self.started_at,
+            version=self.version,
+            applied=dict(self.applied),
+        )
 
     @classmethod
     def from_json(cls, json_str: str) -> "GameState":
@@ -381,3 +452,17 @@ class Action:
             mine_id=data.get("mine_id"),
             position=tuple(data["position"]) if data.get("position") else None,
         )
+
+
+def parse_actions(data) -> list[Action]:
+    """Parse a strategy result: one action dict, or a list of them for a multi-action turn."""
+    if isinstance(data, list):
+        return [Action.from_dict(item) for item in data]
+    return [Action.from_dict(data)]
+
+
+def dump_actions(actions: list[Action]):
+    """Inverse of parse_actions: a single action dict, or a list for several actions."""
+    if len(actions) == 1:
+        return actions[0].to_dict()
+    return [action.to_dict() for action in actions]
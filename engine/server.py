@@ -0,0 +1,392 @@
+"""
+Long-running engine daemon.
+
+Keeps parsed game states and loaded strategy modules in memory and
+answers validate/run/preview requests over line-delimited JSON-RPC 2.0,
+either on stdin/stdout or on a Unix socket. Cached entries are
+invalidated when a file's mtime or size changes and its content hash
+no longer matches.
+
+Strategies are agent-written code. Given a StrategySandbox the daemon
+runs them in its resource-limited workers instead of in-process, and
+`run`, which saves the turn, is refused without one.
+"""
+
+import io
+import os
+import sys
+import copy
+import json
+import hashlib
+import traceback
+import socketserver
+from contextlib import nullcontext, redirect_stdout
+from pathlib import Path
+from typing import Optional
+
+from schemas import Action, TribeColor, parse_actions, dump_actions
+from state import GameStateManager, StateLock, StaleStateError
+from shards import STATE_FILE, shard_bytes
+from loader import find_strategy_path, load_strategy_from_path
+from state_view import StateView
+from checkpoints import CheckpointStore
+from event_store import EventStore
+from patches import PatchFeed
+from archive import GameArchive
+from turn_apply import apply_and_save, default_archive_dir
+from sandbox import EXIT_MEMORY, EXIT_TIMEOUT, StrategyMemoryError, StrategySandbox, StrategyTimeout
+
+
+class RPCError(Exception):
+    """Raised for malformed requests; mapped to a JSON-RPC error object."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _file_stamp(path: str) -> tuple[int, int]:
+    if os.path.isdir(path):
+        # Sharded state: every save replaces state.json
+        path = os.path.join(path, STATE_FILE)
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _file_hash(path: str) -> str:
+    if os.path.isdir(path):
+        return hashlib.sha256(shard_bytes(path)).hexdigest()
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class _CacheEntry:
+    """A cached value together with the file stamp and hash it was built from."""
+
+    def __init__(self, stamp: tuple[int, int], digest: str, value):
+        self.stamp = stamp
+        self.digest = digest
+        self.value = value
+
+
+class EngineServer:
+    """Serves engine requests from warm, file-invalidated caches."""
+
+    def __init__(self, sandbox: Optional[StrategySandbox] = None):
+        self._states: dict[str, _CacheEntry] = {}
+        self._strategies: dict[str, _CacheEntry] = {}
+        self.sandbox = sandbox
+        self.running = True
+
+    # ------------------------------------------------------------------
+    # Caches
+    # ------------------------------------------------------------------
+
+    def _lookup(self, cache: dict, path: str) -> Optional[_CacheEntry]:
+        """Return the cached entry for path if the file has not changed."""
+        entry = cache.get(path)
+        if entry is None:
+            return None
+        stamp = _file_stamp(path)
+        if stamp == entry.stamp:
+            return entry
+        # mtime/size changed; only rebuild if the content actually differs
+        if _file_hash(path) == entry.digest:
+            entry.stamp = stamp
+            return entry
+        del cache[path]
+        return None
+
+    def get_manager(self, path: str) -> GameStateManager:
+        """Return the cached manager for a gamestate file, loading it if stale."""
+        key = os.path.abspath(path)
+        entry = self._lookup(self._states, key)
+        if entry is None:
+            stamp = _file_stamp(key)
+            digest = _file_hash(key)
+            entry = _CacheEntry(stamp, digest, GameStateManager.load(key))
+            self._states[key] = entry
+        return entry.value
+
+    def get_strategy(self, tribe: TribeColor, strategy_path: Optional[str] = None) -> Optional[callable]:
+        """Return the cached get_action for a strategy file, re-executing it if stale."""
+        path = Path(strategy_path) if strategy_path else find_strategy_path(tribe)
+        if path is None:
+            return None
+        key = os.path.abspath(path)
+        entry = self._lookup(self._strategies, key)
+        if entry is None:
+            get_action = load_strategy_from_path(Path(key), tribe)
+            if get_action is None:
+                return None
+            entry = _CacheEntry(_file_stamp(key), _file_hash(key), get_action)
+            self._strategies[key] = entry
+        return entry.value
+
+    def _refresh_state(self, path: str, manager: GameStateManager) -> None:
+        """Record a just-saved state so the next request does not re-parse it."""
+        key = os.path.abspath(path)
+        self._states[key] = _CacheEntry(_file_stamp(key), _file_hash(key), manager)
+
+    # ------------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------------
+
+    def _resolve(self, params: dict) -> tuple[int, Optional[GameStateManager], Optional[TribeColor], Optional[list[Action]], str]:
+        """
+        Load state and strategy, execute it, and validate its actions.
+
+        Returns (code, manager, tribe, actions, message) using the same
+        codes as main.run_turn.
+        """
+        try:
+            state_path = params["state"]
+            tribe_color = TribeColor(params["tribe"].upper())
+        except (KeyError, ValueError, AttributeError) as e:
+            raise RPCError(-32602, f"Invalid params: {e}")
+
+        try:
+            manager = self.get_manager(state_path)
+        except Exception as e:
+            return 2, None, tribe_color, None, f"Error loading game state: {e}"
+
+        state = manager.state
+        if state.current_tribe != tribe_color:
+            return 1, manager, tribe_color, None, f"Not {tribe_color.value}'s turn (current: {state.current_tribe.value})"
+
+        if self.sandbox is not None:
+            code, actions, message = self._execute_sandboxed(tribe_color, state, params)
+            if code != 0:
+                return code, manager, tribe_color, None, message
+        else:
+            get_action = self.get_strategy(tribe_color, params.get("strategy"))
+            if not get_action:
+                return 2, manager, tribe_color, None, "Could not load strategy"
+
+            try:
+                gamestate = StateView(state) if params.get("lazy") else state.to_dict()
+                actions = parse_actions(get_action(gamestate))
+            except Exception as e:
+                traceback.print_exc(file=sys.stdout)
+                return 2, manager, tribe_color, None, f"Error executing strategy: {e}"
+
+        valid, error = manager.validate_turn(tribe_color, actions)
+        if not valid:
+            return 1, manager, tribe_color, actions, f"Invalid move: {error}"
+
+        return 0, manager, tribe_color, actions, "Move is valid"
+
+    def _execute_sandboxed(self, tribe_color: TribeColor, state, params: dict) -> tuple[int, Optional[list[Action]], str]:
+        """Run the strategy in the sandbox; returns (code, actions, message)."""
+        path = Path(params["strategy"]) if params.get("strategy") else find_strategy_path(tribe_color)
+        if path is None:
+            return 2, None, "Could not load strategy"
+        try:
+            gamestate = StateView(state) if params.get("lazy") else state.to_dict()
+            return 0, parse_actions(self.sandbox.run(path, tribe_color, gamestate)), ""
+        except StrategyTimeout as e:
+            return EXIT_TIMEOUT, None, f"Strategy timed out: {e}"
+        except StrategyMemoryError as e:
+            return EXIT_MEMORY, None, f"Strategy ran out of memory: {e}"
+        except Exception as e:
+            return 2, None, f"Error executing strategy: {e}"
+        finally:
+            # Each worker serves one request; have the next one ready
+            self.sandbox.prefork()
+
+    @staticmethod
+    def _write_output(params: dict, diff: dict) -> None:
+        if params.get("output"):
+            with open(params["output"], "w") as f:
+                json.dump(diff, f, indent=2)
+
+    def validate(self, params: dict) -> dict:
+        code, _, _, actions, message = self._resolve(params)
+        return {
+            "code": code,
+            "message": message,
+            "action": dump_actions(actions) if actions else None,
+        }
+
+    def preview(self, params: dict) -> dict:
+        """Validate and apply to a copy of the state, returning the diff."""
+        code, manager, tribe_color, actions, message = self._resolve(params)
+        result = {"code": code, "message": message, "action": dump_actions(actions) if actions else None, "diff": None}
+        if code != 0:
+            return result
+
+        scratch = copy.deepcopy(manager)
+        success, message, diff = scratch.apply_turn(tribe_color, actions, validated=True)
+        if not success:
+            result.update(code=1, message=f"Failed to apply action: {message}")
+            return result
+
+        result["diff"] = diff
+        self._write_output(params, diff)
+        return result
+
+    def run(self, params: dict) -> dict:
+        """
+        Validate, apply and save, as `main.py run` does (apply_and_save).
+
+        Optional params mirror its flags: source_key, checkpoints, events,
+        patches and archive_dir (default: data/history next to the state).
+        The state file is locked (StateLock) from load to save. The turn is
+        applied to a copy of the warm state, which is replaced only once the
+        copy has been saved. Refused (code 2) unless the daemon has a
+        sandbox: a saved turn must not come from unsandboxed agent code.
+        """
+        if self.sandbox is None:
+            return {"code": 2, "message": "run needs a sandboxed daemon (main.py serve --sandbox)",
+                    "action": None, "diff": None}
+        state_path = params.get("state")
+        with StateLock(state_path) if state_path else nullcontext():
+            return self._run_locked(state_path, params)
+
+    def _run_locked(self, state_path: Optional[str], params: dict) -> dict:
+        source_key = params.get("source_key")
+        if state_path and source_key:
+            try:
+                applied = self.get_manager(state_path).applied_diff(source_key)
+            except Exception:
+                applied = None  # reported by _resolve
+            if applied is not None:
+                # A retry of a run that already went through
+                self._write_output(params, applied)
+                return {"code": 0, "message": f"Turn for {source_key} was already applied; nothing to do",
+                        "action": None, "diff": applied}
+
+        code, manager, tribe_color, actions, message = self._resolve(params)
+        result = {"code": code, "message": message, "action": dump_actions(actions) if actions else None, "diff": None}
+        if code != 0:
+            return result
+
+        scratch = copy.deepcopy(manager)
+        try:
+            success, message, diff = apply_and_save(
+                scratch, state_path, tribe_color, actions, validated=True, source_key=source_key,
+                checkpoints=CheckpointStore(params["checkpoints"]) if params.get("checkpoints") else None,
+                events=EventStore(params["events"]) if params.get("events") else None,
+                patches=PatchFeed(params["patches"]) if params.get("patches") else None,
+                archive=GameArchive(params.get("archive_dir") or default_archive_dir(state_path)),
+            )
+        except StaleStateError as e:
+            # Another writer saved first; drop the warm state so the next request reloads
+            self._states.pop(os.path.abspath(state_path), None)
+            result.update(code=5, message=f"Game state changed during the turn: {e}")
+            return result
+        except BaseException:
+            # The file may or may not have been written; reload it next time
+            self._states.pop(os.path.abspath(state_path), None)
+            raise
+        if not success:
+            result.update(code=1, message=f"Failed to apply action: {message}")
+            return result
+        self._refresh_state(state_path, scratch)
+        manager = scratch
+
+        self._write_output(params, diff)
+
+        result.update(
+            message="Turn completed successfully",
+            diff=diff,
+            next_tribe=manager.state.current_tribe.value,
+        )
+        return result
+
+    def ping(self, params: dict) -> dict:
+        return {
+            "states": len(self._states),
+            "strategies": len(self._strategies),
+        }
+
+    def shutdown(self, params: dict) -> dict:
+        self.running = False
+        return {"stopping": True}
+
+    METHODS = ("validate", "preview", "run", "ping", "shutdown")
+
+    # ------------------------------------------------------------------
+    # JSON-RPC plumbing
+    # ------------------------------------------------------------------
+
+    def handle(self, request: dict) -> dict:
+        """Dispatch a single JSON-RPC request object and return the response."""
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or "method" not in request:
+                raise RPCError(-32600, "Invalid request")
+            method = request["method"]
+            if method not in self.METHODS:
+                raise RPCError(-32601, f"Method not found: {method}")
+
+            # Strategy and engine prints must not corrupt the response stream
+            captured = io.StringIO()
+            with redirect_stdout(captured):
+                result = getattr(self, method)(request.get("params") or {})
+            result["output"] = captured.getvalue()
+            return {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except RPCError as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": e.message}}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32603, "message": str(e)}}
+
+    def handle_line(self, line: str) -> str:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return json.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}})
+        return json.dumps(self.handle(request))
+
+    def serve_stdio(self, stdin=None, stdout=None) -> None:
+        """Answer one request per input line until EOF or shutdown."""
+        stdin = stdin or sys.stdin
+        stdout = stdout or sys.stdout
+        for line in stdin:
+            if not line.strip():
+                continue
+            stdout.write(self.handle_line(line) + "\n")
+            stdout.flush()
+            if not self.running:
+                break
+
+    def serve_socket(self, socket_path: str) -> None:
+        """Answer line-delimited requests on a Unix socket until shutdown."""
+        engine = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    line = raw.decode("utf-8")
+                    if not line.strip():
+                        continue
+                    self.wfile.write((engine.handle_line(line) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                    if not engine.running:
+                        break
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        with socketserver.UnixStreamServer(socket_path, Handler) as server:
+            try:
+                while self.running:
+                    server.handle_request()
+            finally:
+                os.remove(socket_path)
+
+
+def serve(socket_path: Optional[str] = None, sandbox: Optional[StrategySandbox] = None) -> int:
+    """Run the engine daemon on stdin/stdout or on a Unix socket."""
+    server = EngineServer(sandbox)
+    try:
+        if socket_path:
+            print(f"Engine serving on {socket_path}", file=sys.stderr)
+            server.serve_socket(socket_path)
+        else:
+            server.serve_stdio()
+    finally:
+        if sandbox is not None:
+            sandbox.close()
+    return 0
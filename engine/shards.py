@@ -0,0 +1,193 @@
+"""
+Sharded on-disk game state.
+
+A sharded state is a directory holding the state split by how often
+each part changes:
+
+    <directory>/
+        map.json        dimensions, terrain, gold mine positions (written once)
+        state.json      turn, tribes, units, buildings, mine workers, tile owners
+        history.jsonl   GameState.history, one entry per line, appended to
+
+A turn rewrites only state.json and appends its history entries, so the
+bytes written (and the git diff committed) follow what changed rather
+than the size of the map. state.json is replaced last and records how
+much of history.jsonl belongs to it, so a save interrupted between the
+two writes leaves the previous state readable.
+
+GameStateManager.load and save handle both layouts. An existing
+directory is sharded and any other path is a single JSON file; a new
+sharded state is only created on request (save(path, sharded=True),
+`main.py new --sharded`, `main.py convert --sharded`).
+"""
+
+import os
+import json
+import stat
+import tempfile
+from typing import Optional
+
+
+MAP_FILE = "map.json"
+STATE_FILE = "state.json"
+HISTORY_FILE = "history.jsonl"
+
+# Keys of GameState.to_dict() that are stored outside state.json
+_SPLIT_KEYS = ("map", "goldMines", "history")
+
+
+def is_sharded(path: str) -> bool:
+    """Whether path names an existing sharded state directory rather than a JSON file."""
+    return os.path.isdir(path)
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Replace path with data (temp file + fsync + rename), keeping the
+    file mode of the file it replaces.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def split_state(data: dict) -> tuple[dict, dict]:
+    """Split GameState.to_dict() output into (map.json, state.json) contents, without history."""
+    static = {
+        "gameId": data["gameId"],
+        "width": data["map"]["width"],
+        "height": data["map"]["height"],
+        "tiles": [{"q": t["q"], "r": t["r"], "terrain": t["terrain"]} for t in data["map"]["tiles"]],
+        "goldMines": [{"id": g["id"], "position": g["position"]} for g in data["goldMines"]],
+    }
+    dynamic = {k: v for k, v in data.items() if k not in _SPLIT_KEYS}
+    dynamic["owners"] = [[t["q"], t["r"], t["owner"]] for t in data["map"]["tiles"] if t["owner"]]
+    dynamic["goldMines"] = [{"id": g["id"], "workerId": g["workerId"]} for g in data["goldMines"]]
+    return static, dynamic
+
+
+def merge_state(static: dict, dynamic: dict, history: list[dict]) -> dict:
+    """Inverse of split_state: the GameState.to_dict() form of the shards."""
+    data = {k: v for k, v in dynamic.items() if k not in ("owners", "historyLength", "historySize")}
+    owners = {(q, r): owner for q, r, owner in dynamic["owners"]}
+    data["map"] = {
+        "width": static["width"],
+        "height": static["height"],
+        "tiles": [dict(t, owner=owners.get((t["q"], t["r"]))) for t in static["tiles"]],
+    }
+    workers = {g["id"]: g["workerId"] for g in dynamic["goldMines"]}
+    data["goldMines"] = [dict(g, workerId=workers.get(g["id"])) for g in static["goldMines"]]
+    data["history"] = history
+    return data
+
+
+def _read_json(path: str) -> tuple[dict, bytes]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    return json.loads(raw), raw
+
+
+def shard_bytes(directory: str) -> bytes:
+    """Contents of map.json and state.json, which together identify a sharded state."""
+    with open(os.path.join(directory, MAP_FILE), "rb") as f, open(os.path.join(directory, STATE_FILE), "rb") as g:
+        return f.read() + g.read()
+
+
+def read_state(path: str) -> tuple[dict, bytes]:
+    """
+    Read a state file or directory as GameState.to_dict() data, together
+    with bytes that identify it (for hashing). For a directory these are
+    map.json and state.json: history is append-only and its length is
+    recorded in state.json.
+    """
+    if not is_sharded(path):
+        data, raw = _read_json(path)
+        return data, raw
+
+    static, static_raw = _read_json(os.path.join(path, MAP_FILE))
+    dynamic, dynamic_raw = _read_json(os.path.join(path, STATE_FILE))
+    history = []
+    if dynamic["historyLength"]:
+        with open(os.path.join(path, HISTORY_FILE), "r") as f:
+            for _ in range(dynamic["historyLength"]):
+                history.append(json.loads(f.readline()))
+    return merge_state(static, dynamic, history), static_raw + dynamic_raw
+
+
+def read_version(path: str) -> Optional[int]:
+    """Version of the state saved at path, or None if nothing is saved there."""
+    if is_sharded(path):
+        path = os.path.join(path, STATE_FILE)
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return data.get("version", len(data.get("history", [])))
+
+
+def write_sharded(directory: str, data: dict, append: bool) -> None:
+    """
+    Save GameState.to_dict() data as shards.
+
+    map.json is written only if its contents changed. With append=True
+    the history already on disk is taken to be a prefix of data["history"]
+    (the state was loaded from this directory) and only new entries are
+    appended; otherwise history.jsonl is rewritten.
+    """
+    os.makedirs(directory, exist_ok=True)
+    static, dynamic = split_state(data)
+    history = data["history"]
+
+    map_path = os.path.join(directory, MAP_FILE)
+    map_bytes = json.dumps(static, separators=(",", ":")).encode()
+    try:
+        with open(map_path, "rb") as f:
+            map_changed = f.read() != map_bytes
+    except FileNotFoundError:
+        map_changed = True
+    if map_changed:
+        write_atomic(map_path, map_bytes)
+
+    history_path = os.path.join(directory, HISTORY_FILE)
+    saved_length, saved_size = 0, 0
+    if append:
+        try:
+            with open(os.path.join(directory, STATE_FILE), "r") as f:
+                saved = json.load(f)
+            saved_length, saved_size = saved["historyLength"], saved["historySize"]
+        except FileNotFoundError:
+            pass
+    if append and saved_length <= len(history) and os.path.exists(history_path):
+        with open(history_path, "a+b") as f:
+            # Drop entries of a save that failed before replacing state.json
+            f.truncate(saved_size)
+            for entry in history[saved_length:]:
+                f.write((json.dumps(entry, separators=(",", ":")) + "\n").encode())
+            f.flush()
+            os.fsync(f.fileno())
+            history_size = f.tell()
+    else:
+        lines = b"".join((json.dumps(entry, separators=(",", ":")) + "\n").encode() for entry in history)
+        write_atomic(history_path, lines)
+        history_size = len(lines)
+
+    dynamic["historyLength"] = len(history)
+    dynamic["historySize"] = history_size
+    write_atomic(os.path.join(directory, STATE_FILE), json.dumps(dynamic, indent=2).encode())
@@ -2,8 +2,10 @@
 Game state management and action application.
 """
 
-import json
+import os
 import random
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 from schemas import (
@@ -28,6 +30,66 @@ from schemas import (
 )
 from rules import GameRules
 from validate import MoveValidator
+from shards import is_sharded, read_state, read_version, write_atomic, write_sharded
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+# Source keys remembered by mark_applied; retries only ever repeat recent turns
+APPLIED_KEYS_LIMIT = 32
+
+
+def remember_applied(applied: dict, key: str, diff: dict) -> None:
+    """Record key -> diff as the newest entry, dropping the oldest beyond APPLIED_KEYS_LIMIT."""
+    applied.pop(key, None)
+    applied[key] = diff
+    while len(applied) > APPLIED_KEYS_LIMIT:
+        del applied[next(iter(applied))]
+
+
+class StaleStateError(Exception):
+    """Raised when saving over a state file another writer has changed since it was loaded."""
+    pass
+
+
+class StateLock:
+    """
+    Advisory exclusive lock for a state file, held on <path>.lock.
+
+    Hold it around load -> apply -> save so concurrent applies to the same
+    game run one after another. Re-entrant within a thread, so save()
+    inside a locked block does not deadlock. A no-op where fcntl is
+    unavailable.
+    """
+
+    _held: dict[tuple[str, int], list] = {}  # (path, thread) -> [file, depth]
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+
+    def __enter__(self) -> "StateLock":
+        key = (self.path, threading.get_ident())
+        held = StateLock._held.get(key)
+        if held is not None:
+            held[1] += 1
+            return self
+        lock_file = open(self.path + ".lock", "a")
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        StateLock._held[key] = [lock_file, 1]
+        return self
+
+    def __exit__(self, *exc) -> None:
+        key = (self.path, threading.get_ident())
+        held = StateLock._held[key]
+        held[1] -= 1
+        if held[1] == 0:
+            del StateLock._held[key]
+            # Closing the file releases the lock
+            held[0].close()
 
 
 class GameStateManager:
@@ -37,35 +99,104 @@ class GameStateManager:
         self.state = state
         self._next_unit_id = 100
         self._next_building_id = 100
+        # File the state was loaded from and its version then, for save()
+        self._path: Optional[str] = None
+        self._base_version: Optional[int] = None
+        # When a list, every state change is also appended here as an event
+        # for an EventStore (see event_store.py); None records nothing
+        self.events: Optional[list[dict]] = None
 
     @classmethod
     def load(cls, path: str) -> "GameStateManager":
-        """Load game state from a JSON file."""
-        with open(path, "r") as f:
-            data = json.load(f)
-        state = GameState.from_dict(data)
-        manager = cls(state)
+        """Load game state from a JSON file or a sharded state directory."""
+        data, _ = read_state(path)
+        return cls.from_state(GameState.from_dict(data), path)
 
-        # Initialize ID counters
-        if state.units:
-            manager._next_unit_id = max(u.id for u in state.units) + 1
-        if state.buildings:
-            manager._next_building_id = max(b.id for b in state.buildings) + 1
+    @classmethod
+    def from_state(cls, state: GameState, path: Optional[str] = None) -> "GameStateManager":
+        """
+        Wrap an existing state, initializing the ID counters from it.
+        path names the file it was read from, so save() can detect
+        concurrent changes to that file.
+        """
+        manager = cls(state)
+        manager._sync_ids()
+        if path is not None:
+            manager._path = os.path.abspath(path)
+            manager._base_version = state.version
+        return manager
 
+    def clone(self) -> "GameStateManager":
+        """Independent manager over a copy of the state, for simulations."""
+        manager = GameStateManager(self.state.clone())
+        manager._next_unit_id = self._next_unit_id
+        manager._next_building_id = self._next_building_id
         return manager
 
-    def save(self, path: str) -> None:
-        """Save game state to a JSON file."""
-        with open(path, "w") as f:
-            f.write(self.state.to_json())
+    def _sync_ids(self) -> None:
+        """Derive the ID counters from the current state, as a fresh load would."""
+        self._next_unit_id = max(u.id for u in self.state.units) + 1 if self.state.units else 100
+        self._next_building_id = max(b.id for b in self.state.buildings) + 1 if self.state.buildings else 100
+
+    def _combat_rng(self):
+        """
+        RNG for the next action's dice rolls.
+
+        Seeded games derive it from the game seed and the action's index in
+        the history, so any action can be replayed with identical rolls
+        without storing RNG state. Unseeded games use the global RNG.
+        """
+        if self.state.seed is None:
+            return random
+        return random.Random(f"{self.state.seed}:{len(self.state.history)}")
+
+    def save(self, path: str, sharded: Optional[bool] = None) -> None:
+        """
+        Save game state to a JSON file, or as shards to a directory (see
+        shards.py). By default the layout already at path is kept and a
+        new path becomes a JSON file; sharded=True creates a directory.
+        Files are replaced atomically (temp file + rename), so readers and
+        crashes never see a partial write. When saving back to the path the
+        state was loaded from, the save is a compare-and-swap: it raises
+        StaleStateError if another writer has saved a different version
+        since.
+        """
+        path = os.path.abspath(path)
+        with StateLock(path):
+            if path == self._path:
+                on_disk = read_version(path)
+                if on_disk is not None and on_disk != self._base_version:
+                    raise StaleStateError(
+                        f"{path} is at version {on_disk}, but this state was loaded at version {self._base_version}"
+                    )
+
+            if sharded if sharded is not None else is_sharded(path):
+                # History on disk is a prefix of ours only if we loaded it from there
+                write_sharded(path, self.state.to_dict(include_seed=True), append=path == self._path)
+            else:
+                write_atomic(path, self.state.to_json(include_seed=True).encode())
+
+        self._path = path
+        self._base_version = self.state.version
 
     @classmethod
-    def create_new_game(cls, game_id: str, width: int = 20, height: int = 20) -> "GameStateManager":
-        """Create a new game with default setup."""
+    def create_new_game(
+        cls, game_id: str, width: int = 20, height: int = 20, seed: Optional[int] = None
+    ) -> "GameStateManager":
+        """
+        Create a new game with default setup.
+
+        Seeding is opt-in: a seed fixes the map and every combat roll, so
+        anyone who knows it can predict the dice. It is kept out of
+        to_dict() and the strategy view but stored in the state file, so
+        only seed games whose files strategies cannot read (simulations,
+        local replays). Unseeded games roll with the global RNG; the event
+        log records their outcomes for replay.
+        """
         manager = cls()
 
-        # Generate map
-        tiles = manager._generate_map(width, height)
+        # Generate map (from fresh OS entropy when unseeded)
+        tiles = manager._generate_map(width, height, random.Random(seed))
 
         # Gold mine positions (symmetric)
         gold_mine_positions = [
@@ -148,6 +279,8 @@ class GameStateManager:
             buildings=buildings,
             gold_mines=gold_mines,
             history=[],
+            seed=seed,
+            started_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
         )
 
         manager.state = state
@@ -156,7 +289,7 @@ class GameStateManager:
 
         return manager
 
-    def _generate_map(self, width: int, height: int) -> list[Tile]:
+    def _generate_map(self, width: int, height: int, rng=random) -> list[Tile]:
         """Generate a procedural map."""
         tiles = []
 
@@ -166,7 +299,7 @@ class GameStateManager:
                 terrain = TerrainType.GRASS
 
                 # Add some randomness
-                rand = random.random()
+                rand = rng.random()
                 if rand < 0.12:
                     terrain = TerrainType.FOREST
                 elif rand < 0.15:
@@ -176,15 +309,30 @@ class GameStateManager:
 
         return tiles
 
-    def apply_action(self, tribe: TribeColor, action: Action) -> tuple[bool, str, dict]:
+    def apply_action(
+        self, tribe: TribeColor, action: Action, validated: bool = False, rng=None,
+        end_turn: bool = True,
+    ) -> tuple[bool, str, dict]:
         """
         Apply an action to the game state.
+        Pass validated=True if the caller already ran MoveValidator on this
+        exact state and action, to skip validating a second time.
+        rng overrides the dice source for combat (e.g. fixed rolls so a
+        search can explore each outcome of an attack).
+        With end_turn=False the tribe keeps the turn and its history entry
+        is marked continues_turn (used by apply_turn and when replaying
+        multi-action turns).
         Returns (success, message, diff).
         """
         # Validate first
-        valid, error = MoveValidator.validate(self.state, tribe, action)
-        if not valid:
-            return False, error, {}
+        if not validated:
+            valid, error = MoveValidator.validate(self.state, tribe, action)
+            if not valid:
+                return False, error, {}
+
+        # New IDs depend only on the state, so applying many actions in one
+        # process assigns the same IDs as loading the state for each turn
+        self._sync_ids()
 
         diff = {"action": action.to_dict(), "changes": []}
 
@@ -192,7 +340,7 @@ class GameStateManager:
         if action.action == ActionType.MOVE:
             self._apply_move(action, diff)
         elif action.action == ActionType.ATTACK:
-            self._apply_attack(action, diff)
+            self._apply_attack(action, diff, rng or self._combat_rng())
         elif action.action == ActionType.BUILD:
             self._apply_build(tribe, action, diff)
         elif action.action == ActionType.TRAIN:
@@ -208,13 +356,101 @@ class GameStateManager:
             tribe=tribe,
             action=action.action,
             details=action.to_dict(),
+            continues_turn=not end_turn,
         ))
+        self.state.version += 1
 
         # Advance turn
-        self._advance_turn(diff)
+        if end_turn:
+            self._advance_turn(diff)
+
+        if self.events is not None:
+            event = {"event": "action", "tribe": tribe.value, "action": action.to_dict(),
+                     "changes": list(diff["changes"])}
+            if not end_turn:
+                event["continuesTurn"] = True
+            self.events.append(event)
 
         return True, "Action applied successfully", diff
 
+    def apply_turn(
+        self, tribe: TribeColor, actions: list[Action], validated: bool = False
+    ) -> tuple[bool, str, dict]:
+        """
+        Apply a multi-action turn atomically.
+        Each action is validated against the state left by the ones before
+        it, and each unit may act at most once (units trained this turn
+        cannot act). The turn advances once, after the last action. If any
+        action is rejected the state is left untouched.
+        validated=True skips validation for a single action only. Several
+        actions are always validated as they are applied: a dry run
+        (validate_turn) may have rolled different combat dice, so an action
+        it accepted can be illegal on the state the real rolls leave.
+        A single action is applied with apply_action and returns its diff;
+        otherwise the diff lists every action under "actions" and all of
+        their changes in order.
+        Returns (success, message, diff).
+        """
+        if not actions:
+            return False, "No actions given", {}
+        if len(actions) == 1:
+            return self.apply_action(tribe, actions[0], validated=validated)
+
+        self._sync_ids()
+        scratch = self.clone()
+        if self.events is not None:
+            scratch.events = []
+        acted = set()
+        # Ids handed out by this turn's TRAIN actions, whatever the id counters say
+        trained = set()
+        diff = {"actions": [a.to_dict() for a in actions], "changes": []}
+        for i, action in enumerate(actions, start=1):
+            if action.unit_id is not None:
+                if action.unit_id in acted:
+                    return False, f"Action {i}: Unit {action.unit_id} already acted this turn", {}
+                if action.unit_id in trained:
+                    return False, f"Action {i}: Unit {action.unit_id} was trained this turn", {}
+                acted.add(action.unit_id)
+
+            success, message, action_diff = scratch.apply_action(
+                tribe, action, end_turn=i == len(actions)
+            )
+            if not success:
+                return False, f"Action {i}: {message}", {}
+            diff["changes"].extend(action_diff["changes"])
+            trained.update(c["unit_id"] for c in action_diff["changes"] if c["type"] == "unit_trained")
+
+        self.state = scratch.state
+        self._next_unit_id = scratch._next_unit_id
+        self._next_building_id = scratch._next_building_id
+        if self.events is not None:
+            self.events.extend(scratch.events)
+        return True, f"{len(actions)} actions applied successfully", diff
+
+    def applied_diff(self, key: str) -> Optional[dict]:
+        """The diff recorded for a turn applied under this source key, if any."""
+        return self.state.applied.get(key)
+
+    def mark_applied(self, key: str, diff: dict) -> None:
+        """
+        Remember that the turn with this diff was applied for key (e.g. the
+        commit that submitted it), keeping the newest APPLIED_KEYS_LIMIT keys.
+        """
+        remember_applied(self.state.applied, key, diff)
+        if self.events is not None:
+            self.events.append({"event": "applied", "key": key, "diff": diff})
+
+    def validate_turn(self, tribe: TribeColor, actions: list[Action]) -> tuple[bool, str]:
+        """
+        Check a turn without applying it.
+        Several actions are dry-run through apply_turn on a copy of the state.
+        Returns (valid, error_message).
+        """
+        if len(actions) == 1:
+            return MoveValidator.validate(self.state, tribe, actions[0])
+        success, message, _ = self.clone().apply_turn(tribe, actions)
+        return success, "" if success else message
+
     def _apply_move(self, action: Action, diff: dict) -> None:
         """Apply a MOVE action."""
         unit = self.state.get_unit(action.unit_id)
@@ -235,7 +471,7 @@ class GameStateManager:
             "to": list(action.target),
         })
 
-    def _apply_attack(self, action: Action, diff: dict) -> None:
+    def _apply_attack(self, action: Action, diff: dict, rng) -> None:
         """Apply an ATTACK action."""
         attacker = self.state.get_unit(action.unit_id)
         defender = self.state.get_unit(action.target_id)
@@ -246,7 +482,7 @@ class GameStateManager:
 
         # Resolve combat
         attacker_wins, atk_roll, def_roll = GameRules.resolve_combat(
-            attacker, defender, self.state, is_ranged
+            attacker, defender, self.state, is_ranged, rng=rng
         )
 
         if attacker_wins:
@@ -309,6 +545,11 @@ class GameStateManager:
             "position": list(action.position),
             "tribe": tribe.value,
         })
+        diff["changes"].append({
+            "type": "gold_spent",
+            "tribe": tribe.value,
+            "amount": cost,
+        })
 
     def _apply_train(self, tribe: TribeColor, action: Action, diff: dict) -> None:
         """Apply a TRAIN action."""
@@ -334,6 +575,11 @@ class GameStateManager:
             "position": list(building.position),
             "tribe": tribe.value,
         })
+        diff["changes"].append({
+            "type": "gold_spent",
+            "tribe": tribe.value,
+            "amount": cost,
+        })
 
     def _apply_harvest(self, action: Action, diff: dict) -> None:
         """Apply a HARVEST action."""
@@ -369,6 +615,20 @@ class GameStateManager:
             "unit_id": unit.id,
         })
 
+    def skip_turn(self) -> dict:
+        """
+        Advance to the next tribe without an action.
+        Used by simulations when the current tribe has no legal action.
+        Returns the diff.
+        """
+        tribe = self.state.current_tribe
+        diff = {"action": None, "changes": []}
+        self._advance_turn(diff)
+        self.state.version += 1
+        if self.events is not None:
+            self.events.append({"event": "skip", "tribe": tribe.value, "changes": list(diff["changes"])})
+        return diff
+
     def _advance_turn(self, diff: dict) -> None:
         """Advance to the next tribe's turn."""
         # Collect income
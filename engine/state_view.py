@@ -0,0 +1,158 @@
+"""
+Read-only lazy view over a GameState for strategies.
+
+StateView is a Mapping with the same keys and values as
+GameState.to_dict(), but each top-level entry is only built the first
+time a strategy reads it. Strategies that look at a few units never pay
+for serializing the map or the history.
+"""
+
+import os
+import copy
+from collections.abc import Mapping
+from typing import Iterator
+
+from schemas import GameState, GameMap
+
+
+LAZY_STATE_ENV_VAR = "GITVILIZATION_LAZY_STATE"
+
+
+def lazy_state_enabled(flag: bool = False) -> bool:
+    """Return True if the lazy view was requested by flag or environment."""
+    return flag or os.environ.get(LAZY_STATE_ENV_VAR, "") not in ("", "0", "false")
+
+
+class _LazyMapping(Mapping):
+    """Mapping whose values are produced by _build_<name> methods on first access."""
+
+    _KEYS: tuple[str, ...] = ()
+
+    def __init__(self):
+        self._cache: dict = {}
+
+    def __getitem__(self, key: str):
+        if key in self._cache:
+            return self._cache[key]
+        if key not in self._KEYS:
+            raise KeyError(key)
+        value = getattr(self, f"_build_{key}")()
+        self._cache[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __contains__(self, key) -> bool:
+        return key in self._KEYS
+
+    def __repr__(self) -> str:
+        built = ", ".join(self._cache)
+        return f"<{type(self).__name__} keys={list(self._KEYS)} built=[{built}]>"
+
+
+class MapView(_LazyMapping):
+    """Lazy view of GameMap.to_dict(); tiles are only serialized if read."""
+
+    _KEYS = ("width", "height", "tiles")
+
+    def __init__(self, game_map: GameMap):
+        super().__init__()
+        self._map = game_map
+
+    def _build_width(self):
+        return self._map.width
+
+    def _build_height(self):
+        return self._map.height
+
+    def _build_tiles(self):
+        return [t.to_dict() for t in self._map.tiles]
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self._KEYS}
+
+
+class StateView(_LazyMapping):
+    """
+    Read-only, dict-compatible view of GameState.to_dict().
+
+    Values are fresh copies, so a strategy mutating what it reads cannot
+    affect the engine's state. Use to_dict() when a real dict is needed
+    (e.g. for json.dumps).
+    """
+
+    _KEYS = (
+        "gameId",
+        "turn",
+        "version",
+        "currentTribe",
+        "status",
+        "map",
+        "tribes",
+        "units",
+        "buildings",
+        "goldMines",
+        "history",
+    )
+
+    def __init__(self, state: GameState):
+        super().__init__()
+        self._state = state
+        # Optional keys, present only when to_dict() would include them
+        optional = {"startedAt": state.started_at, "applied": state.applied or None}
+        extra = tuple(key for key, value in optional.items() if value is not None)
+        if extra:
+            self._KEYS = StateView._KEYS + extra
+
+    def __reduce__(self):
+        # Pickle the underlying state (e.g. for the sandbox), not the cache
+        return (StateView, (self._state,))
+
+    def _build_gameId(self):
+        return self._state.game_id
+
+    def _build_turn(self):
+        return self._state.turn
+
+    def _build_version(self):
+        return self._state.version
+
+    def _build_currentTribe(self):
+        return self._state.current_tribe.value
+
+    def _build_status(self):
+        return self._state.status.value
+
+    def _build_map(self):
+        return MapView(self._state.map)
+
+    def _build_tribes(self):
+        return {k.value: v.to_dict() for k, v in self._state.tribes.items()}
+
+    def _build_units(self):
+        return [u.to_dict() for u in self._state.units]
+
+    def _build_buildings(self):
+        return [b.to_dict() for b in self._state.buildings]
+
+    def _build_goldMines(self):
+        return [g.to_dict() for g in self._state.gold_mines]
+
+    def _build_history(self):
+        return [h.to_dict() for h in self._state.history]
+
+    def _build_startedAt(self):
+        return self._state.started_at
+
+    def _build_applied(self):
+        return copy.deepcopy(self._state.applied)
+
+    def to_dict(self) -> dict:
+        """Materialize into a plain dict identical to GameState.to_dict()."""
+        result = {key: self[key] for key in self._KEYS}
+        result["map"] = result["map"].to_dict()
+        return result
@@ -0,0 +1,321 @@
+"""
+Helper SDK for tribe strategies.
+
+Strategies receive the game state as a dict. GameView wraps that dict
+with indexed lookups (by tribe, type, position), correct hex distances,
+nearest-enemy queries backed by a spatial index, and the set of tiles a
+unit can legally move to, so strategies don't need their own quadratic
+scans:
+
+    from strategy_sdk import GameView
+
+    def get_action(gamestate):
+        game = GameView(gamestate, "RED")
+        for unit in game.my_combat_units():
+            enemy = game.nearest_enemy(unit, max_distance=1)
+            if enemy:
+                return {"action": "ATTACK", "unit_id": unit["id"], "target_id": enemy["id"]}
+        ...
+
+Indexes are built on first use, so this works well with the lazy
+StateView: the map tiles are only read if a tile query needs them.
+"""
+
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import Callable, Iterable, Optional, Union
+
+from schemas import UNIT_STATS, UnitType
+
+
+Position = tuple[int, int]
+
+HEX_DIRECTIONS = [(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)]
+
+COMBAT_UNIT_TYPES = ("WARRIOR", "ARCHER", "KNIGHT")
+
+IMPASSABLE_TERRAIN = ("WATER", "MOUNTAIN")
+
+UNIT_MOVEMENT = {unit_type.value: stats["movement"] for unit_type, stats in UNIT_STATS.items()}
+UNIT_STRENGTH = {unit_type.value: stats["strength"] for unit_type, stats in UNIT_STATS.items()}
+
+
+def hex_distance(a: Iterable[int], b: Iterable[int]) -> int:
+    """Distance between two axial hex coordinates (same as GameRules.hex_distance)."""
+    aq, ar = a
+    bq, br = b
+    dq = aq - bq
+    dr = ar - br
+    return max(abs(dq), abs(dr), abs(dq + dr))
+
+
+def hex_neighbors(position: Iterable[int]) -> list[Position]:
+    """The six neighbouring hex coordinates (may be off the map)."""
+    q, r = position
+    return [(q + dq, r + dr) for dq, dr in HEX_DIRECTIONS]
+
+
+def hex_ring(center: Position, radius: int) -> list[Position]:
+    """All hexes exactly `radius` away from center."""
+    if radius == 0:
+        return [center]
+    q, r = center
+    # Start at the corner in direction 4 and walk the six sides
+    dq, dr = HEX_DIRECTIONS[4]
+    q, r = q + dq * radius, r + dr * radius
+    results = []
+    for side in range(6):
+        dq, dr = HEX_DIRECTIONS[side]
+        for _ in range(radius):
+            results.append((q, r))
+            q, r = q + dq, r + dr
+    return results
+
+
+def _pos(item: Union[Mapping, Iterable[int]]) -> Position:
+    """Accept a unit/building dict or a position and return a position tuple."""
+    if isinstance(item, Mapping):
+        item = item["position"]
+    q, r = item
+    return (q, r)
+
+
+class SpatialIndex:
+    """Buckets items by hex position for nearest/within-radius queries."""
+
+    def __init__(self, items: Iterable[Mapping] = ()):
+        self._cells: dict[Position, list[Mapping]] = defaultdict(list)
+        self._count = 0
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, item: Mapping) -> None:
+        self._cells[_pos(item)].append(item)
+        self._count += 1
+
+    def at(self, position: Position) -> list[Mapping]:
+        return self._cells.get(position, [])
+
+    def within(self, center: Position, radius: int) -> list[Mapping]:
+        """Items at most `radius` hexes from center."""
+        if 3 * radius * (radius + 1) + 1 > len(self._cells):
+            # Cheaper to scan the occupied cells than the hex disc
+            return [
+                item
+                for pos, items in self._cells.items()
+                if hex_distance(pos, center) <= radius
+                for item in items
+            ]
+        found = []
+        for r in range(radius + 1):
+            for pos in hex_ring(center, r):
+                found.extend(self._cells.get(pos, ()))
+        return found
+
+    def nearest(
+        self,
+        center: Position,
+        predicate: Optional[Callable[[Mapping], bool]] = None,
+        max_distance: Optional[int] = None,
+    ) -> Optional[Mapping]:
+        """Closest item to center (optionally matching predicate), ties by lowest id."""
+        best = None
+        best_key = None
+        radius = 0
+        visited = 0
+        while max_distance is None or radius <= max_distance:
+            ring = hex_ring(center, radius)
+            visited += len(ring)
+            for pos in ring:
+                for item in self._cells.get(pos, ()):
+                    if predicate is None or predicate(item):
+                        key = item.get("id", 0)
+                        if best is None or key < best_key:
+                            best, best_key = item, key
+            if best is not None:
+                return best
+            if visited >= len(self._cells):
+                # Ring search has become more expensive than a scan
+                return self._scan_nearest(center, predicate, max_distance)
+            radius += 1
+        return None
+
+    def _scan_nearest(self, center, predicate, max_distance) -> Optional[Mapping]:
+        best = None
+        best_key = None
+        for pos, items in self._cells.items():
+            distance = hex_distance(pos, center)
+            if max_distance is not None and distance > max_distance:
+                continue
+            for item in items:
+                if predicate is not None and not predicate(item):
+                    continue
+                key = (distance, item.get("id", 0))
+                if best is None or key < best_key:
+                    best, best_key = item, key
+        return best
+
+
+class GameView:
+    """Indexed, read-only helper view of a gamestate dict for one tribe."""
+
+    def __init__(self, gamestate: Mapping, tribe: str):
+        self.gamestate = gamestate
+        self.tribe = tribe.upper()
+        self._units_by_id = None
+        self._units_by_key = None
+        self._unit_index = None
+        self._buildings_by_pos = None
+        self._tiles = None
+
+    # ------------------------------------------------------------------
+    # Indexes (built lazily)
+    # ------------------------------------------------------------------
+
+    def _index_units(self) -> None:
+        self._units_by_id = {}
+        self._units_by_key = defaultdict(list)
+        self._unit_index = SpatialIndex()
+        for unit in self.gamestate["units"]:
+            self._units_by_id[unit["id"]] = unit
+            self._units_by_key[(unit["tribe"], unit["type"])].append(unit)
+            self._units_by_key[(unit["tribe"], None)].append(unit)
+            self._unit_index.add(unit)
+
+    def _index_tiles(self) -> None:
+        self._tiles = {(t["q"], t["r"]): t for t in self.gamestate["map"]["tiles"]}
+
+    @property
+    def units_index(self) -> SpatialIndex:
+        if self._unit_index is None:
+            self._index_units()
+        return self._unit_index
+
+    # ------------------------------------------------------------------
+    # Tribe info
+    # ------------------------------------------------------------------
+
+    @property
+    def gold(self) -> int:
+        return self.gamestate["tribes"][self.tribe]["gold"]
+
+    def units(self, tribe: Optional[str] = None, unit_type: Optional[str] = None) -> list[dict]:
+        """Units of a tribe (default: mine), optionally of one type."""
+        if self._units_by_key is None:
+            self._index_units()
+        return list(self._units_by_key.get(((tribe or self.tribe).upper(), unit_type), ()))
+
+    @property
+    def my_units(self) -> list[dict]:
+        return self.units()
+
+    def my_combat_units(self) -> list[dict]:
+        return [u for u in self.my_units if u["type"] in COMBAT_UNIT_TYPES]
+
+    @property
+    def enemy_units(self) -> list[dict]:
+        return [u for u in self.gamestate["units"] if u["tribe"] != self.tribe]
+
+    def unit(self, unit_id: int) -> Optional[dict]:
+        if self._units_by_id is None:
+            self._index_units()
+        return self._units_by_id.get(unit_id)
+
+    def buildings(self, tribe: Optional[str] = None, building_type: Optional[str] = None) -> list[dict]:
+        tribe = (tribe or self.tribe).upper()
+        return [
+            b for b in self.gamestate["buildings"]
+            if b["tribe"] == tribe and (building_type is None or b["type"] == building_type)
+        ]
+
+    @property
+    def my_castle(self) -> Optional[dict]:
+        return next(iter(self.buildings(building_type="CASTLE")), None)
+
+    # ------------------------------------------------------------------
+    # Position queries
+    # ------------------------------------------------------------------
+
+    def units_at(self, position) -> list[dict]:
+        return list(self.units_index.at(_pos(position)))
+
+    def is_occupied(self, position) -> bool:
+        return bool(self.units_index.at(_pos(position)))
+
+    def building_at(self, position) -> Optional[dict]:
+        if self._buildings_by_pos is None:
+            self._buildings_by_pos = {_pos(b): b for b in self.gamestate["buildings"]}
+        return self._buildings_by_pos.get(_pos(position))
+
+    def tile(self, position) -> Optional[dict]:
+        if self._tiles is None:
+            self._index_tiles()
+        return self._tiles.get(_pos(position))
+
+    def in_bounds(self, position) -> bool:
+        q, r = _pos(position)
+        game_map = self.gamestate["map"]
+        return 0 <= q < game_map["width"] and 0 <= r < game_map["height"]
+
+    def is_passable(self, position) -> bool:
+        tile = self.tile(position)
+        return tile is not None and tile["terrain"] not in IMPASSABLE_TERRAIN
+
+    def can_train_at(self, building: Optional[dict]) -> bool:
+        """True if nothing stands on the building's tile (training needs it free)."""
+        return building is not None and not self.is_occupied(building)
+
+    # ------------------------------------------------------------------
+    # Enemy and movement queries
+    # ------------------------------------------------------------------
+
+    def nearest_enemy(self, origin, max_distance: Optional[int] = None) -> Optional[dict]:
+        """Closest enemy unit to a unit or position (ties broken by lowest id)."""
+        return self.units_index.nearest(
+            _pos(origin),
+            predicate=lambda u: u["tribe"] != self.tribe,
+            max_distance=max_distance,
+        )
+
+    def enemies_within(self, origin, radius: int) -> list[dict]:
+        return [u for u in self.units_index.within(_pos(origin), radius) if u["tribe"] != self.tribe]
+
+    def attack_targets(self, unit: Mapping) -> list[dict]:
+        """Enemy units this unit can attack from where it stands."""
+        if UNIT_STRENGTH[unit["type"]] == 0:
+            return []
+        reach = 2 if unit["type"] == UnitType.ARCHER.value else 1
+        return self.enemies_within(unit, reach)
+
+    def reachable(self, unit: Mapping) -> set[Position]:
+        """Tiles the unit can legally MOVE to this turn (mirrors GameRules.can_move)."""
+        start = _pos(unit)
+        tribe = unit["tribe"]
+        movement = UNIT_MOVEMENT[unit["type"]]
+        result = set()
+        for radius in range(movement + 1):
+            for pos in hex_ring(start, radius):
+                if not self.in_bounds(pos) or not self.is_passable(pos):
+                    continue
+                if any(u["tribe"] != tribe for u in self.units_index.at(pos)):
+                    continue
+                building = self.building_at(pos)
+                if building and building["tribe"] != tribe and building["type"] == "WALL":
+                    continue
+                result.add(pos)
+        return result
+
+    def step_toward(self, unit: Mapping, target) -> Optional[Position]:
+        """The reachable tile closest to target, or None if the unit can't get closer."""
+        target = _pos(target)
+        start = _pos(unit)
+        best = None
+        best_key = (hex_distance(start, target), 0)
+        for pos in self.reachable(unit):
+            key = (hex_distance(pos, target), hex_distance(pos, start))
+            if key < best_key:
+                best, best_key = pos, key
+        return best
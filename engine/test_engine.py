@@ -1,9 +1,14 @@
 """Unit tests for the Git-vilization game engine."""
 
 import unittest
+import unittest.mock
+import random
 import json
 import os
+import shutil
+import subprocess
 import tempfile
+import threading
 
 from schemas import (
     GameState,
@@ -22,10 +27,47 @@ from schemas import (
     GameStatus,
     UNIT_STATS,
     BUILDING_STATS,
+    STARTING_GOLD,
+    parse_actions,
 )
 from rules import GameRules
 from validate import MoveValidator
-from state import GameStateManager
+from state import GameStateManager, StateLock, StaleStateError, APPLIED_KEYS_LIMIT
+from metrics import TurnMetrics
+from server import EngineServer
+from state_view import StateView
+from loader import load_strategy
+from turn_record import TurnRecord, hash_file
+from action_cache import ActionCache
+from loader import find_strategy_path
+from main import run_turn, resolve_turn, validate_only, replay_game, materialize_state, convert_state
+from replay import ReplayError, read_action_records, replay_actions
+from checkpoints import CheckpointStore
+from event_store import EventStore
+from patches import PatchFeed, apply_patch, make_patches
+from archive import GameArchive
+from local_pipeline import LocalPipeline, StrategyProvider
+from strategy_sdk import GameView, hex_distance as sdk_hex_distance, hex_ring
+from sandbox import (
+    StrategySandbox,
+    SandboxLimits,
+    StrategyError,
+    StrategyTimeout,
+    StrategyMemoryError,
+)
+
+try:
+    import numpy as np
+    from analytics import AnalyticsData, build_tables, write_csv
+    import observation
+    from action_space import ActionSpace
+    from environment import GameEnv, VectorEnv
+    from mcts import MCTS, make_strategy
+    import expectimax
+    import evaluation
+    from threat import ThreatMap, attack_range
+except ImportError:
+    np = None
 
 
 class TestGameRules(unittest.TestCase):
@@ -199,10 +241,8 @@ class TestGameStateManager(unittest.TestCase):
         self.state_file = os.path.join(self.test_dir, "gamestate.json")
 
     def tearDown(self):
-        """Clean up test files."""
-        if os.path.exists(self.state_file):
-            os.remove(self.state_file)
-        os.rmdir(self.test_dir)
+        """Clean up test files (the state and its lock file)."""
+        shutil.rmtree(self.test_dir)
 
     def test_create_new_game(self):
         """Create a new game state."""
@@ -224,6 +264,102 @@ class TestGameStateManager(unittest.TestCase):
             self.assertEqual(tribe_state.gold, 100)
             self.assertTrue(tribe_state.alive)
 
+    def test_clone_is_independent(self):
+        """Applying actions to a clone leaves the original untouched."""
+        manager = GameStateManager.create_new_game("clone_test", seed=4)
+        before = manager.state.to_dict()
+        clone = manager.clone()
+        self.assertEqual(clone.state.to_dict(), before)
+
+        action = Action.from_dict(load_strategy(TribeColor.RED)(clone.state.to_dict()))
+        success, _, _ = clone.apply_action(TribeColor.RED, action)
+        self.assertTrue(success)
+        clone.state.map.set_tile_owner(10, 10, TribeColor.RED)
+        self.assertEqual(manager.state.to_dict(), before)
+
+    def test_save_is_atomic_and_versioned(self):
+        """Saves replace the file in one step and each applied action bumps the version."""
+        manager = GameStateManager.create_new_game("version_test", seed=4)
+        manager.save(self.state_file)
+        loaded = GameStateManager.load(self.state_file)
+        self.assertEqual(loaded.state.version, 0)
+
+        action = Action.from_dict(load_strategy(TribeColor.RED)(loaded.state.to_dict()))
+        loaded.apply_action(TribeColor.RED, action)
+        loaded.save(self.state_file)
+        self.assertEqual(GameStateManager.load(self.state_file).state.version, 1)
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ["gamestate.json", "gamestate.json.lock"])
+
+    def test_stale_save_is_rejected(self):
+        """A save based on an older version than the file's fails and leaves the file alone."""
+        GameStateManager.create_new_game("cas_test", seed=4).save(self.state_file)
+        first = GameStateManager.load(self.state_file)
+        second = GameStateManager.load(self.state_file)
+        action = Action.from_dict(load_strategy(TribeColor.RED)(first.state.to_dict()))
+        first.apply_action(TribeColor.RED, action)
+        second.apply_action(TribeColor.RED, action)
+
+        with StateLock(self.state_file):
+            first.save(self.state_file)  # Re-entrant: save takes the lock again
+        with self.assertRaises(StaleStateError):
+            second.save(self.state_file)
+        self.assertEqual(GameStateManager.load(self.state_file).state.to_dict(), first.state.to_dict())
+
+        # Saving elsewhere is not a compare-and-swap
+        second.save(os.path.join(self.test_dir, "other.json"))
+
+    def test_sharded_state_round_trip(self):
+        """A directory path saves map, dynamic state and history separately and loads them merged."""
+        shard_dir = os.path.join(self.test_dir, "game")
+        manager = GameStateManager.create_new_game("shard_test", seed=4)
+        manager.save(shard_dir, sharded=True)
+        map_stamp = os.stat(os.path.join(shard_dir, "map.json")).st_mtime_ns
+
+        strategies = {tribe: load_strategy(tribe) for tribe in TribeColor}
+        for _ in range(8):
+            manager = GameStateManager.load(shard_dir)
+            tribe = manager.state.current_tribe
+            manager.apply_action(tribe, Action.from_dict(strategies[tribe](manager.state.to_dict())))
+            manager.save(shard_dir)
+            self.assertEqual(GameStateManager.load(shard_dir).state.to_dict(), manager.state.to_dict())
+
+        self.assertEqual(os.stat(os.path.join(shard_dir, "map.json")).st_mtime_ns, map_stamp)
+        with open(os.path.join(shard_dir, "state.json")) as f:
+            self.assertNotIn("terrain", f.read())
+        with open(os.path.join(shard_dir, "history.jsonl")) as f:
+            self.assertEqual(len(f.readlines()), 8)
+
+        # Converting back gives the single-file form
+        manager.save(self.state_file)
+        with open(self.state_file) as f:
+            self.assertEqual(json.load(f), manager.state.to_dict(include_seed=True))
+
+    def test_new_paths_are_json_unless_sharded(self):
+        """A path without an extension is still a JSON file unless sharding is asked for."""
+        path = os.path.join(self.test_dir, "game")
+        GameStateManager.create_new_game("shard_test", seed=4).save(path)
+        self.assertTrue(os.path.isfile(path))
+
+        shard_dir = os.path.join(self.test_dir, "game.d")
+        self.assertEqual(convert_state(path, shard_dir, sharded=True), 0)
+        self.assertTrue(os.path.isfile(os.path.join(shard_dir, "state.json")))
+        self.assertEqual(GameStateManager.load(shard_dir).state.to_dict(), GameStateManager.load(path).state.to_dict())
+
+    def test_sharded_history_tail_is_ignored(self):
+        """History lines not counted by state.json (an interrupted save) are dropped."""
+        shard_dir = os.path.join(self.test_dir, "game")
+        manager = GameStateManager.create_new_game("shard_test", seed=4)
+        manager.save(shard_dir, sharded=True)
+        with open(os.path.join(shard_dir, "history.jsonl"), "a") as f:
+            f.write('{"partial": ')
+        loaded = GameStateManager.load(shard_dir)
+        self.assertEqual(loaded.state.to_dict(), manager.state.to_dict())
+
+        action = Action.from_dict(load_strategy(TribeColor.RED)(loaded.state.to_dict()))
+        loaded.apply_action(TribeColor.RED, action)
+        loaded.save(shard_dir)
+        self.assertEqual(GameStateManager.load(shard_dir).state.to_dict(), loaded.state.to_dict())
+
 
 class TestSerialization(unittest.TestCase):
     """Test JSON serialization/deserialization."""
@@ -331,5 +467,1568 @@ class TestSerialization(unittest.TestCase):
         self.assertEqual(len(restored.buildings), len(state.buildings))
 
 
+class TestTurnMetrics(unittest.TestCase):
+    """Test per-phase timing instrumentation."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.metrics_file = os.path.join(self.test_dir, "metrics.json")
+
+    def tearDown(self):
+        if os.path.exists(self.metrics_file):
+            os.remove(self.metrics_file)
+        os.rmdir(self.test_dir)
+
+    def test_phases_recorded(self):
+        """Each phase records wall time, CPU time and the memory high-water mark."""
+        metrics = TurnMetrics(enabled=True)
+        with metrics.phase("load"):
+            pass
+        with metrics.phase("save"):
+            pass
+
+        self.assertEqual([p["phase"] for p in metrics.phases], ["load", "save"])
+        for phase in metrics.phases:
+            self.assertIn("wall_ms", phase)
+            self.assertIn("cpu_ms", phase)
+            self.assertNotIn("child_cpu_ms", phase)
+        self.assertGreater(metrics.phases[0]["max_rss_kb"], 0)
+
+    def test_sandbox_child_usage_recorded(self):
+        """CPU and memory used by the sandbox worker are attributed to the phase it ran in."""
+        strategy_file = os.path.join(self.test_dir, "strategy.py")
+        with open(strategy_file, "w") as f:
+            f.write("def get_action(gamestate):\n    sum(range(3000000))\n    return {}\n")
+        metrics = TurnMetrics(enabled=True)
+        try:
+            with metrics.phase("strategy_execution"):
+                StrategySandbox().run(strategy_file, TribeColor.RED, {})
+        finally:
+            os.remove(strategy_file)
+
+        phase = metrics.phases[0]
+        self.assertGreater(phase["child_cpu_ms"], 0)
+        self.assertGreater(phase["child_max_rss_kb"], 0)
+        self.assertGreater(metrics.summary()["child_cpu_ms"], 0)
+
+    def test_disabled_is_noop(self):
+        """Disabled metrics record nothing and write no file."""
+        metrics = TurnMetrics(enabled=False)
+        with metrics.phase("load"):
+            pass
+        metrics.write(self.metrics_file)
+        self.assertEqual(metrics.phases, [])
+        self.assertFalse(os.path.exists(self.metrics_file))
+
+    def test_write_appends_records(self):
+        """Each command appends one record to the metrics file."""
+        for turn in (1, 2):
+            metrics = TurnMetrics(enabled=True)
+            metrics.annotate(turn=turn)
+            with metrics.phase("load"):
+                pass
+            metrics.write(self.metrics_file, command="run")
+
+        with open(self.metrics_file) as f:
+            records = json.load(f)
+        self.assertEqual([r["turn"] for r in records], [1, 2])
+        self.assertEqual(records[0]["command"], "run")
+
+
+class TestEngineServer(unittest.TestCase):
+    """Test the warm-cache engine daemon."""
+
+    STRATEGY = (
+        "def get_action(gamestate):\n"
+        "    castle = next(b for b in gamestate['buildings']\n"
+        "                  if b['tribe'] == 'RED' and b['type'] == 'CASTLE')\n"
+        "    return {'action': 'TRAIN', 'unit_type': '%s', 'building_id': castle['id']}\n"
+    )
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.test_dir, "gamestate.json")
+        self.strategy_file = os.path.join(self.test_dir, "strategy.py")
+        GameStateManager.create_new_game("server_test").save(self.state_file)
+        self._write_strategy("WORKER")
+        self.sandbox = StrategySandbox()
+        self.server = EngineServer(self.sandbox)
+
+    def tearDown(self):
+        self.sandbox.close()
+        shutil.rmtree(self.test_dir)
+
+    def _write_strategy(self, unit_type):
+        with open(self.strategy_file, "w") as f:
+            f.write(self.STRATEGY % unit_type)
+
+    def _call(self, method, **params):
+        params.setdefault("state", self.state_file)
+        params.setdefault("tribe", "RED")
+        params.setdefault("strategy", self.strategy_file)
+        response = self.server.handle({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+        return response["result"]
+
+    def test_validate_and_preview_do_not_modify_state(self):
+        """Validate and preview leave both the file and the warm state untouched."""
+        self.assertEqual(self._call("validate")["code"], 0)
+        preview = self._call("preview")
+        self.assertEqual(preview["code"], 0)
+        self.assertEqual(preview["diff"]["changes"][0]["type"], "unit_trained")
+        self.assertEqual(self.server.get_manager(self.state_file).state.current_tribe, TribeColor.RED)
+        self.assertEqual(GameStateManager.load(self.state_file).state.current_tribe, TribeColor.RED)
+
+    def test_run_saves_and_keeps_state_warm(self):
+        """Run applies and saves; the next request sees the new state without reloading."""
+        self.assertEqual(self._call("run")["code"], 0)
+        manager = self.server.get_manager(self.state_file)
+        self.assertEqual(manager.state.current_tribe, TribeColor.BLUE)
+        self.assertEqual(GameStateManager.load(self.state_file).state.current_tribe, TribeColor.BLUE)
+        self.assertEqual(self._call("validate")["code"], 1)  # No longer RED's turn
+
+    def test_run_records_like_main(self):
+        """Run takes the same source key and event log as main.py run, so a retry is a no-op."""
+        events = os.path.join(self.test_dir, "events")
+        self.assertEqual(self._call("run", source_key="abc", events=events)["code"], 0)
+        with open(self.state_file) as f:
+            saved = f.read()
+        retry = self._call("run", source_key="abc", events=events)
+        self.assertEqual(retry["code"], 0)
+        self.assertEqual(retry["diff"]["changes"][0]["type"], "unit_trained")
+        with open(self.state_file) as f:
+            self.assertEqual(f.read(), saved)
+        self.assertEqual(EventStore(events).event_count, 2)  # the action and its applied key
+
+    def test_run_waits_for_state_lock(self):
+        """Run holds the state file's lock from load to save, as main.py run does."""
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with StateLock(self.state_file):
+                locked.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait()
+        results = []
+        runner = threading.Thread(target=lambda: results.append(self._call("run")))
+        runner.start()
+        runner.join(0.3)
+        self.assertTrue(runner.is_alive())
+        self.assertEqual(GameStateManager.load(self.state_file).state.current_tribe, TribeColor.RED)
+        release.set()
+        runner.join()
+        holder.join()
+        self.assertEqual(results[0]["code"], 0)
+
+    def test_failed_save_drops_warm_state(self):
+        """A save that fails leaves neither the file nor the warm state with the turn."""
+        with unittest.mock.patch.object(GameStateManager, "save", side_effect=OSError("disk full")):
+            response = self.server.handle({"jsonrpc": "2.0", "id": 1, "method": "run", "params": {
+                "state": self.state_file, "tribe": "RED", "strategy": self.strategy_file}})
+        self.assertIn("disk full", response["error"]["message"])
+        self.assertEqual(self.server.ping({})["states"], 0)
+        self.assertEqual(self.server.get_manager(self.state_file).state.current_tribe, TribeColor.RED)
+        self.assertEqual(self._call("run")["code"], 0)
+
+    def test_run_requires_sandbox(self):
+        """Without a sandbox the daemon still validates in-process but refuses to save turns."""
+        unsandboxed = EngineServer()
+        params = {"state": self.state_file, "tribe": "RED", "strategy": self.strategy_file}
+        validate = unsandboxed.handle({"jsonrpc": "2.0", "id": 1, "method": "validate", "params": params})
+        self.assertEqual(validate["result"]["code"], 0)
+        run = unsandboxed.handle({"jsonrpc": "2.0", "id": 2, "method": "run", "params": params})
+        self.assertEqual(run["result"]["code"], 2)
+        self.assertIn("--sandbox", run["result"]["message"])
+        self.assertEqual(GameStateManager.load(self.state_file).state.current_tribe, TribeColor.RED)
+
+    def test_sandboxed_strategy_limits(self):
+        """Strategies run in the sandbox's workers, with its exit codes for limits."""
+        with open(self.strategy_file, "w") as f:
+            f.write("import os\ndef get_action(gamestate):\n    os._exit(0)\n")
+        self.assertEqual(self._call("run")["code"], 2)
+        self.assertEqual(self.server.ping({})["states"], 1)  # The daemon itself survived
+        self.server.sandbox.limits.wall_seconds = 0.5
+        with open(self.strategy_file, "w") as f:
+            f.write("import time\ndef get_action(gamestate):\n    time.sleep(5)\n")
+        self.assertEqual(self._call("run")["code"], 3)
+        self.assertEqual(GameStateManager.load(self.state_file).state.current_tribe, TribeColor.RED)
+
+    def test_strategy_change_invalidates_cache(self):
+        """Editing the strategy file is picked up on the next request."""
+        self.server = EngineServer()  # Strategies are only cached when run in-process
+        self.assertEqual(self._call("validate")["action"]["unit_type"], "WORKER")
+        self._write_strategy("SETTLER")
+        os.utime(self.strategy_file, ns=(0, 1))  # Force a different mtime
+        self.assertEqual(self._call("validate")["action"]["unit_type"], "SETTLER")
+
+    def test_unknown_method(self):
+        """Unknown methods return a JSON-RPC error."""
+        response = self.server.handle({"jsonrpc": "2.0", "id": 7, "method": "nope"})
+        self.assertEqual(response["error"]["code"], -32601)
+
+
+class TestStrategySandbox(unittest.TestCase):
+    """Test resource-limited strategy execution."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.strategy_file = os.path.join(self.test_dir, "strategy.py")
+
+    def tearDown(self):
+        os.remove(self.strategy_file)
+        os.rmdir(self.test_dir)
+
+    def _run(self, body, **limits):
+        with open(self.strategy_file, "w") as f:
+            f.write("def get_action(gamestate):\n" + body)
+        sandbox = StrategySandbox(SandboxLimits(**limits))
+        return sandbox.run(self.strategy_file, TribeColor.RED, {"turn": 3})
+
+    def test_returns_action(self):
+        """A well-behaved strategy's action comes back over the pipe."""
+        action = self._run("    return {'action': 'MOVE', 'unit_id': gamestate['turn'], 'target': [1, 1]}\n")
+        self.assertEqual(action, {"action": "MOVE", "unit_id": 3, "target": [1, 1]})
+
+    def test_strategy_exception(self):
+        """Exceptions in the strategy surface as StrategyError."""
+        with self.assertRaises(StrategyError):
+            self._run("    raise ValueError('boom')\n")
+
+    def test_cpu_limit(self):
+        """An infinite loop is stopped by the CPU-time limit."""
+        with self.assertRaises(StrategyTimeout):
+            self._run("    while True:\n        pass\n", cpu_seconds=1, wall_seconds=10)
+
+    def test_wall_limit(self):
+        """A strategy that blocks is stopped by the wall-time limit."""
+        with self.assertRaises(StrategyTimeout):
+            self._run("    import time\n    time.sleep(10)\n", wall_seconds=0.3)
+
+    def test_memory_limit(self):
+        """A memory blowup is stopped by the memory limit."""
+        with self.assertRaises(StrategyMemoryError):
+            self._run("    data = bytearray(256 * 1024 * 1024)\n    return {}\n", memory_mb=64)
+
+
+class TestStateView(unittest.TestCase):
+    """Test the lazy read-only state view."""
+
+    def setUp(self):
+        self.state = GameStateManager.create_new_game("view_test").state
+
+    def test_matches_to_dict(self):
+        """The view has the same keys and values as to_dict()."""
+        view = StateView(self.state)
+        self.assertEqual(list(view.keys()), list(self.state.to_dict().keys()))
+        self.assertEqual(view.to_dict(), self.state.to_dict())
+        self.assertEqual(dict(view["map"]), self.state.to_dict()["map"])
+
+    def test_entries_built_on_access(self):
+        """Only entries that are read get built."""
+        view = StateView(self.state)
+        view["units"]
+        self.assertEqual(list(view._cache), ["units"])
+        self.assertNotIn("tiles", view["map"]._cache)
+
+    def test_read_only(self):
+        """Mutating what the view returns does not touch the state."""
+        view = StateView(self.state)
+        view["units"][0]["position"] = [9, 9]
+        self.assertNotEqual(self.state.units[0].position, (9, 9))
+        with self.assertRaises(TypeError):
+            view["turn"] = 5
+
+    def test_existing_strategies_unchanged(self):
+        """Every tribe strategy returns the same action for the view and the dict."""
+        for tribe in TribeColor:
+            self.state.current_tribe = tribe
+            get_action = load_strategy(tribe)
+            self.assertEqual(get_action(StateView(self.state)), get_action(self.state.to_dict()))
+
+
+class TestStrategySDK(unittest.TestCase):
+    """Test the strategy helper SDK against the engine rules."""
+
+    def setUp(self):
+        self.manager = GameStateManager.create_new_game("sdk_test")
+        state = self.manager.state
+        state.units += [
+            Unit(id=50, tribe=TribeColor.BLUE, type=UnitType.WARRIOR, position=(4, 3)),
+            Unit(id=51, tribe=TribeColor.GREEN, type=UnitType.ARCHER, position=(2, 5)),
+            Unit(id=52, tribe=TribeColor.RED, type=UnitType.WARRIOR, position=(3, 3)),
+        ]
+        state.buildings.append(
+            Building(id=50, tribe=TribeColor.BLUE, type=BuildingType.WALL, position=(2, 2), hp=5)
+        )
+        self.state = state
+        self.game = GameView(state.to_dict(), "RED")
+
+    def test_hex_distance_matches_rules(self):
+        """SDK distance agrees with GameRules.hex_distance."""
+        for a in [(0, 0), (3, 7), (10, 2)]:
+            for b in [(0, 0), (5, 5), (9, 1), (2, 8)]:
+                self.assertEqual(sdk_hex_distance(a, b), GameRules.hex_distance(a, b))
+
+    def test_hex_ring(self):
+        """Rings contain exactly the hexes at that distance."""
+        for radius in range(4):
+            ring = hex_ring((5, 5), radius)
+            self.assertEqual(len(ring), max(1, 6 * radius))
+            self.assertTrue(all(sdk_hex_distance(p, (5, 5)) == radius for p in ring))
+
+    def test_indexed_lookups(self):
+        """Units can be looked up by tribe, type, id and position."""
+        self.assertEqual([u["id"] for u in self.game.units(unit_type="WARRIOR")], [52])
+        self.assertEqual(self.game.unit(50)["tribe"], "BLUE")
+        self.assertEqual([u["id"] for u in self.game.units_at((4, 3))], [50])
+        self.assertEqual(self.game.my_castle["position"], [0, 0])
+
+    def test_nearest_enemy_matches_brute_force(self):
+        """Nearest enemy query agrees with a full scan."""
+        for unit in self.game.my_units:
+            enemies = [u for u in self.state.to_dict()["units"] if u["tribe"] != "RED"]
+            best = min(enemies, key=lambda e: (sdk_hex_distance(e["position"], unit["position"]), e["id"]))
+            self.assertEqual(self.game.nearest_enemy(unit)["id"], best["id"])
+        self.assertEqual(self.game.nearest_enemy((3, 3), max_distance=1)["id"], 50)
+        self.assertIsNone(self.game.nearest_enemy((10, 10), max_distance=1))
+
+    def test_reachable_matches_can_move(self):
+        """Reachable tiles are exactly those GameRules.can_move accepts."""
+        for unit in self.state.units:
+            if unit.tribe != TribeColor.RED:
+                continue
+            expected = {
+                (t.q, t.r) for t in self.state.map.tiles
+                if GameRules.can_move(self.state, unit, (t.q, t.r))[0]
+            }
+            self.assertEqual(self.game.reachable(unit.to_dict()), expected)
+
+
+class TestTurnRecord(unittest.TestCase):
+    """Test single-pass resolve and turn record reuse."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.test_dir, "gamestate.json")
+        self.record_file = os.path.join(self.test_dir, "turn_record.json")
+        self.diff_file = os.path.join(self.test_dir, "diff.json")
+        GameStateManager.create_new_game("record_test").save(self.state_file)
+
+    def tearDown(self):
+        for name in os.listdir(self.test_dir):
+            os.remove(os.path.join(self.test_dir, name))
+        os.rmdir(self.test_dir)
+
+    def _trained_unit_type(self):
+        with open(self.diff_file) as f:
+            return json.load(f)["changes"][0]["unit_type"]
+
+    def test_resolve_writes_record_and_preview(self):
+        """Resolve records the action and writes a preview without saving."""
+        self.assertEqual(resolve_turn(self.state_file, "RED", self.record_file, self.diff_file), 0)
+        record = TurnRecord.load(self.record_file)
+        self.assertEqual(record.state_hash, hash_file(self.state_file))
+        self.assertEqual(record.action["action"], "TRAIN")
+        self.assertEqual(self._trained_unit_type(), "WORKER")
+        self.assertEqual(GameStateManager.load(self.state_file).state.current_tribe, TribeColor.RED)
+
+    def test_run_reuses_matching_record(self):
+        """A matching record is applied without executing the strategy."""
+        record = TurnRecord(
+            state_hash=hash_file(self.state_file),
+            strategy_hash=hash_file(find_strategy_path(TribeColor.RED)),
+            tribe=TribeColor.RED,
+            turn=1,
+            action={"action": "TRAIN", "unit_type": "SETTLER", "building_id": 1},
+        )
+        record.save(self.record_file)
+        self.assertEqual(run_turn(self.state_file, "RED", self.diff_file, record_path=self.record_file), 0)
+        self.assertEqual(self._trained_unit_type(), "SETTLER")
+
+    def test_run_ignores_stale_record(self):
+        """A record for a different state falls back to executing the strategy."""
+        record = TurnRecord(
+            state_hash="0" * 64,
+            strategy_hash=hash_file(find_strategy_path(TribeColor.RED)),
+            tribe=TribeColor.RED,
+            turn=1,
+            action={"action": "TRAIN", "unit_type": "SETTLER", "building_id": 1},
+        )
+        record.save(self.record_file)
+        self.assertEqual(run_turn(self.state_file, "RED", self.diff_file, record_path=self.record_file), 0)
+        self.assertEqual(self._trained_unit_type(), "WORKER")
+
+    def test_tampered_record_rejected(self):
+        """Editing a record's action invalidates its content address."""
+        resolve_turn(self.state_file, "RED", self.record_file)
+        with open(self.record_file) as f:
+            data = json.load(f)
+        data["action"]["unit_type"] = "KNIGHT"
+        with self.assertRaises(ValueError):
+            TurnRecord.from_dict(data)
+
+    def test_retried_run_is_a_noop(self):
+        """Running again with the same source key rewrites the original diff and applies nothing."""
+        self.assertEqual(run_turn(self.state_file, "RED", self.diff_file, source_key="abc123"), 0)
+        with open(self.diff_file) as f:
+            first_diff = json.load(f)
+        applied = GameStateManager.load(self.state_file).state
+        self.assertEqual(applied.current_tribe, TribeColor.BLUE)
+
+        os.remove(self.diff_file)
+        self.assertEqual(run_turn(self.state_file, "RED", self.diff_file, source_key="abc123"), 0)
+        with open(self.diff_file) as f:
+            self.assertEqual(json.load(f), first_diff)
+        self.assertEqual(GameStateManager.load(self.state_file).state.to_dict(), applied.to_dict())
+
+        # A new change is a new turn (and it is no longer RED's)
+        self.assertEqual(run_turn(self.state_file, "RED", self.diff_file, source_key="def456"), 1)
+
+    def test_applied_keys_are_bounded(self):
+        """Only the most recent source keys are remembered."""
+        manager = GameStateManager.load(self.state_file)
+        for i in range(APPLIED_KEYS_LIMIT + 5):
+            manager.mark_applied(f"key{i}", {"changes": []})
+        self.assertEqual(len(manager.state.applied), APPLIED_KEYS_LIMIT)
+        self.assertIsNone(manager.applied_diff("key0"))
+        self.assertIsNotNone(manager.applied_diff(f"key{APPLIED_KEYS_LIMIT + 4}"))
+
+
+class TestActionCache(unittest.TestCase):
+    """Test the on-disk strategy result cache."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.test_dir, "cache")
+        self.state_file = os.path.join(self.test_dir, "gamestate.json")
+        self.diff_file = os.path.join(self.test_dir, "diff.json")
+        GameStateManager.create_new_game("cache_test").save(self.state_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_get_put(self):
+        """Stored actions are returned only for the same state and strategy hashes."""
+        cache = ActionCache(self.cache_dir)
+        self.assertIsNone(cache.get("s1", "t1"))
+        cache.put("s1", "t1", {"action": "MOVE", "unit_id": 1, "target": [1, 1]})
+        self.assertEqual(cache.get("s1", "t1")["unit_id"], 1)
+        self.assertIsNone(cache.get("s1", "t2"))
+        self.assertIsNone(cache.get("s2", "t1"))
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted when over capacity."""
+        cache = ActionCache(self.cache_dir, max_entries=2)
+        cache.put("a", "x", {"action": "MOVE"})
+        cache.put("b", "x", {"action": "MOVE"})
+        old = os.path.join(self.cache_dir, ActionCache.key("b", "x") + ".json")
+        os.utime(old, ns=(0, 0))  # "b" is now the oldest
+        cache.get("a", "x")
+        cache.put("c", "x", {"action": "MOVE"})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b", "x"))
+        self.assertIsNotNone(cache.get("a", "x"))
+        self.assertIsNotNone(cache.get("c", "x"))
+
+    def test_run_turn_uses_cached_action(self):
+        """run_turn applies the cached action instead of executing the strategy."""
+        cache = ActionCache(self.cache_dir)
+        cache.put(
+            hash_file(self.state_file),
+            hash_file(find_strategy_path(TribeColor.RED)),
+            {"action": "TRAIN", "unit_type": "SETTLER", "building_id": 1},
+        )
+        self.assertEqual(run_turn(self.state_file, "RED", self.diff_file, cache=cache), 0)
+        with open(self.diff_file) as f:
+            self.assertEqual(json.load(f)["changes"][0]["unit_type"], "SETTLER")
+
+    def test_cached_actions_are_validated(self):
+        """A cached action the rules reject (e.g. from an older engine) is not applied."""
+        cache = ActionCache(self.cache_dir)
+        cache.put(
+            hash_file(self.state_file),
+            hash_file(find_strategy_path(TribeColor.RED)),
+            {"action": "TRAIN", "unit_type": "SETTLER", "building_id": 2},  # BLUE's castle
+        )
+        with open(self.state_file) as f:
+            before = f.read()
+        self.assertEqual(run_turn(self.state_file, "RED", self.diff_file, cache=cache), 1)
+        with open(self.state_file) as f:
+            self.assertEqual(f.read(), before)
+
+    def test_validate_populates_cache(self):
+        """A successful validation stores the action for the apply step."""
+        cache = ActionCache(self.cache_dir)
+        self.assertEqual(validate_only(self.state_file, "RED", cache=cache), 0)
+        cached = cache.get(hash_file(self.state_file), hash_file(find_strategy_path(TribeColor.RED)))
+        self.assertEqual(cached["unit_type"], "WORKER")
+
+
+class TestReplay(unittest.TestCase):
+    """Test batch replay of recorded actions."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.test_dir, "start.json")
+        self.actions_file = os.path.join(self.test_dir, "actions.jsonl")
+        self.output_file = os.path.join(self.test_dir, "final.json")
+        self.diffs_file = os.path.join(self.test_dir, "diffs.jsonl")
+        GameStateManager.create_new_game("replay_test").save(self.state_file)
+        self.records = [
+            {"tribe": tribe, "action": {"action": "TRAIN", "unit_type": "WORKER", "building_id": building_id}}
+            for building_id, tribe in enumerate(["RED", "BLUE", "GREEN", "YELLOW"], start=1)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write_actions(self, records):
+        with open(self.actions_file, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def test_replay_matches_sequential_apply(self):
+        """Replaying a batch gives the same final state as applying one at a time."""
+        self._write_actions(self.records)
+        self.assertEqual(replay_game(self.state_file, self.actions_file, self.output_file, self.diffs_file), 0)
+
+        expected = GameStateManager.load(self.state_file)
+        for record in self.records:
+            expected.apply_action(TribeColor(record["tribe"]), Action.from_dict(record["action"]))
+
+        final = GameStateManager.load(self.output_file).state
+        self.assertEqual(final.turn, 2)
+        self.assertEqual(final.to_dict()["units"], expected.state.to_dict()["units"])
+        with open(self.diffs_file) as f:
+            diffs = [json.loads(line) for line in f]
+        self.assertEqual(len(diffs), 4)
+        self.assertEqual(diffs[1]["tribe"], "BLUE")
+
+    def test_accepts_history_entries(self):
+        """Entries copied from GameState.history can be replayed directly."""
+        self._write_actions(self.records)
+        replay_game(self.state_file, self.actions_file, self.output_file)
+        history = GameStateManager.load(self.output_file).state.history
+        self._write_actions([entry.to_dict() for entry in history])
+        second_output = os.path.join(self.test_dir, "again.json")
+        self.assertEqual(replay_game(self.state_file, self.actions_file, second_output), 0)
+        self.assertEqual(
+            GameStateManager.load(second_output).state.to_dict()["units"],
+            GameStateManager.load(self.output_file).state.to_dict()["units"],
+        )
+
+    def test_stops_at_invalid_action(self):
+        """An invalid action stops the replay and reports its line number."""
+        records = list(self.records)
+        records[2] = {"tribe": "GREEN", "action": {"action": "TRAIN", "unit_type": "WORKER", "building_id": 1}}
+        self._write_actions(records)
+        manager = GameStateManager.load(self.state_file)
+        with self.assertRaises(ReplayError) as ctx:
+            replay_actions(manager, read_action_records(self.actions_file))
+        self.assertEqual(ctx.exception.line, 3)
+        self.assertEqual(replay_game(self.state_file, self.actions_file, self.output_file), 1)
+        self.assertFalse(os.path.exists(self.output_file))
+
+
+class TestCheckpoints(unittest.TestCase):
+    """Test keyframe checkpoints and seeded replays."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = CheckpointStore(os.path.join(self.test_dir, "checkpoints"), interval=8)
+
+        # Play the bundled strategies on a seeded game, keeping every state
+        manager = GameStateManager.create_new_game("checkpoint_test", seed=7)
+        strategies = {tribe: load_strategy(tribe) for tribe in TribeColor}
+        self.store.record(manager.state)
+        self.states = [manager.state.to_dict()]
+        for _ in range(40):
+            tribe = manager.state.current_tribe
+            action = Action.from_dict(strategies[tribe](manager.state.to_dict()))
+            success, _, _ = manager.apply_action(tribe, action)
+            if not success:
+                break
+            self.store.record(manager.state)
+            self.states.append(manager.state.to_dict())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_keyframes_every_interval(self):
+        """A keyframe is written for the first state and every interval actions."""
+        self.assertEqual(self.store.keyframes, list(range(0, len(self.states), 8)))
+        self.assertEqual(self.store.action_count, len(self.states) - 1)
+
+    def test_seek_matches_played_states(self):
+        """Seeking to any action index rebuilds the exact state, dice included."""
+        for index in (0, 5, 8, 13, len(self.states) - 1):
+            self.assertEqual(self.store.seek(index).to_dict(), self.states[index])
+
+    def test_seek_turn(self):
+        """Seeking to a turn gives the state before that turn's first action."""
+        state = self.store.seek_turn(3)
+        self.assertEqual(state.turn, 3)
+        self.assertEqual(state.current_tribe, TribeColor.RED)
+        self.assertEqual(len(state.history), 8)
+
+    def test_reopened_store(self):
+        """The index on disk is enough to seek from a new store instance."""
+        reopened = CheckpointStore(self.store.directory)
+        self.assertEqual(reopened.interval, 8)
+        self.assertEqual(reopened.seek(10).to_dict(), self.states[10])
+
+    def test_seek_reads_log_from_keyframe(self):
+        """Seeks start reading the log at the keyframe's offset, not its first line."""
+        with open(self.store.log_path, "rb") as f:
+            lines = f.readlines()
+        # Blank out (same length, so offsets hold) everything before keyframe 8
+        garbage = [b"x" * (len(line) - 1) + b"\n" for line in lines[:8]]
+        with open(self.store.log_path, "wb") as f:
+            f.writelines(garbage + lines[8:])
+        self.assertEqual(self.store.seek(20).to_dict(), self.states[20])
+        self.assertEqual(self.store.seek_turn(5).to_dict(), self.states[16])
+
+    def test_index_without_offsets(self):
+        """Indexes written before keyframe offsets were stored are rebuilt on open."""
+        with open(self.store.index_path) as f:
+            index = json.load(f)
+        del index["keyframeOffsets"], index["keyframeTurns"]
+        with open(self.store.index_path, "w") as f:
+            json.dump(index, f)
+        reopened = CheckpointStore(self.store.directory)
+        self.assertEqual(reopened.keyframe_offsets, self.store.keyframe_offsets)
+        self.assertEqual(reopened.keyframe_turns, self.store.keyframe_turns)
+        self.assertEqual(reopened.seek(13).to_dict(), self.states[13])
+
+    def test_interrupted_record_is_dropped(self):
+        """Log lines written after the last index update are overwritten by the next record."""
+        with open(self.store.log_path, "a") as f:
+            f.write('{"partial": true}\n')
+        state = GameState.from_dict(self.states[-1])
+        state.history.append(state.history[-1])
+        reopened = CheckpointStore(self.store.directory)
+        reopened.record(state)
+        with open(reopened.log_path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines, [entry.to_dict() for entry in state.history])
+
+    def test_unseeded_seek_stops_at_keyframes(self):
+        """Without a seed only keyframes can be sought: replayed combat would diverge."""
+        store = CheckpointStore(os.path.join(self.test_dir, "unseeded"), interval=8)
+        for data in self.states:
+            state = GameState.from_dict(data)
+            state.seed = None
+            store.record(state)
+        self.assertEqual(store.seek(8).units, GameState.from_dict(self.states[8]).units)
+        with self.assertRaises(ValueError):
+            store.seek(10)
+
+    def test_seed_is_opt_in_and_private(self):
+        """New games are unseeded by default; a seed is saved but never shown to strategies."""
+        self.assertIsNone(GameStateManager.create_new_game("unseeded").state.seed)
+        state = self.store.seek(0)
+        self.assertEqual(state.seed, 7)
+        self.assertNotIn("seed", state.to_dict())
+        self.assertNotIn("seed", StateView(state).to_dict())
+
+        path = os.path.join(self.test_dir, "seeded.json")
+        GameStateManager.from_state(state).save(path)
+        self.assertEqual(GameStateManager.load(path).state.seed, 7)
+
+    def test_seeded_combat_rolls(self):
+        """Seeded games roll the same dice for the same action index."""
+        rolls = []
+        for _ in range(2):
+            manager = GameStateManager.from_state(self.store.seek(0))
+            rolls.append([manager._combat_rng().randint(1, 6) for _ in range(5)])
+        self.assertEqual(rolls[0], rolls[1])
+
+
+class TestGameArchive(unittest.TestCase):
+    """Test the finished-game archive and its index."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.archive = GameArchive(os.path.join(self.test_dir, "history"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _finished_game(self, game_id, winner, turns, started_at="2026-01-01T00:00:00+00:00"):
+        state = GameStateManager.create_new_game(game_id, seed=1).state
+        state.buildings = [b for b in state.buildings if b.tribe == winner]
+        for tribe, tribe_state in state.tribes.items():
+            tribe_state.alive = tribe == winner
+        state.status = GameStatus.FINISHED
+        state.turn = turns
+        state.started_at = started_at
+        return state
+
+    def test_archive_and_load(self):
+        """The compressed archive round-trips the final state."""
+        state = self._finished_game("g1", TribeColor.RED, 30)
+        summary = self.archive.archive(state, finished_at="2026-01-02T00:00:00+00:00")
+        self.assertEqual(summary["winner"], "RED")
+        self.assertEqual(summary["durationSeconds"], 86400.0)
+        self.assertEqual(self.archive.load("g1").to_dict(), state.to_dict())
+
+    def test_query_index(self):
+        """Games can be filtered by winner, finish date and length."""
+        self.archive.archive(self._finished_game("g1", TribeColor.RED, 30), finished_at="2026-01-05T00:00:00+00:00")
+        self.archive.archive(self._finished_game("g2", TribeColor.BLUE, 80), finished_at="2026-02-05T00:00:00+00:00")
+        self.archive.archive(self._finished_game("g3", TribeColor.RED, 120), finished_at="2026-03-05T00:00:00+00:00")
+
+        ids = lambda summaries: [s["gameId"] for s in summaries]
+        self.assertEqual(ids(self.archive.query(winner="red")), ["g1", "g3"])
+        self.assertEqual(ids(self.archive.query(min_turns=50, max_turns=100)), ["g2"])
+        self.assertEqual(ids(self.archive.query(since="2026-02-01", until="2026-03-01")), ["g2"])
+
+    def test_rearchive_keeps_single_index_entry(self):
+        """Archiving the same game twice does not duplicate its index entry."""
+        state = self._finished_game("g1", TribeColor.RED, 30)
+        self.archive.archive(state, finished_at="2026-01-02T00:00:00+00:00")
+        self.archive.archive(state, finished_at="2026-01-03T00:00:00+00:00")
+        summaries = list(self.archive.summaries())
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0]["finishedAt"], "2026-01-03T00:00:00+00:00")
+
+    def test_reused_game_id_keeps_both_games(self):
+        """A later game with the same id is archived alongside the first."""
+        first = self._finished_game("game_001", TribeColor.RED, 30)
+        second = self._finished_game("game_001", TribeColor.BLUE, 40, started_at="2026-02-01T00:00:00+00:00")
+        first_summary = self.archive.archive(first)
+        self.archive.archive(second)
+
+        self.assertEqual([s["winner"] for s in self.archive.summaries()], ["RED", "BLUE"])
+        self.assertEqual(self.archive.load(first_summary).turn, 30)
+        self.assertEqual(self.archive.load("game_001").turn, 40)
+
+    def test_until_date_includes_that_day(self):
+        """A bare --until date keeps games that finished later on that day."""
+        self.archive.archive(self._finished_game("g1", TribeColor.RED, 30), finished_at="2026-01-05T18:30:00+00:00")
+        self.assertEqual(len(self.archive.query(until="2026-01-05")), 1)
+        self.assertEqual(len(self.archive.query(until="2026-01-04")), 0)
+        self.assertEqual(len(self.archive.query(until="2026-01-05T12:00:00+00:00")), 0)
+
+
+def play_game(game_id, seed, max_actions=40):
+    """Play the bundled strategies on a seeded game until one fails or max_actions."""
+    manager = GameStateManager.create_new_game(game_id, seed=seed)
+    strategies = {tribe: load_strategy(tribe) for tribe in TribeColor}
+    for _ in range(max_actions):
+        tribe = manager.state.current_tribe
+        action = Action.from_dict(strategies[tribe](manager.state.to_dict()))
+        success, _, _ = manager.apply_action(tribe, action)
+        if not success:
+            break
+    return manager.state
+
+
+@unittest.skipUnless(np is not None, "numpy not installed")
+class TestAnalytics(unittest.TestCase):
+    """Test the columnar analytics export and queries."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.games = [play_game("a1", seed=1), play_game("a2", seed=2)]
+        cls.tables = build_tables(cls.games)
+
+    def test_action_table(self):
+        """Every history entry becomes one row."""
+        self.assertEqual(len(self.tables["actions_game"]), sum(len(g.history) for g in self.games))
+        first = self.games[0].history[0]
+        self.assertEqual(self.tables["action_types"][self.tables["actions_action"][0]], first.action.value)
+
+    def test_turn_stats_from_replay(self):
+        """Seeded games are replayed into per-turn tribe stats."""
+        data = AnalyticsData(self.tables)
+        curve = data.gold_curve("RED")
+        self.assertEqual(curve[1], STARTING_GOLD)
+        expected_rows = 4 * sum(g.turn for g in self.games)
+        self.assertEqual(len(self.tables["tribe_turns_game"]), expected_rows)
+
+    def test_win_rate_by_opening(self):
+        """Openings are each tribe's first action; wins come from the games table."""
+        tables = dict(self.tables)
+        tables["games_winner"] = np.array([0, 1])  # RED wins a1, BLUE wins a2
+        rates = AnalyticsData(tables).win_rate_by_opening()
+        self.assertEqual(sum(r["games"] for r in rates.values()), 8)
+        self.assertEqual(sum(r["wins"] for r in rates.values()), 2)
+
+    def test_npz_and_csv(self):
+        """Tables survive an .npz round trip and decode to readable CSV."""
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "analytics.npz")
+            np.savez_compressed(path, **self.tables)
+            loaded = AnalyticsData.load(path)
+            np.testing.assert_array_equal(loaded.column("actions", "turn"), self.tables["actions_turn"])
+
+            write_csv(test_dir, self.tables)
+            with open(os.path.join(test_dir, "actions.csv")) as f:
+                header, first = f.readline().strip(), f.readline().strip()
+            self.assertTrue(header.startswith("game,seq,turn,tribe"))
+            self.assertTrue(first.startswith("a1,0,1,RED"))
+        finally:
+            shutil.rmtree(test_dir)
+
+
+@unittest.skipUnless(np is not None, "numpy not installed")
+class TestObservation(unittest.TestCase):
+    """Test the observation tensor encoder."""
+
+    def setUp(self):
+        self.state = GameStateManager.create_new_game("obs_test", seed=3).state
+
+    def test_shape_and_terrain_one_hot(self):
+        """Every tile has exactly one terrain plane set."""
+        planes = observation.encode_observation(self.state, "RED")
+        self.assertEqual(planes.shape, (observation.NUM_PLANES, 20, 20))
+        self.assertEqual(len(observation.PLANE_NAMES), observation.NUM_PLANES)
+        terrain = planes[observation.TERRAIN_OFFSET:observation.OWNER_OFFSET]
+        np.testing.assert_array_equal(terrain.sum(axis=0), np.ones((20, 20)))
+
+    def test_relative_perspective(self):
+        """Planes are ordered with the observer's tribe first."""
+        knight = observation.UNIT_INDEX[UnitType.KNIGHT]
+        red = observation.encode_observation(self.state, "RED")
+        blue = observation.encode_observation(self.state, TribeColor.BLUE)
+
+        # RED's knight is at (1, 0): "own" for RED, last relative tribe for BLUE
+        self.assertEqual(red[observation.UNIT_OFFSET + knight, 0, 1], 1)
+        self.assertEqual(blue[observation.UNIT_OFFSET + 3 * len(observation.UNIT_TYPES) + knight, 0, 1], 1)
+        self.assertEqual(red[observation.CAN_ACT_PLANE].sum(), 1)
+        self.assertEqual(blue[observation.CAN_ACT_PLANE].sum(), 0)
+        self.assertEqual(red[observation.MINE_PLANE].sum(), len(self.state.gold_mines))
+
+    def test_batch_matches_single(self):
+        """Batched encoding equals encoding each state, and dicts encode like states."""
+        other = GameStateManager.create_new_game("obs_test_2", seed=4).state
+        batch = observation.encode_batch([self.state, other.to_dict()], ["RED", "GREEN"])
+        np.testing.assert_array_equal(batch[0], observation.encode_observation(self.state, "RED"))
+        np.testing.assert_array_equal(batch[1], observation.encode_observation(other, "GREEN"))
+
+
+def brute_force_mask(space, state, tribe):
+    """Validate every index of an action space (reference for legal masks)."""
+    mask = np.zeros(space.size, dtype=bool)
+    for index in range(space.size):
+        action = space.decode(index, state, tribe)
+        mask[index] = action is not None and MoveValidator.validate(state, tribe, action)[0]
+    return mask
+
+
+def random_steps(env, steps, seed=0):
+    """Play uniformly random legal actions in a GameEnv."""
+    rng = np.random.default_rng(seed)
+    for _ in range(steps):
+        env.step(rng.choice(np.flatnonzero(env.action_mask())))
+
+
+@unittest.skipUnless(np is not None, "numpy not installed")
+class TestEnvironment(unittest.TestCase):
+    """Test the action space and Gym-style environments."""
+
+    def test_mask_matches_validator(self):
+        """The legal mask is exactly the set of indices the validator accepts."""
+        env = GameEnv()
+        env.reset(seed=5)
+        random_steps(env, 30)
+        expected = brute_force_mask(env.action_space, env.state, env.current_tribe)
+        np.testing.assert_array_equal(env.action_mask(), expected)
+
+    def test_mask_matches_validator_through_games(self):
+        """The vectorized mask agrees with the validator across played-out games."""
+        for seed in range(2):
+            env = GameEnv()
+            env.reset(seed=seed)
+            for step in range(3):
+                random_steps(env, 25, seed=step)
+                space, state = env.action_space, env.state
+                for tribe in TribeColor:
+                    np.testing.assert_array_equal(
+                        space.legal_mask(state, tribe), brute_force_mask(space, state, tribe)
+                    )
+
+    def test_topology(self):
+        """Neighbours and distances match GameRules."""
+        space = ActionSpace(5, 4)
+        topology = space.topology
+        for index in range(space.num_hexes):
+            position = space.hex_position(index)
+            expected = sorted(
+                space.hex_index(n) for n in GameRules.hex_neighbors(*position) if space.in_bounds(n)
+            )
+            self.assertEqual(sorted(n for n in topology.neighbors[index] if n < space.num_hexes), expected)
+            for other in range(space.num_hexes):
+                self.assertEqual(
+                    topology.distance[index, other],
+                    GameRules.hex_distance(position, space.hex_position(other)),
+                )
+
+    def test_encode_decode_round_trip(self):
+        """A scripted strategy's action survives encode/decode."""
+        state = GameStateManager.create_new_game("space_test", seed=2).state
+        space = ActionSpace.for_state(state)
+        action = Action.from_dict(load_strategy(TribeColor.RED)(state.to_dict()))
+        index = space.encode(action, state, TribeColor.RED)
+        self.assertEqual(space.decode(index, state, TribeColor.RED), action)
+
+    def test_step_with_opponents(self):
+        """Opponents move between agent steps; illegal actions are penalised."""
+        opponents = {tribe: load_strategy(tribe) for tribe in TribeColor if tribe != TribeColor.RED}
+        env = GameEnv(agent="RED", opponents=opponents, max_turns=3)
+        obs, info = env.reset(seed=1)
+        self.assertEqual(obs.shape, env.observation_shape)
+
+        illegal = int(np.flatnonzero(~info["action_mask"])[0])
+        _, reward, done, info = env.step(illegal)
+        self.assertTrue(info["invalid"])
+        self.assertLess(reward, 0)
+
+        done = False
+        while not done:
+            _, reward, done, info = env.step(int(np.flatnonzero(info["action_mask"])[0]))
+            self.assertEqual(info["tribe"], "RED")
+        self.assertTrue(info["truncated"])
+        self.assertEqual(env.state.turn, 4)
+
+    def test_vector_env_workers_match_in_process(self):
+        """Shared-memory workers produce the same batches as in-process stepping."""
+        batches = []
+        for workers in (0, 2):
+            with VectorEnv(3, workers=workers, max_turns=5) as vec:
+                obs, masks = vec.reset(seed=10)
+                for _ in range(5):
+                    actions = [int(np.flatnonzero(row)[0]) for row in masks]
+                    obs, rewards, dones, truncated, masks = vec.step(actions)
+                batches.append((obs.copy(), masks.copy()))
+                del obs, masks
+        np.testing.assert_array_equal(batches[0][0], batches[1][0])
+        np.testing.assert_array_equal(batches[0][1], batches[1][1])
+
+
+@unittest.skipUnless(np is not None, "numpy not installed")
+class TestMCTS(unittest.TestCase):
+    """Test the MCTS reference bot."""
+
+    def test_returns_legal_action(self):
+        """The searcher's action passes the validator, as a strategy dict too."""
+        state = GameStateManager.create_new_game("mcts_test", seed=6).state
+        action = MCTS(time_budget=None, iterations=20, seed=0).search(state)
+        self.assertTrue(MoveValidator.validate(state, TribeColor.RED, action)[0])
+
+        get_action = make_strategy(time_budget=None, iterations=10, seed=0, rollout="random")
+        action = Action.from_dict(get_action(state.to_dict()))
+        self.assertTrue(MoveValidator.validate(state, TribeColor.RED, action)[0])
+
+    def test_seeded_search_is_deterministic(self):
+        """The same seed gives the same choice."""
+        state = GameStateManager.create_new_game("mcts_test", seed=6).state
+        choices = [MCTS(time_budget=None, iterations=20, seed=3).search(state) for _ in range(2)]
+        self.assertEqual(choices[0], choices[1])
+
+    def test_subtree_reuse(self):
+        """Visits below the actions played since the last search carry over."""
+        manager = GameStateManager.create_new_game("mcts_test", seed=6)
+        searcher = MCTS(time_budget=None, iterations=60, seed=1)
+        action = searcher.search(manager.state)
+        manager.apply_action(TribeColor.RED, action)
+
+        searcher.search(manager.state)
+        self.assertGreater(searcher.last_stats["root_visits"], searcher.last_stats["iterations"])
+
+        # A different game starts from a fresh tree
+        other = GameStateManager.create_new_game("other", seed=7).state
+        searcher.search(other)
+        self.assertEqual(searcher.last_stats["root_visits"], searcher.last_stats["iterations"])
+
+    def test_root_parallel(self):
+        """Worker processes search in parallel and their visits are merged."""
+        state = GameStateManager.create_new_game("mcts_test", seed=6).state
+        with MCTS(time_budget=None, iterations=10, seed=0, workers=2) as searcher:
+            action = searcher.search(state)
+            self.assertEqual(searcher.last_stats["workers"], 2)
+            self.assertEqual(searcher.last_stats["root_visits"], 20)
+        self.assertTrue(MoveValidator.validate(state, TribeColor.RED, action)[0])
+
+
+@unittest.skipUnless(np is not None, "numpy not installed")
+class TestExpectimax(unittest.TestCase):
+    """Test exact combat odds and the expectimax searcher."""
+
+    def setUp(self):
+        self.manager = GameStateManager.create_new_game("expectimax_test", seed=6)
+        self.state = self.manager.state
+        self.knight = next(u for u in self.state.units if u.tribe == TribeColor.RED)
+        self.neighbor = next(
+            n for n in GameRules.hex_neighbors(*self.knight.position)
+            if GameRules.is_valid_position(self.state, *n)
+            and GameRules.is_passable(self.state, *n)
+            and not self.state.get_building_at(*n)
+            and self.state.map.get_tile(*n).terrain == TerrainType.GRASS
+        )
+
+    def _add_enemy(self, unit_type):
+        enemy = Unit(id=50, tribe=TribeColor.BLUE, type=unit_type, position=self.neighbor)
+        self.state.units.append(enemy)
+        return enemy
+
+    def test_attack_win_probability(self):
+        """Odds are exact over the 36 dice outcomes."""
+        enemy = self._add_enemy(UnitType.KNIGHT)
+        # Equal strength: the attacker needs a strictly higher roll
+        self.assertAlmostEqual(GameRules.attack_win_probability(self.knight, enemy, self.state), 15 / 36)
+        settler = Unit(id=51, tribe=TribeColor.BLUE, type=UnitType.SETTLER, position=self.neighbor)
+        self.assertEqual(GameRules.attack_win_probability(self.knight, settler, self.state), 1.0)
+
+    def test_fixed_dice_force_outcome(self):
+        """apply_action resolves combat with the given dice."""
+        enemy = self._add_enemy(UnitType.KNIGHT)
+        action = Action(action=ActionType.ATTACK, unit_id=self.knight.id, target_id=enemy.id)
+        strengths = GameRules.combat_strengths(self.knight, enemy, self.state)
+
+        for attacker_wins, survivor in ((True, self.knight.id), (False, enemy.id)):
+            manager = self.manager.clone()
+            rolls = expectimax.outcome_rolls(*strengths, attacker_wins)
+            success, _, diff = manager.apply_action(
+                TribeColor.RED, action, rng=expectimax.FixedDice(*rolls)
+            )
+            self.assertTrue(success)
+            combat = next(c for c in diff["changes"] if c["type"] == "combat")
+            self.assertEqual(combat["attacker_wins"], attacker_wins)
+            self.assertIsNotNone(manager.state.get_unit(survivor))
+
+    def test_takes_free_kill(self):
+        """A certain win against an undefended settler is found at depth 1."""
+        enemy = self._add_enemy(UnitType.SETTLER)
+        searcher = expectimax.Expectimax(time_budget=None, max_depth=1)
+        action = searcher.search(self.state)
+        self.assertEqual(action.action, ActionType.ATTACK)
+        self.assertEqual(action.target_id, enemy.id)
+
+    def test_search_within_budget(self):
+        """Iterative deepening returns a legal action within the time budget."""
+        self._add_enemy(UnitType.WARRIOR)
+        searcher = expectimax.Expectimax(time_budget=0.3)
+        action = searcher.search(self.state)
+        self.assertTrue(MoveValidator.validate(self.state, TribeColor.RED, action)[0])
+        self.assertGreaterEqual(searcher.last_stats["depth"], 1)
+        self.assertLess(searcher.last_stats["seconds"], 0.6)
+
+
+def reference_features(state):
+    """Evaluation features computed object by object (reference for the arrays)."""
+    rows = []
+    income = GameRules.collect_income(state)
+    for tribe in TribeColor:
+        units = [u for u in state.units if u.tribe == tribe]
+        buildings = [b for b in state.buildings if b.tribe == tribe]
+        owned = [(t.q, t.r) for t in state.map.tiles if t.owner == tribe]
+        threat = 0
+        for castle in (b for b in buildings if b.type == BuildingType.CASTLE):
+            for unit in state.units:
+                reach = UNIT_STATS[unit.type]["movement"] + (2 if unit.type == UnitType.ARCHER else 1)
+                if unit.tribe != tribe and GameRules.hex_distance(unit.position, castle.position) <= reach:
+                    threat += UNIT_STATS[unit.type]["strength"]
+        towers = [b.position for b in buildings if b.type == BuildingType.TOWER]
+        rows.append([
+            state.tribes[tribe].gold
+            + sum(UNIT_STATS[u.type]["cost"] for u in units)
+            + sum(BUILDING_STATS[b.type]["cost"] for b in buildings),
+            income[tribe],
+            len(owned),
+            threat,
+            sum(1 for hex_ in owned if any(GameRules.hex_distance(hex_, t) <= 1 for t in towers)),
+        ])
+    return rows
+
+
+@unittest.skipUnless(np is not None, "numpy not installed")
+class TestEvaluation(unittest.TestCase):
+    """Test the vectorized position evaluator."""
+
+    def setUp(self):
+        self.states = []
+        for game, seed in enumerate((3, 8)):
+            env = GameEnv()
+            env.reset(seed=seed)
+            rng = np.random.default_rng(seed)
+            for step in range(200):
+                _, _, done, _ = env.step(rng.choice(np.flatnonzero(env.action_mask())))
+                if done:
+                    break
+                if step % 25 == 0:
+                    self.states.append(env.state.clone())
+
+        # Add a tower and an enemy knight next to RED's castle
+        state = self.states[-1]
+        castle = next(b for b in state.buildings if b.tribe == TribeColor.RED and b.type == BuildingType.CASTLE)
+        tile = next(t for t in state.map.tiles if t.owner == TribeColor.RED and (t.q, t.r) != castle.position)
+        state.buildings.append(Building(id=90, tribe=TribeColor.RED, type=BuildingType.TOWER,
+                                        position=(tile.q, tile.r), hp=3))
+        state.units.append(Unit(id=91, tribe=TribeColor.BLUE, type=UnitType.KNIGHT, position=castle.position))
+
+    def test_features_match_reference(self):
+        """Array features equal the object-by-object definitions."""
+        table = evaluation.feature_table(self.states)
+        for state, features in zip(self.states, table):
+            np.testing.assert_array_equal(features, reference_features(state))
+        self.assertGreater(table[-1, 0, 3], 0)
+        self.assertGreater(table[-1, 0, 4], 0)
+
+    def test_batch_matches_single(self):
+        """evaluate_batch equals evaluate on each state; shares sum to 1."""
+        shares = evaluation.evaluate_batch(self.states)
+        np.testing.assert_allclose(shares.sum(axis=1), 1.0)
+        for state, row in zip(self.states, shares):
+            np.testing.assert_allclose(evaluation.evaluate(state), row)
+            self.assertAlmostEqual(evaluation.evaluate(state, "RED"), row[0])
+
+    def test_winner_and_eliminated(self):
+        """A finished game's winner gets the whole share."""
+        state = self.states[0].clone()
+        for tribe in (TribeColor.BLUE, TribeColor.GREEN, TribeColor.YELLOW):
+            state.tribes[tribe].alive = False
+        np.testing.assert_array_equal(evaluation.evaluate(state), [1.0, 0.0, 0.0, 0.0])
+
+
+@unittest.skipUnless(np is not None, "numpy not installed")
+class TestThreatMap(unittest.TestCase):
+    """Test threat and reachability maps."""
+
+    def _hexes(self, row, width):
+        return {(int(h) % width, int(h) // width) for h in np.flatnonzero(row)}
+
+    def test_rows_match_rules(self):
+        """Reach is exactly can_move's targets; threat is attack range from any of them."""
+        env = GameEnv()
+        env.reset(seed=4)
+        random_steps(env, 60)
+        state = env.state
+        threats = ThreatMap(state)
+        width, height = state.map.width, state.map.height
+        everywhere = [(q, r) for q in range(width) for r in range(height)]
+
+        for unit in state.units:
+            as_mover = state.clone()
+            as_mover.current_tribe = unit.tribe
+            reach = {p for p in everywhere if GameRules.can_move(as_mover, unit, p)[0]}
+            _, _, reach_row, threat_row = threats._rows[unit.id]
+            self.assertEqual(self._hexes(reach_row, width), reach)
+
+            strike = attack_range(unit.type)
+            expected = {
+                p for p in everywhere
+                if strike and any(GameRules.hex_distance(d, p) <= strike for d in reach | {unit.position})
+            }
+            self.assertEqual(self._hexes(threat_row, width), expected)
+
+    def test_incremental_updates_match_rebuild(self):
+        """update() after each action gives the same totals as a fresh map."""
+        env = GameEnv()
+        env.reset(seed=2)
+        threats = ThreatMap(env.state)
+        rng = np.random.default_rng(2)
+        for _ in range(150):
+            legal = np.flatnonzero(env.action_mask())
+            if not len(legal):
+                break
+            tribe = env.current_tribe
+            action = env.action_space.decode(int(rng.choice(legal)), env.state, tribe)
+            env._mask = None
+            _, _, diff = env.manager.apply_action(tribe, action)
+            threats.update(env.state, diff)
+            fresh = ThreatMap(env.state)
+            np.testing.assert_array_equal(threats.reach_count, fresh.reach_count)
+            np.testing.assert_array_equal(threats.threat_strength, fresh.threat_strength)
+
+    def test_queries(self):
+        """O(1) queries from an enemy knight's point of view; walls block reach."""
+        state = GameStateManager.create_new_game("threat_test", seed=6).state
+        knight = next(u for u in state.units if u.tribe == TribeColor.BLUE)
+        q, r = knight.position
+        threats = ThreatMap(state.to_dict())
+
+        self.assertTrue(threats.threatened((q, r + 2), "RED"))
+        self.assertFalse(threats.threatened((q, r + 2), "BLUE"))
+        self.assertEqual(threats.enemy_strength((q, r + 2), TribeColor.RED), UNIT_STATS[UnitType.KNIGHT]["strength"])
+        self.assertIn(knight.id, threats.attackers((q, r + 2), "RED"))
+        self.assertFalse(threats.threatened((q, r + 6), "RED"))
+        self.assertEqual(threats.threat_map("RED").shape, (state.map.height, state.map.width))
+
+        target = next(
+            p for p in GameRules.hex_neighbors(q, r)
+            if threats.reachable(p, "BLUE") and not state.get_building_at(*p)
+        )
+        state.buildings.append(Building(id=80, tribe=TribeColor.RED, type=BuildingType.WALL, position=target, hp=1))
+        threats.update(state, {"changes": [{
+            "type": "building_created", "building_id": 80, "building_type": "WALL",
+            "position": list(target), "tribe": "RED",
+        }]})
+        self.assertFalse(threats.reachable(target, "BLUE"))
+
+
+class TestMultiActionTurn(unittest.TestCase):
+    """Test applying several actions as one atomic turn."""
+
+    TURN = [
+        {"action": "MOVE", "unit_id": 1, "target": [2, 0]},
+        {"action": "TRAIN", "unit_type": "WORKER", "building_id": 1},
+    ]
+
+    def setUp(self):
+        self.manager = GameStateManager.create_new_game("multi_action_test", seed=1)
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_applies_in_order_and_advances_once(self):
+        """Every action is applied and the turn passes to the next tribe once."""
+        success, _, diff = self.manager.apply_turn(TribeColor.RED, parse_actions(self.TURN))
+        self.assertTrue(success)
+        state = self.manager.state
+        self.assertEqual(state.current_tribe, TribeColor.BLUE)
+        self.assertEqual(state.get_unit(1).position, (2, 0))
+        self.assertEqual(len([u for u in state.units if u.tribe == TribeColor.RED]), 2)
+        self.assertEqual(diff["actions"], self.TURN)
+        types = [change["type"] for change in diff["changes"]]
+        self.assertEqual(types[:2], ["unit_moved", "unit_trained"])
+        self.assertEqual(types.count("turn_advanced"), 1)
+        self.assertEqual([h.continues_turn for h in state.history], [True, False])
+
+    def test_rejected_turn_leaves_state_untouched(self):
+        """A unit acting twice, a unit trained this turn or an invalid action rolls back the turn."""
+        before = self.manager.state.to_dict()
+        turns = [
+            self.TURN + [{"action": "MOVE", "unit_id": 1, "target": [3, 0]}],
+            [self.TURN[1], {"action": "MOVE", "unit_id": 5, "target": [1, 1]}],
+            self.TURN + [{"action": "TRAIN", "unit_type": "KNIGHT", "building_id": 99}],
+        ]
+        for turn in turns:
+            success, message, diff = self.manager.apply_turn(TribeColor.RED, parse_actions(turn))
+            self.assertFalse(success)
+            self.assertTrue(message.startswith(f"Action {len(turn)}:"), message)
+            self.assertEqual(diff, {})
+            self.assertEqual(self.manager.state.to_dict(), before)
+
+        valid, _ = self.manager.validate_turn(TribeColor.RED, parse_actions(turns[0]))
+        self.assertFalse(valid)
+        self.assertTrue(self.manager.validate_turn(TribeColor.RED, parse_actions(self.TURN))[0])
+
+    def test_unseeded_dice_are_revalidated(self):
+        """Two attacks on one unit in an unseeded game apply cleanly whatever the dry run rolled."""
+        state = self.manager.state
+        state.seed = None
+
+        def free(q, r):
+            return (GameRules.is_valid_position(state, q, r) and GameRules.is_passable(state, q, r)
+                    and state.map.get_tile(q, r).terrain == TerrainType.GRASS
+                    and not state.get_building_at(q, r) and not state.get_units_at(q, r))
+
+        # An empty grass hex with two empty grass neighbours
+        for tile in state.map.tiles:
+            neighbors = [n for n in GameRules.hex_neighbors(tile.q, tile.r) if free(*n)]
+            if free(tile.q, tile.r) and len(neighbors) >= 2:
+                target, first, second = (tile.q, tile.r), neighbors[0], neighbors[1]
+                break
+        state.units += [
+            Unit(id=60, tribe=TribeColor.BLUE, type=UnitType.WARRIOR, position=target),
+            Unit(id=61, tribe=TribeColor.RED, type=UnitType.WARRIOR, position=first),
+            Unit(id=62, tribe=TribeColor.RED, type=UnitType.WARRIOR, position=second),
+        ]
+        turn = [Action(action=ActionType.ATTACK, unit_id=61, target_id=60),
+                Action(action=ActionType.ATTACK, unit_id=62, target_id=60)]
+
+        outcomes = set()
+        for i in range(60):
+            manager = self.manager.clone()
+            before = manager.state.to_dict()
+            random.seed(i)
+            valid, _ = manager.validate_turn(TribeColor.RED, turn)
+            if not valid:
+                continue
+            success, _, diff = manager.apply_turn(TribeColor.RED, turn, validated=True)
+            outcomes.add(success)
+            if success:
+                defenders = [c["defender_id"] for c in diff["changes"] if c["type"] == "combat"]
+                self.assertEqual(defenders, [60, 60])
+                self.assertEqual(len([c for c in diff["changes"] if c["type"] == "unit_killed"]), 2)
+            else:
+                self.assertEqual(manager.state.to_dict(), before)
+        # The dry run's dice and the real dice disagreed at least once
+        self.assertIn(False, outcomes)
+
+    def test_trained_unit_cannot_act_whatever_its_id(self):
+        """Units are rejected by the ids this turn trained, not by comparing with the id counter."""
+        # Free the highest id, so the unit trained this turn takes an id that existed before
+        highest = max(self.manager.state.units, key=lambda u: u.id)
+        self.manager.state.units.remove(highest)
+        before = self.manager.state.to_dict()
+        turn = [self.TURN[1], {"action": "MOVE", "unit_id": highest.id, "target": [1, 1]}]
+        success, message, _ = self.manager.apply_turn(TribeColor.RED, parse_actions(turn))
+        self.assertFalse(success)
+        self.assertIn("was trained this turn", message)
+        self.assertEqual(self.manager.state.to_dict(), before)
+
+    def test_history_replays(self):
+        """Replaying the history of a multi-action turn reproduces the state."""
+        start_file = os.path.join(self.test_dir, "start.json")
+        actions_file = os.path.join(self.test_dir, "actions.jsonl")
+        output_file = os.path.join(self.test_dir, "final.json")
+        self.manager.save(start_file)
+        self.manager.apply_turn(TribeColor.RED, parse_actions(self.TURN))
+        with open(actions_file, "w") as f:
+            for entry in self.manager.state.history:
+                f.write(json.dumps(entry.to_dict()) + "\n")
+
+        self.assertEqual(replay_game(start_file, actions_file, output_file), 0)
+        final = GameStateManager.load(output_file).state
+        self.assertEqual(final.to_dict(), self.manager.state.to_dict())
+
+    def test_server_accepts_action_list(self):
+        """A strategy returning a list is validated and previewed as one turn."""
+        state_file = os.path.join(self.test_dir, "gamestate.json")
+        strategy_file = os.path.join(self.test_dir, "strategy.py")
+        self.manager.save(state_file)
+        with open(strategy_file, "w") as f:
+            f.write(f"def get_action(gamestate):\n    return {self.TURN!r}\n")
+
+        server = EngineServer()
+        params = {"state": state_file, "tribe": "RED", "strategy": strategy_file}
+        result = server.handle({"jsonrpc": "2.0", "id": 1, "method": "preview", "params": params})["result"]
+        self.assertEqual(result["code"], 0)
+        self.assertEqual(result["action"], self.TURN)
+        self.assertEqual(result["diff"]["actions"], self.TURN)
+
+
+class TestLocalPipeline(unittest.TestCase):
+    """Test the local stand-in for the validate -> merge -> apply workflows."""
+
+    STRATEGY = (
+        "def get_action(gamestate):\n"
+        "    castle = next(b for b in gamestate['buildings']\n"
+        "                  if b['tribe'] == '%s' and b['type'] == 'CASTLE')\n"
+        "    return {'action': 'TRAIN', 'unit_type': 'WORKER', 'building_id': %s}\n"
+    )
+
+    def setUp(self):
+        self.workspace = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workspace)
+
+    def _provider(self, building_id="castle['id']"):
+        return lambda tribe, gamestate: self.STRATEGY % (tribe.value, building_id)
+
+    def test_turns_are_validated_applied_and_committed(self):
+        """Each turn commits the strategy and then the new state, and play passes on."""
+        subprocess.run(["git", "init", "-q"], cwd=self.workspace, check=True)
+        subprocess.run(["git", "config", "user.email", "engine@test"], cwd=self.workspace, check=True)
+        subprocess.run(["git", "config", "user.name", "Engine Test"], cwd=self.workspace, check=True)
+
+        pipeline = LocalPipeline(self.workspace, self._provider())
+        pipeline.new_game("pipeline_test", seed=2)
+        summary = pipeline.run(turns=4)
+
+        self.assertEqual(summary["turns"], 4)
+        self.assertEqual(set(summary["phases"]), {"provide", "validate", "merge", "apply", "commit"})
+        state = pipeline.load_state()
+        self.assertEqual((state["turn"], state["currentTribe"]), (2, "RED"))
+        log = subprocess.run(["git", "log", "--format=%s"], cwd=self.workspace,
+                             capture_output=True, text=True, check=True).stdout.splitlines()
+        self.assertEqual(len(log), 9)  # new game + (strategy, state) per turn
+        self.assertEqual(log[-2], "[RED] Turn 1 Strategy")
+        tracked = subprocess.run(["git", "ls-files"], cwd=self.workspace,
+                                 capture_output=True, text=True, check=True).stdout.splitlines()
+        self.assertIn("data/history/.gitkeep", tracked)
+        self.assertTrue(any(path.startswith("data/events/") for path in tracked))
+
+    def test_provider_must_implement_strategy_source(self):
+        """StrategyProvider is abstract: a subclass without strategy_source cannot be created."""
+        class Incomplete(StrategyProvider):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_rejected_strategy_is_not_applied(self):
+        """A strategy that fails validation is reverted and retried, then the run stops."""
+        pipeline = LocalPipeline(self.workspace, self._provider(building_id=999))
+        pipeline.new_game("pipeline_test", seed=2)
+        before = pipeline.load_state()
+        summary = pipeline.run(turns=4, max_attempts=2)
+
+        self.assertEqual((summary["turns"], summary["rejected"]), (0, 2))
+        self.assertIn("Validation failed", pipeline.results[0].error)
+        self.assertEqual(pipeline.load_state(), before)
+        self.assertFalse(os.path.exists(os.path.join(self.workspace, "tribes", "red", "strategy.py")))
+
+
+class TestEventStore(unittest.TestCase):
+    """Test the event log with snapshots."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = EventStore(os.path.join(self.test_dir, "events"), interval=8)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _play(self, manager, actions):
+        strategies = {tribe: load_strategy(tribe) for tribe in TribeColor}
+        states = [manager.state.to_dict()]
+        for _ in range(actions):
+            tribe = manager.state.current_tribe
+            action = Action.from_dict(strategies[tribe](manager.state.to_dict()))
+            success, _, _ = manager.apply_action(tribe, action)
+            if not success:
+                break
+            self.store.append(manager)
+            states.append(manager.state.to_dict())
+        return states
+
+    def test_folded_states_match_played_states(self):
+        """Folding events onto the nearest snapshot rebuilds every played state exactly."""
+        manager = GameStateManager.create_new_game("event_test", seed=7)
+        manager.events = []
+        self.store.start(manager.state)
+        states = self._play(manager, 40)
+
+        self.assertEqual(self.store.event_count, len(states) - 1)
+        self.assertEqual([count for count, _ in self.store.snapshots], list(range(0, len(states), 8)))
+        for index in (0, 5, 8, 13, len(states) - 1):
+            self.assertEqual(self.store.load(index).state.to_dict(), states[index])
+        reopened = EventStore(self.store.directory)
+        self.assertEqual(reopened.load().state.to_dict(), states[-1])
+
+    @unittest.skipUnless(np is not None, "numpy not installed")
+    def test_random_play_folds_exactly(self):
+        """Random legal play (combat, harvesting, skipped turns) folds to the same state."""
+        env = GameEnv()
+        env.reset(seed=3)
+        env.manager.events = []
+        self.store.start(env.state)
+        random_steps(env, 150)
+        self.store.append(env.manager)
+        self.assertEqual(self.store.load().state.to_dict(), env.state.to_dict())
+
+    def test_stale_append_is_rejected(self):
+        """A writer that started from an older version cannot append."""
+        manager = GameStateManager.create_new_game("event_test", seed=7)
+        self.store.start(manager.state)
+        first, second = self.store.load(), self.store.load()
+        self._play(first, 1)
+        with self.assertRaises(StaleStateError):
+            self._play(second, 1)
+        self.assertEqual(self.store.event_count, 1)
+        self.assertEqual(self.store.load().state.to_dict(), first.state.to_dict())
+
+    def test_run_appends_and_materializes(self):
+        """run_turn appends to the log, and the materialized log equals the state file."""
+        state_file = os.path.join(self.test_dir, "gamestate.json")
+        GameStateManager.create_new_game("event_test", seed=7).save(state_file)
+        diff_file = os.path.join(self.test_dir, "diff.json")
+
+        for tribe in ("RED", "BLUE"):
+            self.assertEqual(run_turn(state_file, tribe, diff_file, source_key=tribe, events=self.store), 0)
+        self.assertEqual(self.store.event_count, 4)  # an action and an applied key per turn
+
+        output = os.path.join(self.test_dir, "materialized.json")
+        self.assertEqual(materialize_state(self.store, output), 0)
+        with open(state_file) as f, open(output) as g:
+            self.assertEqual(json.load(g), json.load(f))
+
+        # A state file that does not match the log is rejected
+        GameStateManager.create_new_game("event_test", seed=7).save(state_file)
+        self.assertEqual(run_turn(state_file, "RED", diff_file, events=self.store), 5)
+
+    def test_failed_save_appends_nothing(self):
+        """Events are appended only after the state file is saved."""
+        state_file = os.path.join(self.test_dir, "gamestate.json")
+        GameStateManager.create_new_game("event_test", seed=7).save(state_file)
+        diff_file = os.path.join(self.test_dir, "diff.json")
+        self.assertEqual(run_turn(state_file, "RED", diff_file, events=self.store), 0)
+
+        with unittest.mock.patch.object(GameStateManager, "save", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                run_turn(state_file, "BLUE", diff_file, events=self.store)
+        self.assertEqual(self.store.event_count, 1)
+
+        # The turn can be applied once the disk recovers
+        self.assertEqual(run_turn(state_file, "BLUE", diff_file, events=self.store), 0)
+        self.assertEqual(self.store.event_count, 2)
+
+    def test_seek_turn_unseeded(self):
+        """An unseeded game is rebuilt at the start of a turn from the recorded outcomes."""
+        manager = GameStateManager.create_new_game("event_test")
+        manager.state.seed = None
+        manager.events = []
+        self.store.start(manager.state)
+        states = self._play(manager, 20)
+        turn = GameState.from_dict(states[-1]).turn
+        first = next(s for s in states if s["turn"] == turn)
+        self.assertEqual(self.store.seek_turn(turn).to_dict(), first)
+        self.assertEqual(self.store.seek_turn(1).to_dict(), states[0])
+
+
+class TestPatchFeed(unittest.TestCase):
+    """Test the JSON Patch feed derived from action diffs."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    @unittest.skipUnless(np is not None, "numpy not installed")
+    def test_patches_reproduce_random_play(self):
+        """Applying the patches to the starting document gives the final document."""
+        env = GameEnv()
+        env.reset(seed=3)
+        start = env.state.clone()
+        env.manager.events = []
+        random_steps(env, 150)
+        env.manager.mark_applied("abc123", {"changes": []})
+
+        patches = make_patches(start.clone(), env.manager.events)
+        self.assertEqual([v for v, _ in patches], list(range(start.version + 1, env.state.version + 1)))
+        document = json.loads(json.dumps(start.to_dict()))
+        for _, patch in patches:
+            apply_patch(document, json.loads(json.dumps(patch)))
+        self.assertEqual(document, json.loads(json.dumps(env.state.to_dict())))
+
+    def test_run_writes_numbered_patches(self):
+        """run_turn adds one patch per action; a client at version N catches up from N+1."""
+        state_file = os.path.join(self.test_dir, "gamestate.json")
+        diff_file = os.path.join(self.test_dir, "diff.json")
+        GameStateManager.create_new_game("patch_test", seed=7).save(state_file)
+        with open(state_file) as f:
+            document = json.load(f)
+
+        feed = PatchFeed(os.path.join(self.test_dir, "patches"), keep=3)
+        for tribe in ("RED", "BLUE", "GREEN"):
+            self.assertEqual(run_turn(state_file, tribe, diff_file, source_key=tribe, patches=feed), 0)
+        self.assertEqual((feed.first, feed.last), (1, 3))
+
+        patches = PatchFeed(feed.directory).since(0)
+        self.assertEqual([p["version"] for p in patches], [1, 2, 3])
+        for p in patches:
+            apply_patch(document, p["patch"])
+        with open(state_file) as f:
+            self.assertEqual(document, json.load(f))
+        self.assertEqual(feed.since(3), [])
+
+        # Old patches are pruned; clients that far behind reload the full state
+        feed = PatchFeed(feed.directory, keep=1)
+        self.assertEqual(run_turn(state_file, "YELLOW", diff_file, patches=feed), 0)
+        self.assertEqual((feed.first, feed.last), (4, 4))
+        self.assertIsNone(feed.since(2))
+        self.assertEqual(len(feed.since(3)), 1)
+        self.assertFalse(os.path.exists(os.path.join(feed.directory, "00000001.json")))
+
 if __name__ == "__main__":
     unittest.main()
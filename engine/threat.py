@@ -0,0 +1,242 @@
+"""
+Threat and reachability maps.
+
+For every unit, ThreatMap works out which hexes it could move to next
+turn (its reach) and which hexes it could attack next turn, after an
+optional move (its threat), and sums them per tribe so questions like
+"can an enemy hit this hex?" are O(1) array lookups:
+
+    from threat import ThreatMap
+
+    threats = ThreatMap(state)
+    threats.threatened((5, 7), "RED")        # can any enemy of RED attack (5, 7)?
+    threats.enemy_strength((5, 7), "RED")    # their combined strength
+    threats.reachable((5, 7), "RED")         # can a RED unit move there?
+    threats.threat_map("RED")                # (height, width) bool array
+
+All units are expanded together by a multi-source BFS over the shared
+map topology (one array step per hex of movement). can_move bounds a
+move by hex distance, not by path, so the BFS spreads over every hex and
+the destination checks (passable, no other tribe's unit, no other
+tribe's wall) are applied to the result; an attack then spreads one hex
+(two for archers) from the hexes the unit can stand on.
+
+After an action, update(state, diff) refreshes only the units whose
+maps the diff can have changed: those that moved, died or were trained,
+and those within movement range of a hex whose occupancy changed.
+"""
+
+from collections.abc import Mapping
+from typing import Optional, Union
+
+import numpy as np
+
+from schemas import BuildingType, GameState, TribeColor, UnitType, UNIT_STATS
+from action_space import tile_layout, topology_for
+
+
+TRIBES = list(TribeColor)
+NUM_TRIBES = len(TRIBES)
+TRIBE_INDEX = {tribe: i for i, tribe in enumerate(TRIBES)}
+MAX_MOVEMENT = max(stats["movement"] for stats in UNIT_STATS.values())
+
+TribeLike = Union[TribeColor, str]
+
+
+def _tribe(tribe: TribeLike) -> TribeColor:
+    return tribe if isinstance(tribe, TribeColor) else TribeColor(tribe.upper())
+
+
+def attack_range(unit_type: UnitType) -> int:
+    """Hexes a unit can strike from where it stands (0 for non-combat units)."""
+    if UNIT_STATS[unit_type]["strength"] == 0:
+        return 0
+    return 2 if unit_type == UnitType.ARCHER else 1
+
+
+class ThreatMap:
+    """Per-unit reach and threat rows with per-tribe totals."""
+
+    def __init__(self, state: Union[GameState, Mapping]):
+        state = state if isinstance(state, GameState) else GameState.from_dict(state)
+        self.width = state.map.width
+        self.height = state.map.height
+        self.topology = topology_for(self.width, self.height)
+        hexes = self.topology.num_hexes
+
+        # How many of each tribe's units can reach / attack each hex, and
+        # the strength they bring
+        self.reach_count = np.zeros((NUM_TRIBES, hexes), dtype=np.int32)
+        self.threat_count = np.zeros((NUM_TRIBES, hexes), dtype=np.int32)
+        self.threat_strength = np.zeros((NUM_TRIBES, hexes), dtype=np.int32)
+
+        # unit id -> (tribe index, strength, reach row, threat row)
+        self._rows: dict[int, tuple] = {}
+        self._positions: dict[int, int] = {}
+        self._refresh(state, [u.id for u in state.units])
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _hex(self, position) -> Optional[int]:
+        q, r = position
+        if 0 <= q < self.width and 0 <= r < self.height:
+            return r * self.width + q
+        return None
+
+    def _enemy(self, counts: np.ndarray, hex_index: int, tribe: TribeLike) -> int:
+        return int(counts[:, hex_index].sum() - counts[TRIBE_INDEX[_tribe(tribe)], hex_index])
+
+    def threatened(self, position, tribe: TribeLike) -> bool:
+        """Whether any unit of another tribe could attack position next turn."""
+        hex_index = self._hex(position)
+        return hex_index is not None and self._enemy(self.threat_count, hex_index, tribe) > 0
+
+    def enemy_strength(self, position, tribe: TribeLike) -> int:
+        """Combined strength of other tribes' units that could attack position next turn."""
+        hex_index = self._hex(position)
+        return 0 if hex_index is None else self._enemy(self.threat_strength, hex_index, tribe)
+
+    def reachable(self, position, tribe: TribeLike) -> bool:
+        """Whether one of tribe's units could move to position next turn."""
+        hex_index = self._hex(position)
+        return hex_index is not None and self.reach_count[TRIBE_INDEX[_tribe(tribe)], hex_index] > 0
+
+    def attackers(self, position, tribe: Optional[TribeLike] = None) -> list[int]:
+        """Ids of units that could attack position next turn (excluding tribe's own)."""
+        hex_index = self._hex(position)
+        if hex_index is None:
+            return []
+        skip = TRIBE_INDEX[_tribe(tribe)] if tribe is not None else None
+        return sorted(
+            unit_id for unit_id, (owner, _, _, threat) in self._rows.items()
+            if owner != skip and threat[hex_index]
+        )
+
+    def threat_map(self, tribe: TribeLike) -> np.ndarray:
+        """(height, width) bool array of hexes other tribes could attack."""
+        enemy = self.threat_count.sum(axis=0) - self.threat_count[TRIBE_INDEX[_tribe(tribe)]]
+        return (enemy > 0).reshape(self.height, self.width)
+
+    def reach_map(self, tribe: TribeLike) -> np.ndarray:
+        """(height, width) bool array of hexes tribe's units could move to."""
+        return (self.reach_count[TRIBE_INDEX[_tribe(tribe)]] > 0).reshape(self.height, self.width)
+
+    # ------------------------------------------------------------------
+    # Building and updating
+    # ------------------------------------------------------------------
+
+    def _blocked(self, state: GameState) -> np.ndarray:
+        """(tribes, hexes): hexes each tribe's units cannot move onto."""
+        hexes = self.topology.num_hexes
+        occupied = np.zeros((NUM_TRIBES, hexes), dtype=bool)
+        for unit in state.units:
+            hex_index = self._hex(unit.position)
+            if hex_index is not None:
+                occupied[TRIBE_INDEX[unit.tribe], hex_index] = True
+        walls = np.zeros((NUM_TRIBES, hexes), dtype=bool)
+        for building in state.buildings:
+            hex_index = self._hex(building.position)
+            if hex_index is not None and building.type == BuildingType.WALL:
+                walls[TRIBE_INDEX[building.tribe], hex_index] = True
+
+        passable = tile_layout(state, self.topology).passable
+
+        # Another tribe's unit or wall blocks (present for some tribe other
+        # than the row's own), and so does water or a mountain
+        other_units = occupied.sum(axis=0) > occupied
+        other_walls = walls.sum(axis=0) > walls
+        return other_units | other_walls | ~passable
+
+    def _expand(self, start: np.ndarray, steps: np.ndarray) -> np.ndarray:
+        """Grow each row's hexes by its number of steps (a BFS layer per step)."""
+        mask = start.copy()
+        hexes = self.topology.num_hexes
+        padded = np.zeros((len(mask), hexes + 1), dtype=bool)
+        for step in range(1, int(steps.max(initial=0)) + 1):
+            active = steps >= step
+            padded[:, :hexes] = mask
+            grown = padded[:, self.topology.neighbors].any(axis=2)
+            mask[active] |= grown[active]
+        return mask
+
+    def _remove(self, unit_id: int) -> None:
+        row = self._rows.pop(unit_id, None)
+        self._positions.pop(unit_id, None)
+        if row is None:
+            return
+        owner, strength, reach, threat = row
+        self.reach_count[owner] -= reach
+        self.threat_count[owner] -= threat
+        self.threat_strength[owner] -= threat * strength
+
+    def _refresh(self, state: GameState, unit_ids) -> None:
+        """Recompute the rows of the given units (dropping any that no longer exist)."""
+        for unit_id in unit_ids:
+            self._remove(unit_id)
+        wanted = set(unit_ids)
+        units = [u for u in state.units if u.id in wanted and self._hex(u.position) is not None]
+        if not units:
+            return
+
+        hexes = self.topology.num_hexes
+        blocked = self._blocked(state)
+        owners = np.array([TRIBE_INDEX[u.tribe] for u in units], dtype=np.intp)
+        positions = np.array([self._hex(u.position) for u in units], dtype=np.intp)
+        movement = np.array([UNIT_STATS[u.type]["movement"] for u in units])
+        ranges = np.array([attack_range(u.type) for u in units])
+        strengths = np.array([UNIT_STATS[u.type]["strength"] for u in units], dtype=np.int32)
+
+        start = np.zeros((len(units), hexes), dtype=bool)
+        start[np.arange(len(units)), positions] = True
+        reach = self._expand(start, movement) & ~blocked[owners]
+        # Attacks can also be made without moving
+        threat = self._expand(reach | start, ranges)
+        threat[ranges == 0] = False
+
+        for i, unit in enumerate(units):
+            owner = owners[i]
+            self._rows[unit.id] = (owner, int(strengths[i]), reach[i], threat[i])
+            self._positions[unit.id] = positions[i]
+            self.reach_count[owner] += reach[i]
+            self.threat_count[owner] += threat[i]
+            self.threat_strength[owner] += threat[i] * strengths[i]
+
+    def update(self, state: GameState, diff: dict) -> None:
+        """
+        Bring the maps up to date after apply_action (state is the new
+        state, diff its return value).
+        """
+        changed_units = set()
+        dirty = []
+
+        for change in diff.get("changes", []):
+            kind = change["type"]
+            if kind == "unit_moved":
+                changed_units.add(change["unit_id"])
+                dirty.extend([self._hex(change["from"]), self._hex(change["to"])])
+            elif kind in ("unit_killed", "unit_consumed"):
+                changed_units.add(change["unit_id"])
+                dirty.append(self._positions.get(change["unit_id"]))
+            elif kind == "unit_trained":
+                changed_units.add(change["unit_id"])
+                dirty.append(self._hex(change["position"]))
+            elif kind == "building_created" and change["building_type"] == BuildingType.WALL.value:
+                dirty.append(self._hex(change["position"]))
+            elif kind == "tribe_eliminated":
+                owner = TRIBE_INDEX[TribeColor(change["tribe"])]
+                for unit_id, row in list(self._rows.items()):
+                    if row[0] == owner:
+                        changed_units.add(unit_id)
+                        dirty.append(self._positions.get(unit_id))
+
+        dirty = [hex_index for hex_index in dirty if hex_index is not None]
+        if dirty:
+            # Units that could move onto a changed hex see a different board
+            near = self.topology.distance[dirty].min(axis=0) <= MAX_MOVEMENT
+            for unit_id, hex_index in self._positions.items():
+                if near[hex_index]:
+                    changed_units.add(unit_id)
+        if changed_units:
+            self._refresh(state, list(changed_units))
@@ -0,0 +1,87 @@
+"""
+Apply a validated turn and persist it.
+
+Shared by `main.py run` and the engine daemon (server.py), so both
+record a turn the same way: the state file, its source key, and the
+optional checkpoint store, event log, patch feed and game archive.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from schemas import Action, GameStatus, TribeColor
+from state import GameStateManager
+from metrics import TurnMetrics
+from checkpoints import CheckpointStore
+from event_store import EventStore
+from patches import PatchFeed
+from archive import GameArchive
+
+
+def default_archive_dir(gamestate_path: str) -> str:
+    """data/history next to data/gamestate.json."""
+    return str(Path(gamestate_path).parent / "history")
+
+
+def apply_and_save(
+    manager: GameStateManager,
+    gamestate_path: str,
+    tribe_color: TribeColor,
+    actions: list[Action],
+    validated: bool = False,
+    source_key: Optional[str] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+    events: Optional[EventStore] = None,
+    patches: Optional[PatchFeed] = None,
+    archive: Optional[GameArchive] = None,
+    metrics: Optional[TurnMetrics] = None,
+) -> tuple[bool, str, Optional[dict]]:
+    """
+    Apply actions to manager's state and save it to gamestate_path.
+
+    The turn is marked applied under source_key (if given). Once the state
+    file is saved, the turn is added to checkpoints, events and patches,
+    and a game the turn finished is written to archive. Nothing is saved
+    if the actions fail to apply, but manager's state may then be
+    partially modified: callers that keep the manager should apply to a
+    copy.
+
+    Returns (success, message, diff). Raises StaleStateError if the state
+    file or event log was changed by another writer (nothing is saved).
+    """
+    metrics = metrics or TurnMetrics(enabled=False)
+    state = manager.state
+
+    if checkpoints is not None and not checkpoints.keyframes:
+        # First recorded turn: keep the state it started from as a keyframe
+        checkpoints.record(state)
+    if events is not None and not events.snapshots:
+        events.start(state)
+    if events is not None or patches is not None:
+        manager.events = []
+    before = state.clone() if patches is not None else None
+
+    with metrics.phase("apply"):
+        success, message, diff = manager.apply_turn(tribe_color, actions, validated=validated)
+    if not success:
+        return False, message, None
+    if source_key is not None:
+        manager.mark_applied(source_key, diff)
+
+    with metrics.phase("save"):
+        recorded = manager.events
+        if events is not None:
+            events.check(manager)
+        manager.save(gamestate_path)
+        if events is not None:
+            events.append(manager)
+        if patches is not None:
+            patches.record(before, recorded)
+        if checkpoints is not None:
+            checkpoints.record(manager.state)
+
+    if archive is not None and manager.state.status == GameStatus.FINISHED:
+        summary = archive.archive(manager.state)
+        print(f"Game over, winner: {summary['winner']}. Archived to {archive.path_for(summary)}")
+
+    return True, message, diff
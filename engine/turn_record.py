@@ -0,0 +1,99 @@
+"""
+Content-addressed turn records.
+
+A TurnRecord captures the result of executing and validating a tribe's
+strategy: the action (or list of actions) it returned, keyed by the hash of the game state it
+ran against, the hash of the strategy source and the engine version. The
+apply step can reuse a record whose hashes match instead of running the
+strategy again, which also guarantees the validated action is the one
+that gets applied. In CI, validate-move.yml uploads the record as the
+turn-record artifact and apply-move.yml downloads it from the merged
+PR's validation run.
+"""
+
+import json
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+from schemas import Action, TribeColor, ENGINE_VERSION, parse_actions
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path) -> str:
+    with open(path, "rb") as f:
+        return hash_bytes(f.read())
+
+
+@dataclass
+class TurnRecord:
+    """The validated outcome of one strategy execution."""
+    state_hash: str
+    strategy_hash: str
+    tribe: TribeColor
+    turn: int
+    action: Union[dict, list]  # as returned by the strategy; see parse_actions
+    engine_version: str = ENGINE_VERSION
+
+    @property
+    def record_id(self) -> str:
+        """Content address of this record (hash of its inputs and action)."""
+        key = json.dumps(
+            [self.state_hash, self.strategy_hash, self.engine_version, self.tribe.value, self.action],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hash_bytes(key.encode("utf-8"))
+
+    def matches(self, state_hash: str, strategy_hash: str, tribe: TribeColor) -> bool:
+        """True if this record was produced from exactly these inputs."""
+        return (
+            self.state_hash == state_hash
+            and self.strategy_hash == strategy_hash
+            and self.tribe == tribe
+            and self.engine_version == ENGINE_VERSION
+        )
+
+    def get_actions(self) -> list[Action]:
+        return parse_actions(self.action)
+
+    def to_dict(self) -> dict:
+        return {
+            "recordId": self.record_id,
+            "stateHash": self.state_hash,
+            "strategyHash": self.strategy_hash,
+            "engineVersion": self.engine_version,
+            "tribe": self.tribe.value,
+            "turn": self.turn,
+            "action": self.action,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TurnRecord":
+        record = cls(
+            state_hash=data["stateHash"],
+            strategy_hash=data["strategyHash"],
+            tribe=TribeColor(data["tribe"]),
+            turn=data["turn"],
+            action=data["action"],
+            engine_version=data.get("engineVersion", ""),
+        )
+        if data.get("recordId") and data["recordId"] != record.record_id:
+            raise ValueError("Turn record has been modified (record id does not match contents)")
+        return record
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TurnRecord"]:
+        """Load a record, or return None if the file does not exist."""
+        if not Path(path).exists():
+            return None
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
@@ -2,8 +2,43 @@ import { NextResponse } from 'next/server';
 import { promises as fs } from 'fs';
 import path from 'path';
 
-export async function GET() {
+/**
+ * Patches after version `since` from the engine's feed (data/patches),
+ * or null if the feed cannot bring that version up to date.
+ */
+async function readPatchesSince(gameId: string, since: number) {
   try {
+    const patchDir = path.join(process.cwd(), 'data', 'patches');
+    const index = JSON.parse(await fs.readFile(path.join(patchDir, 'index.json'), 'utf8'));
+    if (index.gameId !== gameId || since < index.first - 1 || since > index.last) {
+      return null;
+    }
+
+    const patches = [];
+    for (let version = since + 1; version <= index.last; version++) {
+      const name = `${String(version).padStart(8, '0')}.json`;
+      patches.push(JSON.parse(await fs.readFile(path.join(patchDir, name), 'utf8')));
+    }
+    return { gameId, version: index.last, patches };
+  } catch {
+    // No feed, or it was pruned while reading
+    return null;
+  }
+}
+
+export async function GET(request: Request) {
+  try {
+    // ?gameId=...&since=N: only the changes after version N, when available
+    const { searchParams } = new URL(request.url);
+    const gameId = searchParams.get('gameId');
+    const since = searchParams.get('since');
+    if (gameId && since !== null) {
+      const delta = await readPatchesSince(gameId, Number(since));
+      if (delta) {
+        return NextResponse.json(delta);
+      }
+    }
+
     // Read from the data directory
     const filePath = path.join(process.cwd(), 'data', 'gamestate.json');
     const fileContents = await fs.readFile(filePath, 'utf8');
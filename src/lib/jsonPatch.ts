@@ -0,0 +1,101 @@
+/**
+ * Minimal RFC 6902 JSON Patch support (add, remove, replace), enough for
+ * the engine's patch feed (engine/patches.py).
+ */
+
+export interface PatchOperation {
+  op: 'add' | 'remove' | 'replace';
+  path: string;
+  value?: unknown;
+}
+
+export interface NumberedPatch {
+  version: number;
+  patch: PatchOperation[];
+}
+
+function parsePointer(path: string): string[] {
+  return path
+    .split('/')
+    .slice(1)
+    .map((part) => part.replace(/~1/g, '/').replace(/~0/g, '~'));
+}
+
+type Container = Record<string, unknown> | unknown[];
+
+function getChild(parent: Container, part: string): unknown {
+  return Array.isArray(parent) ? parent[Number(part)] : parent[part];
+}
+
+function setChild(parent: Container, part: string, value: unknown): void {
+  if (Array.isArray(parent)) {
+    parent[Number(part)] = value;
+  } else {
+    parent[part] = value;
+  }
+}
+
+/**
+ * Apply a sequence of patches and return the new document, leaving the
+ * original untouched. Only the objects and arrays along each operation's
+ * path are copied (shallowly, at most once per call); everything else is
+ * shared with the original, so the cost follows the size of the changes
+ * rather than the size of the state.
+ */
+export function applyPatches<T>(document: T, patches: PatchOperation[][]): T {
+  // Containers copied by this call, which later operations may modify in place
+  const copied = new Set<Container>();
+  const own = (value: Container): Container => {
+    if (copied.has(value)) {
+      return value;
+    }
+    const copy = Array.isArray(value) ? value.slice() : { ...value };
+    copied.add(copy);
+    return copy;
+  };
+
+  let result: unknown = document;
+  for (const operation of patches.flat()) {
+    const parts = parsePointer(operation.path);
+    if (parts.length === 0) {
+      result = operation.value;
+      continue;
+    }
+
+    result = own(result as Container);
+    let parent = result as Container;
+    for (const part of parts.slice(0, -1)) {
+      const child = own(getChild(parent, part) as Container);
+      setChild(parent, part, child);
+      parent = child;
+    }
+    const last = parts[parts.length - 1];
+
+    if (Array.isArray(parent)) {
+      if (operation.op === 'add') {
+        if (last === '-') {
+          parent.push(operation.value);
+        } else {
+          parent.splice(Number(last), 0, operation.value);
+        }
+      } else if (operation.op === 'remove') {
+        parent.splice(Number(last), 1);
+      } else {
+        parent[Number(last)] = operation.value;
+      }
+    } else if (operation.op === 'remove') {
+      delete parent[last];
+    } else {
+      parent[last] = operation.value;
+    }
+  }
+
+  return result as T;
+}
+
+/**
+ * Apply operations to document and return the result (see applyPatches).
+ */
+export function applyPatch<T>(document: T, operations: PatchOperation[]): T {
+  return applyPatches(document, [operations]);
+}
@@ -70,6 +70,7 @@ export interface GameMap {
 export interface GameState {
   gameId: string;
   turn: number;
+  version?: number;
   currentTribe: TribeColor;
   status: GameStatus;
   map: GameMap;
@@ -78,6 +79,9 @@ export interface GameState {
   buildings: Building[];
   goldMines: GoldMine[];
   history: GameAction[];
+  seed?: number;
+  startedAt?: string;
+  applied?: Record<string, unknown>;
 }
 
 // Action payloads
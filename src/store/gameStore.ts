@@ -1,5 +1,6 @@
 import { create } from 'zustand';
 import type { GameState, TribeColor } from '@/lib/types';
+import { applyPatches, type NumberedPatch } from '@/lib/jsonPatch';
 
 interface PRStatus {
   number: number;
@@ -71,7 +72,7 @@ export const useGameStore = create<GameStore>((set, get) => ({
     }),
 
   fetchGameState: async () => {
-    const { isLoading } = get();
+    const { isLoading, gameState } = get();
     if (isLoading) return;
 
     set({ isLoading: true });
@@ -79,14 +80,27 @@ export const useGameStore = create<GameStore>((set, get) => ({
     try {
       // In production, this would fetch from GitHub raw URL
       // For now, fetch from local API or static file
-      const response = await fetch('/api/gamestate');
+      // Once we have a state, ask only for the patches since its version
+      const url =
+        gameState && gameState.version !== undefined
+          ? `/api/gamestate?gameId=${encodeURIComponent(gameState.gameId)}&since=${gameState.version}`
+          : '/api/gamestate';
+      const response = await fetch(url);
 
       if (!response.ok) {
         throw new Error(`Failed to fetch game state: ${response.statusText}`);
       }
 
       const data = await response.json();
-      set({ gameState: data, isLoading: false, error: null });
+      if (gameState && Array.isArray(data.patches)) {
+        const patches = data.patches as NumberedPatch[];
+        const next = patches.length
+          ? applyPatches(gameState, patches.map(({ patch }) => patch))
+          : gameState;
+        set({ gameState: next, isLoading: false, error: null });
+      } else {
+        set({ gameState: data, isLoading: false, error: null });
+      }
     } catch (error) {
       set({
         isLoading: false,
@@ -4,6 +4,8 @@ Strategy file for BLUE Tribe.
 Jules (or any AI agent) edits this file to make moves.
 """
 
+from strategy_sdk import GameView
+
 
 def get_action(gamestate: dict) -> dict:
     """
@@ -23,23 +25,22 @@ def get_action(gamestate: dict) -> dict:
     """
 
     my_tribe = "BLUE"
-    my_gold = gamestate["tribes"][my_tribe]["gold"]
-    my_units = [u for u in gamestate["units"] if u["tribe"] == my_tribe]
-    my_buildings = [b for b in gamestate["buildings"] if b["tribe"] == my_tribe]
-    my_castle = next((b for b in my_buildings if b["type"] == "CASTLE"), None)
+    game = GameView(gamestate, my_tribe)
+    my_gold = game.gold
+    my_units = game.my_units
+    my_castle = game.my_castle
 
     # Blue tribe strategy: Economic focus
     # 1. Train workers early
     # 2. Harvest gold
     # 3. Build up army later
 
-    workers = [u for u in my_units if u["type"] == "WORKER"]
-    knights = [u for u in my_units if u["type"] == "KNIGHT"]
+    workers = game.units(unit_type="WORKER")
+    knights = game.units(unit_type="KNIGHT")
 
     # Train workers if we have few
     if len(workers) < 2 and my_gold >= 25 and my_castle:
-        units_at_castle = [u for u in gamestate["units"] if tuple(u["position"]) == tuple(my_castle["position"])]
-        if len(units_at_castle) == 0:
+        if game.can_train_at(my_castle):
             return {
                 "action": "TRAIN",
                 "unit_type": "WORKER",
@@ -4,6 +4,8 @@ Strategy file for GREEN Tribe.
 Jules (or any AI agent) edits this file to make moves.
 """
 
+from strategy_sdk import GameView
+
 
 def get_action(gamestate: dict) -> dict:
     """
@@ -23,23 +25,22 @@ def get_action(gamestate: dict) -> dict:
     """
 
     my_tribe = "GREEN"
-    my_gold = gamestate["tribes"][my_tribe]["gold"]
-    my_units = [u for u in gamestate["units"] if u["tribe"] == my_tribe]
-    my_buildings = [b for b in gamestate["buildings"] if b["tribe"] == my_tribe]
-    my_castle = next((b for b in my_buildings if b["type"] == "CASTLE"), None)
+    game = GameView(gamestate, my_tribe)
+    my_gold = game.gold
+    my_units = game.my_units
+    my_castle = game.my_castle
 
     # Green tribe strategy: Defensive expansion
     # 1. Train settlers
     # 2. Expand territory
     # 3. Build defensive structures
 
-    knights = [u for u in my_units if u["type"] == "KNIGHT"]
-    settlers = [u for u in my_units if u["type"] == "SETTLER"]
+    knights = game.units(unit_type="KNIGHT")
+    settlers = game.units(unit_type="SETTLER")
 
     # Train a settler if we have gold
     if len(settlers) == 0 and my_gold >= 50 and my_castle:
-        units_at_castle = [u for u in gamestate["units"] if tuple(u["position"]) == tuple(my_castle["position"])]
-        if len(units_at_castle) == 0:
+        if game.can_train_at(my_castle):
             return {
                 "action": "TRAIN",
                 "unit_type": "SETTLER",
@@ -5,6 +5,8 @@ Jules (or any AI agent) edits this file to make moves.
 The get_action function is called each turn with the current game state.
 """
 
+from strategy_sdk import GameView
+
 
 def get_action(gamestate: dict) -> dict:
     """
@@ -13,19 +15,18 @@ def get_action(gamestate: dict) -> dict:
 
     # Get my tribe's data
     my_tribe = "RED"
-    my_gold = gamestate["tribes"][my_tribe]["gold"]
-    my_units = [u for u in gamestate["units"] if u["tribe"] == my_tribe]
-    my_buildings = [b for b in gamestate["buildings"] if b["tribe"] == my_tribe]
-    my_castle = next((b for b in my_buildings if b["type"] == "CASTLE"), None)
+    game = GameView(gamestate, my_tribe)
+    my_gold = game.gold
+    my_units = game.my_units
+    my_castle = game.my_castle
 
     # --- Strategy Priorities ---
 
     # 1. Train a Worker. This is the top priority for the first turn.
-    workers = [u for u in my_units if u["type"] == "WORKER"]
+    workers = game.units(unit_type="WORKER")
     if len(workers) == 0 and my_gold >= 25 and my_castle:
         # Check if the castle tile is occupied by another unit
-        is_castle_occupied = any(u["position"] == my_castle["position"] for u in gamestate["units"])
-        if not is_castle_occupied:
+        if game.can_train_at(my_castle):
             return {
                 "action": "TRAIN",
                 "unit_type": "WORKER",